@@ -1,17 +1,245 @@
 import datetime
 import json
 import os
+import time
+
+from metrics import registry as metrics
+
+def _entry_time(entry):
+    # Closed lots age from the time they were closed, everything else from when it was recorded
+    return entry.get("closed_time") or entry.get("time", "")
+
+
+class HistoryStore:
+    """
+    Append-only per-account JSONL files holding the cold part of the state:
+    closed trades ("history") and performance snapshots ("perf").
+    The main state file only keeps balances, holdings, open lots and aggregates,
+    so startup never has to parse the full trade log.
+
+    Entries older than the retention window are moved by `compact` into
+    "<kind>.archive" files, which are only read on explicit request.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, account_id, kind):
+        return os.path.join(self.directory, f"{account_id}.{kind}.jsonl")
+
+    def read(self, account_id, kind):
+        path = self._path(account_id, kind)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        return entries
+
+    def append(self, account_id, kind, entries):
+        if not entries:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(account_id, kind), 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def rewrite(self, account_id, kind, entries):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(account_id, kind)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def compact(self, account_id, kind, cutoff):
+        """
+        Move entries older than `cutoff` ("YYYY-MM-DD HH:MM:SS") to the archive file.
+        Returns the number of entries moved.
+        """
+        entries = self.read(account_id, kind)
+        old = [e for e in entries if _entry_time(e) < cutoff]
+        if not old:
+            return 0
+        recent = [e for e in entries if _entry_time(e) >= cutoff]
+        # Archive first: a crash in between leaves duplicates, never lost entries
+        self.append(account_id, kind + ".archive", old)
+        self.rewrite(account_id, kind, recent)
+        return len(old)
+
+
+def history_dir_for(filename):
+    """Directory holding the cold history files for a given state file."""
+    return os.path.splitext(filename)[0] + "_history"
+
 
 class Account:
-    def __init__(self, account_id, principal, stock_code=None, strategy_config=None, balance=None, holdings=None, history=None, performance_log=None):
+    def __init__(self, account_id, principal, stock_code=None, strategy_config=None, balance=None, holdings=None, history=None, performance_log=None,
+                 open_lots=None, stats=None, last_snapshot=None, today_trades=None, history_store=None):
         self.account_id = account_id
         self.principal = principal
         self.stock_code = stock_code
         self.balance = balance if balance is not None else principal
         self.strategy_config = strategy_config if strategy_config else {}
         self.holdings = holdings if holdings else {}  # code -> {qty, avg_price, ...}
-        self.history = history if history else []     # List of trade dicts
-        self.performance_log = performance_log if performance_log else [] # List of snapshots
+        self.last_snapshot = last_snapshot
+        self.history_store = history_store
+
+        # Cold data (closed trades, snapshots) is paged in on first access when a store is attached.
+        # Entries recorded since the last save are kept in the _unsaved_* lists until flushed.
+        self._unsaved_trades = []
+        self._unsaved_snapshots = []
+        self._needs_rewrite = False
+        self.version = 0  # Bumped on every trade so valuation caches can refresh this account
+        # Leader BUY prices index the follower batches; other accounts track their buys as open lots
+        self._track_buy_prices = self.strategy_config.get("strategy_type", "LEADER") == "LEADER"
+
+        if history is not None or stats is None:
+            # Full history in memory (new account or legacy state file)
+            self._history = list(history) if history else []
+            self.open_lots = [t for t in self._history if t.get("action") == "BUY" and t.get("status") == "OPEN"]
+            self.stats = self._compute_stats(self._history, self._track_buy_prices)
+            today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+            self.today_trades = [t for t in self._history if t.get("time", "").startswith(today_str)]
+            self._needs_rewrite = bool(self._history)
+        else:
+            self._history = None
+            self.open_lots = open_lots if open_lots else []
+            self.stats = stats if stats else self._compute_stats([])
+            if not self._track_buy_prices:
+                self.stats["buy_prices"] = {}  # Dropped from older state files
+            self.today_trades = today_trades if today_trades else []
+
+        if performance_log is not None or history_store is None:
+            self._performance_log = list(performance_log) if performance_log else [] # List of snapshots
+            self._needs_rewrite = self._needs_rewrite or bool(self._performance_log)
+        else:
+            self._performance_log = None
+
+    @staticmethod
+    def _compute_stats(history, track_buy_prices=True):
+        stats = {"buy_count": 0, "sell_count": 0, "realized_pnl": 0, "buy_prices": {}}
+        for trade in history:
+            Account._apply_stats(stats, trade, track_buy_prices)
+        return stats
+
+    @staticmethod
+    def _apply_stats(stats, trade, track_buy_prices=True):
+        if trade.get("action") == "BUY":
+            stats["buy_count"] += 1
+            # Follower lots (status OPEN/CLOSED) are tracked in open_lots, not here
+            if track_buy_prices and "status" not in trade:
+                stats["buy_prices"].setdefault(trade["code"], []).append(trade["price"])
+        elif trade.get("action") == "SELL":
+            stats["sell_count"] += 1
+            stats["realized_pnl"] += trade.get("pnl", 0)
+
+    @property
+    def history(self):
+        """Full trade history (List of trade dicts). Paged in from the history store on first access."""
+        if self._history is None:
+            cold = self.history_store.read(self.account_id, "history") if self.history_store else []
+            merged = cold + self._unsaved_trades + self.open_lots
+            self._history = sorted(merged, key=lambda t: t.get("time", ""))
+        return self._history
+
+    @property
+    def performance_log(self):
+        """List of snapshots. Paged in from the history store on first access."""
+        if self._performance_log is None:
+            cold = self.history_store.read(self.account_id, "perf") if self.history_store else []
+            self._performance_log = cold + self._unsaved_snapshots
+        return self._performance_log
+
+    def _record_trade(self, trade):
+        self.version += 1
+        if self._history is not None:
+            self._history.append(trade)
+        self._roll_today(trade["time"][:10])
+        self.today_trades.append(trade)
+        if trade.get("action") == "BUY" and trade.get("status") == "OPEN":
+            self.open_lots.append(trade)
+        else:
+            self._unsaved_trades.append(trade)
+        self._apply_stats(self.stats, trade, self._track_buy_prices)
+
+    def _roll_today(self, today_str):
+        # Drop trades from previous days (kept in the history store)
+        if self.today_trades and not self.today_trades[0].get("time", "").startswith(today_str):
+            self.today_trades = [t for t in self.today_trades if t.get("time", "").startswith(today_str)]
+
+    def get_today_trades(self, today_str=None):
+        """Trades recorded on the given day (default: today)."""
+        if today_str is None:
+            today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+        return [t for t in self.today_trades if t.get("time", "").startswith(today_str)]
+
+    def get_open_lots(self, code):
+        """Open follower lots for a stock code, in the order they were bought."""
+        return [lot for lot in self.open_lots if lot["code"] == code]
+
+    def get_buy_prices(self, code):
+        """Prices of the leader batch BUYs for a stock code, oldest first (empty for followers)."""
+        return self.stats["buy_prices"].get(code, [])
+
+    def close_lot(self, lot, timestamp=None):
+        """Mark an open lot as CLOSED and move it to the cold history."""
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lot["status"] = "CLOSED"
+        lot["closed_time"] = timestamp
+        self.open_lots = [l for l in self.open_lots if l is not lot]
+        self._unsaved_trades.append(lot)
+
+    def flush_history(self, store):
+        """Write trades and snapshots recorded since the last save to the history store."""
+        if self._needs_rewrite:
+            closed = [t for t in self.history if not (t.get("action") == "BUY" and t.get("status") == "OPEN")]
+            store.rewrite(self.account_id, "history", closed)
+            store.rewrite(self.account_id, "perf", self.performance_log)
+            self._needs_rewrite = False
+        else:
+            store.append(self.account_id, "history", self._unsaved_trades)
+            store.append(self.account_id, "perf", self._unsaved_snapshots)
+        self._unsaved_trades = []
+        self._unsaved_snapshots = []
+        self.history_store = store
+
+    def compact_history(self, store, hot_days=7, now=None):
+        """
+        End-of-day compaction: move closed trades and snapshots older than `hot_days`
+        to the archive, trim today_trades and release any paged-in history.
+        Aggregates in `stats` are lifetime totals and are not affected.
+
+        Returns:
+            int: Number of entries archived
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        self.flush_history(store)
+
+        cutoff = (now - datetime.timedelta(days=hot_days)).strftime("%Y-%m-%d %H:%M:%S")
+        moved = store.compact(self.account_id, "history", cutoff)
+        moved += store.compact(self.account_id, "perf", cutoff)
+
+        self._roll_today(now.strftime("%Y-%m-%d"))
+        if moved:
+            self.stats["archived_count"] = self.stats.get("archived_count", 0) + moved
+            self.stats["archived_before"] = cutoff
+
+        # Drop the paged-in copies; they are re-read on demand
+        self._history = None
+        self._performance_log = None
+        return moved
+
+    def load_archived_history(self):
+        """Full trade history including archived entries (reads the archive file)."""
+        archived = self.history_store.read(self.account_id, "history.archive") if self.history_store else []
+        return sorted(archived + self.history, key=lambda t: t.get("time", ""))
 
     def buy(self, code, price, qty, timestamp=None, **kwargs):
         cost = price * qty
@@ -49,7 +277,7 @@ class Account:
             "balance_after": self.balance
         }
         trade.update(kwargs)
-        self.history.append(trade)
+        self._record_trade(trade)
 
         return True, "Buy successful"
 
@@ -95,7 +323,7 @@ class Account:
             "balance_after": self.balance
         }
         trade.update(kwargs)
-        self.history.append(trade)
+        self._record_trade(trade)
 
         return True, "Sell successful"
 
@@ -111,11 +339,16 @@ class Account:
         
         return self.balance + stock_value
 
-    def update_snapshot(self, current_prices, timestamp=None):
+    def update_snapshot(self, current_prices, timestamp=None, total_value=None):
+        """
+        Record a performance snapshot.
+        total_value may be passed in when it was already computed (e.g. by PortfolioValuation).
+        """
         if timestamp is None:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-        total_value = self.get_total_value(current_prices)
+        if total_value is None:
+            total_value = self.get_total_value(current_prices)
         pnl = total_value - self.principal
         pnl_rate = (pnl / self.principal) * 100 if self.principal > 0 else 0
         
@@ -128,15 +361,15 @@ class Account:
             "holdings_count": len(self.holdings)
         }
         
-        # Keep last 60 days of 5 min intervals = 12 * 24 * 60 = 17280 entries max
-        # For now just append, we can prune later
-        self.performance_log.append(snapshot)
-        
-        # Pruning logic could be added here
-        
+        if self._performance_log is not None:
+            self._performance_log.append(snapshot)
+        self._unsaved_snapshots.append(snapshot)
+        self.last_snapshot = snapshot
+
         return snapshot
 
     def to_dict(self):
+        """Hot state only. Closed trades and snapshots live in the history store."""
         return {
             "account_id": self.account_id,
             "principal": self.principal,
@@ -144,12 +377,16 @@ class Account:
             "balance": self.balance,
             "strategy_config": self.strategy_config,
             "holdings": self.holdings,
-            "history": self.history,
-            "performance_log": self.performance_log
+            "open_lots": self.open_lots,
+            "stats": self.stats,
+            "last_snapshot": self.last_snapshot,
+            "today_trades": self.today_trades
         }
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, history_store=None):
+        # Legacy state files carry "history" / "performance_log" inline;
+        # they are migrated to the history store on the next save.
         return cls(
             account_id=data["account_id"],
             principal=data["principal"],
@@ -158,7 +395,12 @@ class Account:
             balance=data.get("balance"),
             holdings=data.get("holdings"),
             history=data.get("history"),
-            performance_log=data.get("performance_log")
+            performance_log=data.get("performance_log"),
+            open_lots=data.get("open_lots"),
+            stats=data.get("stats"),
+            last_snapshot=data.get("last_snapshot"),
+            today_trades=data.get("today_trades"),
+            history_store=history_store
         )
 
 
@@ -204,15 +446,41 @@ def create_split_account(total_money, num_sub_accounts, proportions, strategy_co
     return accounts
 
 def save_accounts(accounts, filename="trade_state.json"):
+    start = time.perf_counter()
+    store = HistoryStore(history_dir_for(filename))
+    # Flush cold data first so a crash never drops a lot that left open_lots
+    for acc in accounts:
+        acc.flush_history(store)
+
     data = [acc.to_dict() for acc in accounts]
-    with open(filename, 'w', encoding='utf-8') as f:
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_filename, filename)
+    metrics.observe("state_save_duration_seconds", time.perf_counter() - start)
+
+def compact_accounts(accounts, filename="trade_state.json", hot_days=7):
+    """
+    End-of-day job: archive closed lots, trades and snapshots older than `hot_days`
+    for every account, then save the hot state.
+    """
+    store = HistoryStore(history_dir_for(filename))
+    moved = 0
+    for acc in accounts:
+        moved += acc.compact_history(store, hot_days=hot_days)
+    save_accounts(accounts, filename)
+    return moved
 
 def load_accounts(filename="trade_state.json"):
+    """
+    Load the hot account state. History and performance logs are not read here;
+    they are paged in lazily from the history store when first accessed.
+    """
     if not os.path.exists(filename):
         return None
     
     with open(filename, 'r', encoding='utf-8') as f:
         data = json.load(f)
-        
-    return [Account.from_dict(d) for d in data]
+
+    store = HistoryStore(history_dir_for(filename))
+    return [Account.from_dict(d, history_store=store) for d in data]
@@ -0,0 +1,112 @@
+import json
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer
+
+
+def diff_config(old_config, new_config):
+    """
+    Structural diff of two configs.
+
+    Returns:
+        dict: {
+            "added": [strategy, ...],        # strategies only in new_config
+            "removed": [strategy_id, ...],   # strategies only in old_config
+            "changed": [strategy, ...],      # same id, different definition (new version)
+            "settings": {key: (old, new)}    # top-level keys other than "strategies"
+        }
+    """
+    old_strategies = {s["id"]: s for s in old_config.get("strategies", [])}
+    new_strategies = {s["id"]: s for s in new_config.get("strategies", [])}
+
+    added = [s for s_id, s in new_strategies.items() if s_id not in old_strategies]
+    removed = [s_id for s_id in old_strategies if s_id not in new_strategies]
+    changed = [s for s_id, s in new_strategies.items()
+               if s_id in old_strategies and s != old_strategies[s_id]]
+
+    settings = {}
+    for key in set(old_config) | set(new_config):
+        if key == "strategies":
+            continue
+        if old_config.get(key) != new_config.get(key):
+            settings[key] = (old_config.get(key), new_config.get(key))
+
+    return {"added": added, "removed": removed, "changed": changed, "settings": settings}
+
+
+def has_changes(diff):
+    return bool(diff["added"] or diff["removed"] or diff["changed"] or diff["settings"])
+
+
+class ConfigWatcher(QObject):
+    """
+    Watches config.json with QFileSystemWatcher and reports structural diffs.
+
+    Editors often save by writing a temp file and renaming it over the original,
+    which drops the file watch, so the containing directory is watched as well and
+    the file watch is re-armed after every change. Bursts of change notifications
+    are debounced, and notifications that do not touch the config file (other files
+    in the directory) are filtered out by comparing mtime and size.
+
+    on_change(old_config, new_config, diff) is called only when the parsed config
+    actually differs.
+    """
+
+    def __init__(self, path, on_change, config=None, debounce_ms=500, parent=None):
+        super().__init__(parent)
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce_ms = debounce_ms
+        self.config = config if config is not None else self._read()
+        self._signature = self._stat()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(os.path.dirname(self.path))
+        self._arm()
+        self.watcher.fileChanged.connect(self._schedule)
+        self.watcher.directoryChanged.connect(self._schedule)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.timeout.connect(self._reload)
+
+    def _arm(self):
+        if os.path.exists(self.path) and self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    def _read(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _schedule(self, _path=None):
+        self._debounce.start(self.debounce_ms)
+
+    def _reload(self):
+        self._arm()
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return
+
+        try:
+            new_config = self._read()
+        except (OSError, ValueError) as e:
+            # Half-written file: try again shortly
+            print(f"⚠️ Config not readable yet ({e}). Retrying...")
+            self._debounce.start(self.debounce_ms)
+            return
+
+        self._signature = signature
+        diff = diff_config(self.config, new_config)
+        if not has_changes(diff):
+            return
+
+        old_config = self.config
+        self.config = new_config
+        self.on_change(old_config, new_config, diff)
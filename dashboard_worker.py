@@ -0,0 +1,238 @@
+import json
+import multiprocessing
+import os
+import queue
+import time
+from datetime import datetime
+
+_STOP = "__stop__"
+MAX_TARGET_NAME = 63  # Bytes of the shared "target being published" buffer (NUL excluded)
+
+
+def _worker_main(jobs, repo_path, retry_base_sec, retry_max_sec, sync_options, publishing):
+    """
+    Worker process loop: apply submitted state changes to an incremental
+    PortfolioBuilder, rebuild portfolio.json and publish it, retrying failed
+    publishes with exponential backoff. Queued jobs are coalesced: all pending
+    changes are applied, then portfolio.json is built once.
+
+    Publishing is debounced: it waits until no new build arrived for `debounce_sec`
+    (but never longer than `max_delay_sec` after the first unpublished build), so a
+    burst of refreshes becomes a single commit and push. Targets configured with
+    "when": "end_of_day" are only published when the worker is stopped.
+
+    The name of the target being published is kept in the shared `publishing`
+    buffer (empty when idle), so the parent can tell which one it interrupts.
+    """
+    # Imported here so the trader process does not pay for them
+    from generate_portfolio_json import PortfolioBuilder
+    from publishers import build_publishers, content_hash
+
+    repo_path = repo_path or os.getcwd()
+    publishers = build_publishers(sync_options["targets"], repo_path)
+    session_targets = [p for p in publishers if p.when != "end_of_day"]
+    end_of_day_targets = [p for p in publishers if p.when == "end_of_day"]
+    debounce_sec = sync_options.get("debounce_sec", 0)
+    max_delay_sec = sync_options.get("max_delay_sec", debounce_sec)
+    builder = PortfolioBuilder()
+    needs_publish = False
+    pending_since = None  # First build not published yet
+    last_build = None
+    backoff = retry_base_sec
+    next_retry = None
+    built = False  # Something was generated in this process (nothing to publish before that)
+
+    def publish(targets):
+        paths = builder.publish_paths()
+        digest = content_hash(repo_path, paths)  # Hashed once, shared by every target
+        commit_msg = f"Auto-update: {datetime.now().strftime('%H:%M:%S')}"
+        ok = True
+        for p in targets:
+            publishing.value = p.name.encode("utf-8")[:MAX_TARGET_NAME]
+            ok = p.publish(paths, digest, commit_msg) and ok
+        publishing.value = b""
+        return ok
+
+    def publish_due():
+        due = min(last_build + debounce_sec, pending_since + max_delay_sec)
+        return due if next_retry is None else max(due, next_retry)
+
+    while True:
+        timeout = max(0.0, publish_due() - time.time()) if needs_publish else None
+        try:
+            job = jobs.get(timeout=timeout)
+        except queue.Empty:
+            job = None
+
+        # Coalesce: apply every pending change, then build once
+        applied = False
+        stop = False
+        while job is not None:
+            if job == _STOP:
+                stop = True
+                break
+            try:
+                builder.apply(**json.loads(job))
+                applied = True
+            except Exception as e:  # A bad job must not end the worker
+                print(f"⚠️ [DashboardWorker] Applying update failed: {e}")
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                job = None
+        if stop:
+            if built:
+                publish(session_targets + end_of_day_targets)
+            break
+
+        if applied:
+            try:
+                if builder.build():
+                    built = True
+                    needs_publish = True
+                    last_build = time.time()
+                    if pending_since is None:
+                        pending_since = last_build
+            except Exception as e:
+                print(f"⚠️ [DashboardWorker] Portfolio generation failed: {e}")
+
+        if not needs_publish or time.time() < publish_due():
+            continue
+
+        if publish(session_targets):
+            print("✅ [DashboardWorker] Dashboard synced.")
+            needs_publish = False
+            pending_since = None
+            next_retry = None
+            backoff = retry_base_sec
+        else:
+            next_retry = time.time() + backoff
+            print(f"⚠️ [DashboardWorker] Publish failed. Retrying in {backoff:.0f}s.")
+            backoff = min(backoff * 2, retry_max_sec)
+
+
+class DashboardWorker:
+    """
+    Runs dashboard generation and publishing (git, local directory, HTTP; see
+    publishers.py) in a separate process so that network / git latency never
+    delays a trading tick.
+
+    The trader submits plain-data changes of its in-memory state through a queue;
+    `submit` never blocks. Only what changed since the previous submit is sent
+    (accounts whose version moved, a new config or new broker data), and the worker
+    keeps the rest, so a refresh costs little more than the accounts that traded.
+    """
+
+    def __init__(self, repo_path=None, retry_base_sec=30, retry_max_sec=600, debounce_sec=0,
+                 max_delay_sec=None, worktree_path=None, branch="dashboard-data", squash_every=None,
+                 publish_targets=None, stop_timeout_sec=600):
+        """
+        Args:
+            repo_path: Repository the portfolio files are generated in
+            retry_base_sec / retry_max_sec: Backoff range for failed publishes
+            debounce_sec: Quiet period that coalesces builds into one publish
+            max_delay_sec: Upper bound on how long a build waits to be published
+            worktree_path: Dedicated git worktree to publish from (None: repo_path itself)
+            branch: Branch checked out in the publish worktree
+            squash_every: Squash the publish branch to one commit after this many commits
+            publish_targets: Target dicts for publishers.build_publishers (default: git only);
+                             git targets inherit the worktree / branch / squash settings
+            stop_timeout_sec: How long stop() waits for the final publish (every target,
+                              including git push / squash) before terminating the worker
+        """
+        self.repo_path = repo_path
+        self.retry_base_sec = retry_base_sec
+        self.retry_max_sec = retry_max_sec
+        git_defaults = {"worktree_path": worktree_path, "branch": branch, "squash_every": squash_every}
+        targets = []
+        for target in publish_targets or [{"type": "git"}]:
+            if target.get("type", "git") == "git":
+                target = dict(git_defaults, **target)
+            targets.append(target)
+        self.sync_options = {
+            "debounce_sec": debounce_sec,
+            "max_delay_sec": debounce_sec if max_delay_sec is None else max_delay_sec,
+            "targets": targets
+        }
+        self.stop_timeout_sec = stop_timeout_sec
+        self.jobs = None
+        self.process = None
+        self.publishing = None
+        self._reset_sent()
+
+    def _reset_sent(self):
+        # What the current worker process already has
+        self._sent_versions = {}
+        self._sent_config = None
+        self._sent_broker = None
+
+    def start(self):
+        self._reset_sent()
+        self.jobs = multiprocessing.Queue()
+        self.publishing = multiprocessing.Array("c", MAX_TARGET_NAME + 1)
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self.jobs, self.repo_path, self.retry_base_sec, self.retry_max_sec, self.sync_options,
+                  self.publishing),
+            name="DashboardWorker",
+            daemon=True
+        )
+        self.process.start()
+        print(f"Dashboard worker started (pid {self.process.pid})")
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def submit(self, broker_accounts, config, accounts, prices=None):
+        """
+        Queue a dashboard refresh.
+
+        Args:
+            broker_accounts: Result of generate_portfolio_json.fetch_broker_data
+                             (pass the same object again to reuse cached balances)
+            config: Current config dict
+            accounts: Iterable of Account objects (changed ones serialized with to_dict)
+            prices: Latest observed prices {code: price}
+        """
+        if not self.is_alive():
+            print("⚠️ Dashboard worker not running. Restarting...")
+            self.start()
+
+        accounts = list(accounts)
+        changed = [acc for acc in accounts if self._sent_versions.get(acc.account_id) != acc.version]
+        job = {
+            "accounts": [acc.to_dict() for acc in changed],
+            "account_ids": [acc.account_id for acc in accounts],
+            "prices": dict(prices) if prices else None
+        }
+        if broker_accounts is not self._sent_broker:
+            job["broker_accounts"] = broker_accounts
+        if config is not self._sent_config:
+            job["config"] = config
+
+        # Serialized here, on the caller's thread: the queue pickles in a background
+        # thread, which would race with the trader mutating the live account dicts.
+        self.jobs.put(json.dumps(job, ensure_ascii=False))
+        self._sent_broker = broker_accounts
+        self._sent_config = config
+        self._sent_versions = {acc.account_id: acc.version for acc in accounts}
+
+    def stop(self, timeout=None):
+        """
+        Ask the worker to publish to every target (end-of-day ones included) and exit.
+
+        Args:
+            timeout: Seconds to wait before terminating it (default: stop_timeout_sec)
+        """
+        if not self.is_alive():
+            return
+        self.jobs.put(_STOP)
+        self.process.join(self.stop_timeout_sec if timeout is None else timeout)
+        if self.process.is_alive():
+            target = self.publishing.value.decode("utf-8", "replace")
+            if target:
+                print(f"⚠️ Dashboard worker did not stop in time. Terminating it while publishing to "
+                      f"{target} (that target may be left half-updated).")
+            else:
+                print("⚠️ Dashboard worker did not stop in time. Terminating.")
+            self.process.terminate()
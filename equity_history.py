@@ -0,0 +1,198 @@
+from collections import deque
+from datetime import timedelta
+
+RECENT_BUCKET_MINUTES = 15
+RECENT_DAYS = 7
+DAILY_MAX_POINTS = 60
+
+# Tier sizes per series group, overridable with config["dashboard"]["history_tiers"]:
+#   {"virtual_accounts": {"intraday_minutes": 5, "recent_days": 3, "daily_max": 60}}
+# Every series keeps all three tiers. The total and the real accounts use full
+# resolution. The virtual accounts (one per strategy account, easily 100+) use
+# 5-minute intraday points and 3 days of 15-minute points: about 5 KB of
+# portfolio.json per busy account instead of about 16 KB at full resolution
+# (unchanged values are not stored, so idle accounts are much smaller). Finer
+# tiers trade file and patch size for detail; {"detail": false} keeps only the
+# daily tier.
+DEFAULT_TIERS = {
+    "total": {},
+    "accounts": {},
+    "virtual_accounts": {"intraday_minutes": 5, "recent_days": 3},
+}
+
+
+def _bucket(minute_str, size):
+    """'YYYY-MM-DD HH:MM' -> start of its `size`-minute bucket."""
+    minute = int(minute_str[14:16]) // size * size
+    return f"{minute_str[:14]}{minute:02d}"
+
+
+class EquitySeries:
+    """
+    Equity curve of one account at three resolutions:
+      intraday: one point per minute, today only            ["YYYY-MM-DD HH:MM", value]
+      recent  : one point per 15 minutes, previous 7 days   ["YYYY-MM-DD HH:MM", value]
+      daily   : one point per day (last value of the day)   ["YYYY-MM-DD", value]
+
+    Points arrive in time order, so adding one only touches the tail of each tier
+    (O(1)); when a new day starts, yesterday's minute points are folded into
+    15-minute buckets once. Out-of-order points are ignored, and a point whose value
+    equals the previous one is not stored (readers carry the last value forward),
+    so idle accounts do not grow the file or the published patches.
+
+    `intraday_minutes` coarsens the intraday tier (last value of each bucket), a
+    series created with detail=False keeps the daily tier only; `name` is the
+    display name stored next to the points (the series itself is keyed by id).
+    """
+
+    def __init__(self, intraday=None, recent=None, daily=None, recent_days=RECENT_DAYS,
+                 daily_max=DAILY_MAX_POINTS, name=None, detail=True, intraday_minutes=1):
+        self.intraday = [list(p) for p in intraday or []] if detail else []
+        self.recent = deque(list(p) for p in recent or []) if detail else deque()
+        self.daily = deque((list(p) for p in daily or []), maxlen=daily_max)
+        self.recent_days = recent_days
+        self.intraday_minutes = intraday_minutes
+        self.name = name
+        self.detail = detail
+
+    def add(self, when, value):
+        day = when.strftime("%Y-%m-%d")
+        minute = _bucket(when.strftime("%Y-%m-%d %H:%M"), self.intraday_minutes)
+        if self.daily and self.daily[-1][0] == day and self.daily[-1][1] == value:
+            return  # Unchanged today
+
+        if self.daily and self.daily[-1][0] == day:
+            self.daily[-1][1] = value
+        elif not self.daily or self.daily[-1][0] < day:
+            self.daily.append([day, value])
+        else:
+            return  # Older than what we already have
+        if not self.detail:
+            return
+
+        if self.intraday and self.intraday[0][0][:10] != day:
+            self._roll_intraday()
+        if self.intraday and self.intraday[-1][0] == minute:
+            self.intraday[-1][1] = value
+        elif not self.intraday or self.intraday[-1][0] < minute:
+            self.intraday.append([minute, value])
+
+        cutoff = (when - timedelta(days=self.recent_days)).strftime("%Y-%m-%d %H:%M")
+        while self.recent and self.recent[0][0] < cutoff:
+            self.recent.popleft()
+
+    def _roll_intraday(self):
+        """Fold the finished day's minute points into 15-minute buckets (last value wins)."""
+        for minute, value in self.intraday:
+            bucket = _bucket(minute, RECENT_BUCKET_MINUTES)
+            if self.recent and self.recent[-1][0] == bucket:
+                self.recent[-1][1] = value
+            else:
+                self.recent.append([bucket, value])
+        self.intraday = []
+
+    def previous_close(self, day):
+        """Last daily value before `day` ("YYYY-MM-DD"), or None."""
+        for i in (-1, -2):
+            if len(self.daily) >= -i and self.daily[i][0] < day:
+                return self.daily[i][1]
+        return None
+
+    def to_dict(self):
+        data = {"daily": list(self.daily)}
+        if self.detail:
+            data["intraday"] = self.intraday
+            data["recent"] = list(self.recent)
+        if self.name is not None:
+            data["name"] = self.name
+        return data
+
+    @classmethod
+    def from_dict(cls, data, **tiers):
+        """
+        Args:
+            data: Output of to_dict (may be None)
+            tiers: Tier options (recent_days, daily_max, detail, intraday_minutes)
+        """
+        data = data or {}
+        return cls(data.get("intraday"), data.get("recent"), data.get("daily"),
+                   name=data.get("name"), **tiers)
+
+
+class EquityHistory:
+    """
+    Multi-resolution equity curves for the portfolio total, every real account and
+    every virtual account (see EquitySeries), serialized into portfolio.json.
+
+    Series are keyed by a stable id (account number, virtual account_id); the
+    display name is stored with the series. Tier sizes are set per group (see
+    DEFAULT_TIERS).
+    """
+
+    GROUPS = ("accounts", "virtual_accounts")
+
+    def __init__(self, total=None, groups=None, tiers=None):
+        self.tiers = merge_tiers(tiers)
+        self.total = total or EquitySeries(**self.tiers["total"])
+        self.groups = {group: {} for group in self.GROUPS}
+        for group, series in (groups or {}).items():
+            self.groups.setdefault(group, {}).update(series)
+
+    def record(self, when, group, key, value, name=None):
+        """
+        Args:
+            when: Timestamp of the point
+            group: One of GROUPS
+            key: Stable id of the account
+            value: Total value
+            name: Display name; a series still keyed by this name (older files) is moved to `key`
+        """
+        series_map = self.groups[group]
+        series = series_map.get(key)
+        if series is None and name is not None and name in series_map:
+            series = series_map[key] = series_map.pop(name)
+        if series is None:
+            series = series_map[key] = EquitySeries(**self.tiers[group])
+        if name is not None:
+            series.name = name
+        series.add(when, value)
+
+    def retain(self, group, keys):
+        """Drop series of accounts that no longer exist."""
+        keys = set(keys)
+        for key in [k for k in self.groups[group] if k not in keys]:
+            del self.groups[group][key]
+
+    def to_dict(self):
+        data = {"total": self.total.to_dict()}
+        for group, series in self.groups.items():
+            data[group] = {key: s.to_dict() for key, s in series.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data, legacy_daily=None, tiers=None):
+        """
+        Args:
+            data: Previously emitted "equity_history" (may be None)
+            legacy_daily: Old-style [{"date", "value"}] history, seeds the total's daily tier
+            tiers: Per-group tier overrides (see DEFAULT_TIERS)
+        """
+        data = data or {}
+        tiers = merge_tiers(tiers)
+        if data.get("total"):
+            total = EquitySeries.from_dict(data["total"], **tiers["total"])
+        else:
+            daily = sorted(([e["date"], e["value"]] for e in legacy_daily or []), key=lambda p: p[0])
+            total = EquitySeries(daily=daily, **tiers["total"])
+        groups = {group: {key: EquitySeries.from_dict(s, **tiers[group])
+                          for key, s in data.get(group, {}).items()}
+                  for group in cls.GROUPS}
+        return cls(total, groups, tiers)
+
+
+def merge_tiers(overrides=None):
+    """DEFAULT_TIERS with per-group `overrides` applied."""
+    tiers = {group: dict(options) for group, options in DEFAULT_TIERS.items()}
+    for group, options in (overrides or {}).items():
+        tiers.setdefault(group, {}).update(options)
+    return tiers
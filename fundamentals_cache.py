@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+CACHE_FILE = "outputs/fundamentals_cache.json"
+DEFAULT_TTL_DAYS = 14
+# Annual figures show up on Naver roughly 1.5 months after the fiscal year ends
+# (preliminary results in February for December year ends)
+REPORT_LAG_DAYS = 45
+
+_PERIOD_RE = re.compile(r"(\d{4})\.(\d{2})")
+
+
+def next_release(period):
+    """
+    Earliest date new annual figures are expected after `period` ("2024.12"). For an
+    estimate column ("2025.12(E)") that is the release of the actuals of that year.
+
+    Returns:
+        datetime or None: None if the period label cannot be parsed
+    """
+    match = _PERIOD_RE.search(period or "")
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if "(E)" not in period:
+        year += 1
+    # Last day of the fiscal year end month
+    end = datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return end + timedelta(days=REPORT_LAG_DAYS)
+
+
+class FundamentalsCache:
+    """
+    On-disk cache of scraped Naver fundamentals, one entry per stock code:
+        {"period": "2024.12", "fetched_at": epoch, "data": {...}}
+
+    An entry is reused until it is older than the TTL or a newer reporting period
+    is likely to be published (see next_release) and the entry predates that date.
+    Thread-safe: the scraper threads read and fill it concurrently.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl_days=DEFAULT_TTL_DAYS, save_every=50):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+            print(f"📦 Loaded {len(self._entries)} cached fundamentals from {self.path}")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Fundamentals cache unreadable, starting empty: {e}")
+            self._entries = {}
+
+    def is_fresh(self, entry, now=None):
+        now = time.time() if now is None else now
+        fetched_at = entry.get("fetched_at", 0)
+        if now - fetched_at > self.ttl:
+            return False
+        release = next_release(entry.get("period"))
+        if release is not None:
+            release_ts = release.timestamp()
+            if fetched_at < release_ts <= now:
+                return False  # A newer period is probably out
+        return True
+
+    def get(self, code, now=None):
+        """Cached fundamentals for `code`, or None if missing or due for revalidation."""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and self.is_fresh(entry, now):
+                self.hits += 1
+                return entry["data"]
+            self.misses += 1
+            return None
+
+    def put(self, code, data, now=None):
+        with self._lock:
+            self._entries[code] = {
+                "period": data.get("Period", ""),
+                "fetched_at": time.time() if now is None else now,
+                "data": data
+            }
+            self._dirty += 1
+            if self._dirty < self.save_every:
+                return
+        self.save()
+
+    def save(self):
+        with self._save_lock:  # Serializes writers, so a newer snapshot is never overwritten
+            with self._lock:
+                if not self._dirty:
+                    return
+                text = json.dumps(self._entries, ensure_ascii=False, separators=(",", ":"))
+                self._dirty = 0
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,138 @@
+import queue
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+
+from metrics import registry as metrics
+
+
+class KiwoomGateway(QObject):
+    """
+    Thin broker gateway: the only component that touches the Kiwoom control.
+
+    Requests from the message bus are executed one at a time on the Qt thread
+    (TRs spin a nested event loop, so the pump is guarded against re-entry).
+    Every observed price (TR or real-time tick) is published on the "price" topic
+    and every order result on the "order" topic.
+    """
+
+    METHODS = ("get_login_info", "get_current_price", "get_deposit",
+               "get_account_evaluation", "send_order", "subscribe_prices")
+
+    def __init__(self, kiwoom, server, poll_ms=20, parent=None):
+        super().__init__(parent)
+        self.kiwoom = kiwoom
+        self.server = server
+        self._busy = False
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._pump)
+        self.poll_ms = poll_ms
+        kiwoom.real_price_listeners.append(self._on_real_price)
+
+    def _on_real_price(self, code, price):
+        self.server.publish("price", {"code": code, "price": price, "time": time.time(), "real": True})
+
+    def start(self):
+        self.timer.start(self.poll_ms)
+
+    def stop(self):
+        self.timer.stop()
+
+    def _pump(self):
+        if self._busy:
+            return
+        self._busy = True
+        try:
+            while True:
+                try:
+                    peer, msg = self.server.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                self._handle(peer, msg)
+        finally:
+            self._busy = False
+
+    def _handle(self, peer, msg):
+        method = msg.get("method")
+        args = msg.get("args", [])
+        if method not in self.METHODS:
+            self.server.reply(peer, msg.get("id"), error=f"Unknown method: {method}")
+            return
+
+        metrics.inc("gateway_requests_total", method=method)
+        try:
+            result = getattr(self.kiwoom, method)(*args)
+        except Exception as e:
+            self.server.reply(peer, msg.get("id"), error=f"{method} failed: {e}")
+            return
+
+        if method == "get_current_price" and result and "price" in result:
+            self.server.publish("price", {"code": args[0], "price": abs(int(result["price"])),
+                                          "time": time.time()})
+        elif method == "send_order":
+            order_type, account_no, code, qty, price = args[:5]
+            self.server.publish("order", {"order_type": order_type, "account": account_no,
+                                          "code": code, "qty": qty, "price": price,
+                                          "sent": bool(result), "time": time.time()})
+        self.server.reply(peer, msg.get("id"), result=result)
+
+
+class GatewayClient:
+    """
+    Kiwoom-compatible proxy used by the strategy process.
+
+    Implements the subset of the Kiwoom interface the executor and dashboard use;
+    each call is forwarded to the gateway over the message bus. Like the Kiwoom
+    class, the last TR result is also kept in `tr_data`, and a failed request
+    returns None (or False for orders) instead of raising.
+    """
+
+    def __init__(self, bus, timeout=30):
+        self.bus = bus
+        self.timeout = timeout
+        self.tr_data = None
+        self.last_prices = {}
+        self.real_prices = {}  # code -> (price, epoch) from real-time ticks
+        self.bus.on("price", self._on_price)
+
+    @property
+    def closed(self):
+        return self.bus.closed
+
+    def _on_price(self, data):
+        self.last_prices[data["code"]] = data["price"]
+        if data.get("real"):
+            self.real_prices[data["code"]] = (data["price"], data["time"])
+
+    def _call(self, method, *args):
+        try:
+            self.tr_data = self.bus.request(method, *args, timeout=self.timeout)
+        except (TimeoutError, ConnectionError, RuntimeError) as e:
+            print(f"⚠️  Gateway request {method} failed: {e}")
+            self.tr_data = None
+        return self.tr_data
+
+    def get_login_info(self, tag):
+        return self._call("get_login_info", tag)
+
+    def get_current_price(self, code):
+        return self._call("get_current_price", code)
+
+    def get_deposit(self, account_no):
+        return self._call("get_deposit", account_no)
+
+    def get_account_evaluation(self, account_no):
+        return self._call("get_account_evaluation", account_no)
+
+    def subscribe_prices(self, codes):
+        return self._call("subscribe_prices", list(codes)) or 0
+
+    def get_real_price(self, code, max_age=None):
+        entry = self.real_prices.get(code)
+        if entry is None or (max_age is not None and time.time() - entry[1] > max_age):
+            return None
+        return entry[0]
+
+    def send_order(self, order_type, account_no, code, qty, price, order_no=""):
+        # No retry on timeout: the order may have reached the broker
+        return bool(self._call("send_order", order_type, account_no, code, qty, price, order_no))
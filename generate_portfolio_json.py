@@ -3,8 +3,10 @@ import json
 import time
 import datetime
 import os
-from PyQt5.QtWidgets import QApplication
-from kiwoom_api import Kiwoom
+from account_manager import Account
+from valuation_engine import PortfolioValuation
+from equity_history import EquityHistory
+from portfolio_delta import DeltaWriter, BASE_FILE, MANIFEST_FILE, PATCH_DIR
 
 # Default Portfolio Structure
 DEFAULT_PORTFOLIO = {
@@ -25,7 +27,6 @@ DEFAULT_PORTFOLIO = {
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "outputs")
 PORTFOLIO_FILE = os.path.join(OUTPUT_DIR, "portfolio.json")
-MAX_HISTORY_DAYS = 60
 
 def load_portfolio(filepath=PORTFOLIO_FILE):
     # print(f"[DEBUG] load_portfolio called with filepath: {filepath}")
@@ -41,52 +42,21 @@ def load_portfolio(filepath=PORTFOLIO_FILE):
     # print(f"[DEBUG] Returning DEFAULT_PORTFOLIO (empty history)")
     return DEFAULT_PORTFOLIO
 
-def fetch_and_generate_portfolio(kiwoom):
-    """
-    Fetches data using an existing Kiwoom instance and generates portfolio.json.
+def fetch_broker_data(kiwoom):
     """
-    # Ensure output directory exists
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        print(f"Created directory: {OUTPUT_DIR}")
+    Runs the broker TRs (opw00001 deposit, opw00018 evaluation) for every real account.
+    Must run in the process that owns the Kiwoom control.
 
+    Returns:
+        list: [{"account": acc_no, "cash": int, "evaluation": dict or None}, ...] or None
+    """
     print("Fetching account info...")
     accounts_list = kiwoom.get_login_info("ACCNO")
     if not accounts_list:
         print("No accounts found.")
-        return False
-
-    # Load Config for Sector Map & Virtual Accounts
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    print(f"Loading config from: {config_path}")
-    sector_map = {}
-    config = {}
+        return None
 
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-
-            # Build Sector Map
-            if "strategies" in config:
-                for strategy in config["strategies"]:
-                    if "stock_code" in strategy and "sector" in strategy:
-                        sector_map[strategy["stock_code"]] = strategy["sector"]
-        except Exception as e:
-            print(f"Error loading config: {e}")
-
-    # Data Aggregators
-    total_value = 0
-    total_cash_all = 0
-    total_equity_all = 0
-    total_pnl_all = 0 # Total Inception PnL
-    daily_pnl_all = 0
-
-    holdings_list = []
-    accounts_data = []
-
-    # Iterate accounts
+    broker_accounts = []
     for acc in accounts_list:
         if not acc: continue
         if acc == '7032756831': continue # Skip unused account
@@ -103,319 +73,507 @@ def fetch_and_generate_portfolio(kiwoom):
         data = kiwoom.get_account_evaluation(acc)
         if not data or not isinstance(data, dict):
             print(f"Failed to get evaluation for {acc} (Data: {data})")
-            # Add partial data if possible or skip
-            accounts_data.append({
-                "name": f"Account {acc}",
-                "total_value": cash,
-                "cash": cash,
-                "equity": 0
-            })
-            total_value += cash
-            total_cash_all += cash
-            continue
-
-        summary = data['summary']
-        acc_holdings = data['holdings']
-
-        # Extract Summary Data
-        acc_equity = summary['total_eval']
-        acc_cash = cash  # Use actual deposit from opw00001
-        acc_total_val = acc_cash + acc_equity
-
-        # Update Global Totals
-        total_value += acc_total_val
-        total_cash_all += acc_cash
-        total_equity_all += acc_equity
-        total_pnl_all += summary['total_profit_loss']
-        daily_pnl_all += summary.get('daily_pnl', 0)
-
-        accounts_data.append({
-            "name": f"Account {acc}",
-            "total_value": acc_total_val,
-            "cash": acc_cash,
-            "equity": acc_equity
-        })
-
-        # Process Holdings
-        for h in acc_holdings:
-            code = h['code']
-            sector = sector_map.get(code, "Unknown")
-
-            holding_entry = {
-                "name": h['name'],
-                "symbol": code,
-                "sector": sector,
-                "quantity": h['qty'],
-                "avg_price": h['buy_price'],
-                "current_price": h['current_price'],
-                "value": h['current_price'] * h['qty'],
-                "pnl": h['eval_profit'],
-                "pnl_percent": h['yield_rate'],
-                "account": f"Account {acc}"
-            }
-            holdings_list.append(holding_entry)
+            data = None
 
+        broker_accounts.append({"account": acc, "cash": cash, "evaluation": data})
         time.sleep(0.3)
 
-    # Load and Update History (before summary so we can compute daily P&L)
-    portfolio = load_portfolio()
-    history = portfolio.get("history", [])
-    # print(f"[DEBUG] Initial history length: {len(history)}")
-    history.sort(key=lambda x: x['date'])
-
-    today_str = datetime.date.today().strftime("%Y-%m-%d")
-    # print(f"[DEBUG] Today's date: {today_str}")
-
-    # Find previous day's value for daily P&L calculation
-    prev_value = None
-    for entry in reversed(history):
-        if entry["date"] < today_str:
-            prev_value = entry["value"]
-            break
-
-    # Update or append today's entry
-    todays_entry = next((item for item in history if item["date"] == today_str), None)
-    if todays_entry:
-        # print(f"[DEBUG] Updating existing entry for {today_str}")
-        todays_entry["value"] = total_value
-    else:
-        # print(f"[DEBUG] Adding new entry for {today_str}")
-        history.append({
-            "date": today_str,
-            "value": total_value
-        })
-
-    # Sort and limit history
-    history.sort(key=lambda x: x['date'])
-    if len(history) > MAX_HISTORY_DAYS:
-        history = history[-MAX_HISTORY_DAYS:]
-
-    # print(f"[DEBUG] Final history length: {len(history)}")
-
-    # Calculate Global Summaries
-    total_capital = config.get("total_capital", 100000000)
-    total_pnl_all = total_value - total_capital
-
-    # Daily P&L from history (today vs previous day)
-    daily_pnl_all = 0
-    daily_return = 0.0
-    if prev_value is not None and prev_value > 0:
-        daily_pnl_all = total_value - prev_value
-        daily_return = round((daily_pnl_all / prev_value) * 100, 2)
-
-    if total_value > 0:
-        cash_percent = round((total_cash_all / total_value) * 100, 2)
-        total_rate = round((total_pnl_all / total_capital) * 100, 2)
-    else:
-        cash_percent = 0.0
-        total_rate = 0.0
-
-    summary_obj = {
-        "total_value": total_value,
-        "daily_pnl": daily_pnl_all,
-        "daily_return": daily_return,
-        "total_pnl": total_pnl_all,
-        "total_return": total_rate,
-        "cash": total_cash_all,
-        "cash_percent": cash_percent
-    }
-
-    # --- Virtual Accounts Logic ---
-    virtual_accounts_data = []
+    return broker_accounts
+
+def load_config():
+    config_path = os.path.join(SCRIPT_DIR, "config.json")
+    print(f"Loading config from: {config_path}")
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+    return {}
 
+def load_trade_state():
     # Load trade_state.json for actual per-virtual-account holdings
-    trade_state_path = os.path.join(script_dir, "trade_state.json")
-    trade_state = []
+    trade_state_path = os.path.join(SCRIPT_DIR, "trade_state.json")
     if os.path.exists(trade_state_path):
         try:
             with open(trade_state_path, "r", encoding="utf-8") as f:
                 trade_state = json.load(f)
             print(f"Loaded trade_state.json with {len(trade_state)} virtual accounts")
+            return trade_state
         except Exception as e:
             print(f"Error loading trade_state.json: {e}")
+    return []
 
-    if trade_state:
-        try:
-            # Build current price map from Kiwoom holdings data
-            current_price_map = {}
-            for h in holdings_list:
-                current_price_map[h['symbol']] = h['current_price']
-
-            # Build sector map and stock code map from config strategies
-            strategy_sector_map = {}
-            strategy_code_map = {}
-            if config and "strategies" in config:
-                for strategy in config["strategies"]:
-                    strategy_sector_map[strategy["id"]] = strategy.get("sector", "Unknown")
-                    strategy_code_map[strategy["id"]] = strategy.get("stock_code", "")
-
-            # Build stock code → Korean name map from holdings
-            stock_name_map = {}
-            for h in holdings_list:
-                stock_name_map[h['symbol']] = h['name']
-
-            target_acc_name = f"Account {config.get('real_account_id', '8119599511')}"
-
-            for va in trade_state:
-                v_name = va.get("account_id", "")
-                v_balance = va.get("balance", 0)
-                v_holdings = va.get("holdings", {})
-                v_principal = va.get("principal", 0)
-                stock_code = va.get("stock_code", "")
-
-                # Calculate equity using current market prices
-                v_equity = 0
-                v_cost = 0
-                for code, holding in v_holdings.items():
-                    qty = holding.get("qty", 0)
-                    cur_price = current_price_map.get(code, holding.get("avg_price", 0))
-                    v_equity += qty * cur_price
-                    v_cost += holding.get("total_cost", 0)
-
-                v_cash = int(v_balance)
-                v_total = v_cash + v_equity
-                v_pnl = v_equity - v_cost  # PnL = market value - cost basis
-
-                # Extract strategy ID from account_id (e.g., "Samsung_1" -> "Samsung")
-                strategy_id = "_".join(v_name.split("_")[:-1]) if "_" in v_name else v_name
-                suffix = v_name.split("_")[-1] if "_" in v_name else ""
-                sector = strategy_sector_map.get(strategy_id, "Unknown")
-
-                # Map to Korean stock name via stock code
-                s_code = strategy_code_map.get(strategy_id, "")
-                korean_name = stock_name_map.get(s_code, strategy_id)
-                display_name = f"{korean_name}_{suffix}" if suffix else korean_name
-
-                # Get allocation ratio from strategy config
-                s_config = va.get("strategy_config", {})
-                ratio = s_config.get("ratio", 0)
-                # Find strategy allocation percent
-                s_alloc = 0.1  # default
-                if config and "strategies" in config:
-                    for strategy in config["strategies"]:
-                        if strategy["id"] == strategy_id:
-                            s_alloc = strategy.get("total_allocation_percent", 0.1)
-                            break
-
-                # Extract strategy params
-                strategy_type = s_config.get("strategy_type", "")
-                params = s_config.get("params", {})
-                target_profit = params.get("target_profit", 0)
-                dip = params.get("dip", 0)
-
-                # Count buy and sell transactions, and sum realized P&L
-                va_history = va.get("history", [])
-                buy_count = sum(1 for t in va_history if t.get("action") == "BUY")
-                sell_count = sum(1 for t in va_history if t.get("action") == "SELL")
-                realized_pnl = int(sum(t.get("pnl", 0) for t in va_history if t.get("action") == "SELL"))
-
-                virtual_accounts_data.append({
-                    "name": display_name,
-                    "real_account_ref": target_acc_name,
+def fetch_and_generate_portfolio(kiwoom):
+    """
+    Fetches data using an existing Kiwoom instance and generates portfolio.json.
+    """
+    broker_accounts = fetch_broker_data(kiwoom)
+    if broker_accounts is None:
+        return False
+    return generate_portfolio(broker_accounts, load_config(), load_trade_state())
+
+def generate_portfolio(broker_accounts, config, trade_state, builder=None):
+    """
+    Builds and writes portfolio.json from already-fetched data. Does not touch the broker,
+    so it can run in a separate process (see dashboard_worker.py).
+
+    Args:
+        broker_accounts: Result of fetch_broker_data
+        config: Parsed config.json
+        trade_state: List of account dicts (Account.to_dict() / trade_state.json)
+        builder: Optional PortfolioBuilder to reuse (only changed sections are recomputed)
+
+    Returns:
+        bool: True if portfolio.json was (re)written
+    """
+    if builder is None:
+        builder = PortfolioBuilder()
+    builder.apply(broker_accounts=broker_accounts, config=config, accounts=trade_state,
+                  account_ids=[va.get("account_id", "") for va in trade_state])
+    return builder.build()
+
+
+class PortfolioBuilder:
+    """
+    Incremental portfolio.json generator.
+
+    Inputs are applied as they change (`apply`), and `build` recomputes only the
+    sections whose inputs changed since the last build:
+      - broker section (real accounts, holdings): new broker data or a held code's price moved
+      - strategy index (id -> sector / code / allocation): config changed
+      - virtual account rows: that account, its valuation or the strategy index changed
+    Summary and equity history (see equity_history.py) are cheap and refreshed on
+    every build; portfolio.json is only rewritten when its content actually changed.
+    """
+
+    def __init__(self, output_path=PORTFOLIO_FILE):
+        self.output_path = output_path
+        self.broker_accounts = None
+        self.config = {}
+        self.prices = {}           # Latest observed prices {code: price}; override broker prices
+        self.accounts = {}         # account_id -> Account (rebuilt from to_dict snapshots)
+        self.account_dicts = {}    # account_id -> snapshot dict (stats, strategy_config)
+        self.account_order = []
+        self.valuation = PortfolioValuation()
+
+        self._revision = 0
+        self._account_revs = {}    # account_id -> revision of its last snapshot
+        self._broker_rev = 0
+        self._config_rev = 0
+        self._broker_cache = (None, None)  # (key, section)
+        self._index_cache = (None, None)   # (config revision, strategy index)
+        self._rows = {}            # account_id -> (key, row)
+        self._history = None
+        self._last_output = None
+        self._delta = None         # DeltaWriter when dashboard.output_mode is "delta"
+
+    def _next_revision(self):
+        self._revision += 1
+        return self._revision
+
+    def apply(self, broker_accounts=None, config=None, accounts=None, account_ids=None, prices=None):
+        """
+        Apply changed inputs. Arguments left as None are unchanged.
+
+        Args:
+            broker_accounts: New fetch_broker_data result
+            config: New config dict
+            accounts: Changed account dicts (Account.to_dict())
+            account_ids: Complete, ordered list of current account ids (others are dropped)
+            prices: Latest prices {code: price}, merged into the known prices
+        """
+        if broker_accounts is not None:
+            self.broker_accounts = broker_accounts
+            self._broker_rev = self._next_revision()
+        if config is not None and config != self.config:
+            self.config = config
+            self._config_rev = self._next_revision()
+        if prices:
+            self.prices.update(prices)
+
+        for va in accounts or []:
+            acc_id = va.get("account_id", "")
+            if acc_id not in self.accounts:
+                self.account_order.append(acc_id)
+            account = Account.from_dict(va)
+            account.version = self._next_revision()
+            self.accounts[acc_id] = account
+            self.account_dicts[acc_id] = va
+            self._account_revs[acc_id] = account.version
+            self.valuation.replace(account)
+
+        if account_ids is not None:
+            keep = set(account_ids)
+            for acc_id in [a for a in self.accounts if a not in keep]:
+                for index in (self.accounts, self.account_dicts, self._account_revs, self._rows):
+                    index.pop(acc_id, None)
+            self.account_order = [a for a in account_ids if a in self.accounts]
+
+    # --- Sections ---
+    def _strategy_index(self):
+        rev, index = self._index_cache
+        if rev != self._config_rev:
+            index = {s["id"]: {"sector": s.get("sector", "Unknown"),
+                               "stock_code": s.get("stock_code", ""),
+                               "allocation": s.get("total_allocation_percent", 0.1)}
+                     for s in self.config.get("strategies", [])}
+            self._index_cache = (self._config_rev, index)
+        return index
+
+    def _broker_section(self):
+        """Real accounts and holdings; broker prices are refreshed with newer observed prices."""
+        held = sorted({h["code"] for b in self.broker_accounts if b["evaluation"]
+                       for h in b["evaluation"]["holdings"]})
+        key = (self._broker_rev, self._config_rev, tuple(self.prices.get(code) for code in held))
+        if self._broker_cache[0] == key:
+            return self._broker_cache[1]
+
+        sector_map = {s["stock_code"]: s["sector"] for s in self.config.get("strategies", [])
+                      if "stock_code" in s and "sector" in s}
+        section = {"accounts": [], "holdings": [], "total_value": 0, "cash": 0}
+
+        for broker_acc in self.broker_accounts:
+            acc = broker_acc["account"]
+            cash = broker_acc["cash"]
+            data = broker_acc["evaluation"]
+            if data is None:
+                section["accounts"].append({"name": f"Account {acc}", "account": str(acc),
+                                            "total_value": cash, "cash": cash, "equity": 0})
+                section["total_value"] += cash
+                section["cash"] += cash
+                continue
+
+            acc_equity = data["summary"]["total_eval"]
+            for h in data["holdings"]:
+                code = h["code"]
+                price = self.prices.get(code) or h["current_price"]
+                # Re-mark the broker's evaluation by the move since it was fetched
+                move = (price - h["current_price"]) * h["qty"]
+                acc_equity += move
+                pnl = h["eval_profit"] + move
+                cost = h["buy_price"] * h["qty"]
+                section["holdings"].append({
+                    "name": h["name"],
+                    "symbol": code,
+                    "sector": sector_map.get(code, "Unknown"),
+                    "quantity": h["qty"],
+                    "avg_price": h["buy_price"],
+                    "current_price": price,
+                    "value": price * h["qty"],
+                    "pnl": pnl,
+                    "pnl_percent": round(pnl / cost * 100, 2) if move and cost else h["yield_rate"],
+                    "account": f"Account {acc}"
+                })
+
+            acc_total_val = cash + acc_equity  # Cash is the actual deposit from opw00001
+            section["accounts"].append({"name": f"Account {acc}", "account": str(acc),
+                                        "total_value": acc_total_val, "cash": cash, "equity": acc_equity})
+            section["total_value"] += acc_total_val
+            section["cash"] += cash
+
+        section["price_map"] = {h["symbol"]: h["current_price"] for h in section["holdings"]}
+        section["name_map"] = {h["symbol"]: h["name"] for h in section["holdings"]}
+        self._broker_cache = (key, section)
+        return section
+
+    def _delta_writer(self):
+        """DeltaWriter when dashboard.output_mode is "delta" (restores an existing chain), else None."""
+        dash_cfg = self.config.get("dashboard", {})
+        if dash_cfg.get("output_mode", "full") != "delta":
+            return None
+        if self._delta is None:
+            self._delta = DeltaWriter(os.path.dirname(self.output_path),
+                                      rebase_every=dash_cfg.get("rebase_every", 120),
+                                      rebase_ratio=dash_cfg.get("rebase_ratio", 0.5))
+        return self._delta
+
+    def _load_published(self):
+        """Last published document: the delta chain in delta mode, portfolio.json otherwise (or as fallback)."""
+        delta = self._delta_writer()
+        if delta is not None and delta.current is not None:
+            return delta.current
+        return load_portfolio(self.output_path)
+
+    def _update_history(self, now, total_value, broker, virtual_rows):
+        """
+        Record this build's values in the multi-resolution equity history (kept in memory
+        after the first load). Series are keyed by account number / account_id, so a
+        changing display name keeps its history. Returns the previous day's total value.
+        """
+        if self._history is None:
+            portfolio = self._load_published()
+            self._history = EquityHistory.from_dict(portfolio.get("equity_history"),
+                                                    legacy_daily=portfolio.get("history"),
+                                                    tiers=self.config.get("dashboard", {}).get("history_tiers"))
+        history = self._history
+        prev_value = history.total.previous_close(now.strftime("%Y-%m-%d"))
+
+        history.total.add(now, total_value)
+        for acc in broker["accounts"]:
+            history.record(now, "accounts", acc["account"], acc["total_value"], name=acc["name"])
+        for row in virtual_rows:
+            history.record(now, "virtual_accounts", row["account_id"], row["total_value"], name=row["name"])
+        history.retain("accounts", [acc["account"] for acc in broker["accounts"]])
+        history.retain("virtual_accounts", [row["account_id"] for row in virtual_rows])
+        return prev_value
+
+    def _virtual_rows(self, broker):
+        if not self.accounts:
+            return []
+        index = self._strategy_index()
+        price_map = dict(broker["price_map"])
+        price_map.update(self.prices)
+        target_acc_name = f"Account {self.config.get('real_account_id', '8119599511')}"
+
+        # Value all virtual accounts in one vectorized pass
+        self.valuation.sync(self.accounts)
+        valued = self.valuation.evaluate(price_map)
+        equity_map = dict(zip(self.valuation.account_ids, valued["equity"].tolist()))
+        cost_map = dict(zip(self.valuation.account_ids, valued["cost_basis"].tolist()))
+
+        rows = []
+        for v_name in self.account_order:
+            v_equity = int(round(equity_map.get(v_name, 0)))
+            v_cost = cost_map.get(v_name, 0)
+            key = (self._account_revs[v_name], self._config_rev, self._broker_rev, v_equity, v_cost)
+            cached = self._rows.get(v_name)
+            if cached and cached[0] == key:
+                rows.append(cached[1])
+                continue
+            row = self._virtual_row(self.account_dicts[v_name], index, broker["name_map"],
+                                    target_acc_name, v_equity, v_cost)
+            self._rows[v_name] = (key, row)
+            rows.append(row)
+        return rows
+
+    def _virtual_row(self, va, index, name_map, target_acc_name, v_equity, v_cost):
+        v_name = va.get("account_id", "")
+        v_cash = int(va.get("balance", 0))
+
+        # Extract strategy ID from account_id (e.g., "Samsung_1" -> "Samsung")
+        strategy_id = "_".join(v_name.split("_")[:-1]) if "_" in v_name else v_name
+        suffix = v_name.split("_")[-1] if "_" in v_name else ""
+        strategy = index.get(strategy_id, {})
+
+        # Map to Korean stock name via stock code
+        korean_name = name_map.get(strategy.get("stock_code", ""), strategy_id)
+        display_name = f"{korean_name}_{suffix}" if suffix else korean_name
+
+        s_config = va.get("strategy_config", {})
+        params = s_config.get("params", {})
+
+        # Count buy and sell transactions, and sum realized P&L
+        # (aggregates are kept in the state file; legacy files still carry the full history)
+        va_stats = va.get("stats")
+        if va_stats:
+            buy_count = va_stats.get("buy_count", 0)
+            sell_count = va_stats.get("sell_count", 0)
+            realized_pnl = int(va_stats.get("realized_pnl", 0))
+        else:
+            va_history = va.get("history", [])
+            buy_count = sum(1 for t in va_history if t.get("action") == "BUY")
+            sell_count = sum(1 for t in va_history if t.get("action") == "SELL")
+            realized_pnl = int(sum(t.get("pnl", 0) for t in va_history if t.get("action") == "SELL"))
+
+        return {
+            "name": display_name,
+            "account_id": v_name,
+            "strategy": strategy_id,
+            "real_account_ref": target_acc_name,
+            "allocation_ratio": s_config.get("ratio", 0) * strategy.get("allocation", 0.1),
+            "strategy_type": s_config.get("strategy_type", ""),
+            "rise_pct": round(params.get("target_profit", 0) * 100, 1),
+            "dip_pct": round(params.get("dip", 0) * 100, 1),
+            "total_value": v_cash + v_equity,
+            "cash": v_cash,
+            "equity": v_equity,
+            "unrealized_pnl": v_equity - v_cost,  # PnL = market value - cost basis
+            "realized_pnl": realized_pnl,
+            "buy_count": buy_count,
+            "sell_count": sell_count,
+            "sector": strategy.get("sector", "Unknown")
+        }
+
+    def _fallback_rows(self, broker):
+        """Old ratio-based splitting of the real holdings, used when there is no trade state."""
+        config = self.config
+        accounts_data = broker["accounts"]
+        target_id = config.get("real_account_id", "8119599511")
+        target_acc_data = next((ad for ad in accounts_data if target_id in ad["name"]), None)
+        if not target_acc_data and accounts_data:
+            target_acc_data = accounts_data[0]
+        if not target_acc_data or "strategies" not in config:
+            return []
+
+        stock_value_map = {}
+        stock_cost_map = {}
+        stock_pnl_map = {}
+        for h in broker["holdings"]:
+            code = h.get("symbol", "")
+            stock_value_map[code] = h["value"]
+            stock_cost_map[code] = h["avg_price"] * h["quantity"]
+            stock_pnl_map[code] = h["pnl"]
+
+        total_capital = config.get("total_capital", target_acc_data.get("total_value", 0))
+        rows = []
+        for strategy in config["strategies"]:
+            s_id = strategy["id"]
+            s_alloc = strategy["total_allocation_percent"]
+            stock_code = strategy.get("stock_code", "")
+            strategy_capital = total_capital * s_alloc
+            strategy_cash = strategy_capital - stock_cost_map.get(stock_code, 0)
+
+            for acc in strategy["accounts"]:
+                ratio = acc["ratio"]
+                korean_name = broker["name_map"].get(stock_code, s_id)
+                v_equity = int(stock_value_map.get(stock_code, 0) * ratio)
+                v_cash = int(strategy_cash * ratio)
+                rows.append({
+                    "name": f"{korean_name}_{acc['suffix']}",
+                    "account_id": f"{s_id}_{acc['suffix']}",
+                    "strategy": s_id,
+                    "real_account_ref": target_acc_data["name"],
                     "allocation_ratio": ratio * s_alloc,
-                    "strategy_type": strategy_type,
-                    "rise_pct": round(target_profit * 100, 1),
-                    "dip_pct": round(dip * 100, 1),
-                    "total_value": v_total,
+                    "total_value": v_cash + v_equity,
                     "cash": v_cash,
                     "equity": v_equity,
-                    "unrealized_pnl": v_pnl,
-                    "realized_pnl": realized_pnl,
-                    "buy_count": buy_count,
-                    "sell_count": sell_count,
-                    "sector": sector
+                    "total_pnl": int(stock_pnl_map.get(stock_code, 0) * ratio),
+                    "sector": strategy.get("sector", "Unknown")
                 })
-
-        except Exception as e:
-            print(f"Error processing virtual accounts from trade_state: {e}")
-    elif config:
-        # Fallback: old ratio-based splitting if no trade_state.json
+        return rows
+
+    # --- Build ---
+    def build(self, now=None):
+        """
+        Recompute changed sections and write portfolio.json if its content changed.
+
+        Args:
+            now: Timestamp of the equity history points (defaults to now)
+
+        Returns:
+            bool: True if the file was written
+        """
+        if self.broker_accounts is None:
+            return False
+
+        # Ensure output directory exists
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            print(f"Created directory: {output_dir}")
+
+        if now is None:
+            now = datetime.datetime.now()
+        broker = self._broker_section()
+        total_value = broker["total_value"]
+        total_cash_all = broker["cash"]
+
+        # --- Virtual Accounts ---
+        virtual_accounts_data = []
         try:
-            target_acc_data = None
-            target_id = config.get("real_account_id", "8119599511")
-            for ad in accounts_data:
-                if target_id in ad['name']:
-                    target_acc_data = ad
-                    break
-            if not target_acc_data and accounts_data:
-                target_acc_data = accounts_data[0]
-
-            if target_acc_data and "strategies" in config:
-                stock_value_map = {}
-                stock_cost_map = {}
-                stock_pnl_map = {}
-                for h in holdings_list:
-                    code = h.get('symbol', '')
-                    stock_value_map[code] = h['value']
-                    stock_cost_map[code] = h['avg_price'] * h['quantity']
-                    stock_pnl_map[code] = h['pnl']
-
-                total_capital = config.get("total_capital", target_acc_data.get('total_value', 0))
-
-                for strategy in config["strategies"]:
-                    s_id = strategy["id"]
-                    s_alloc = strategy["total_allocation_percent"]
-                    stock_code = strategy.get("stock_code", "")
-                    strategy_capital = total_capital * s_alloc
-                    actual_stock_value = stock_value_map.get(stock_code, 0)
-                    actual_stock_cost = stock_cost_map.get(stock_code, 0)
-                    actual_stock_pnl = stock_pnl_map.get(stock_code, 0)
-                    strategy_cash = strategy_capital - actual_stock_cost
-
-                    for acc in strategy["accounts"]:
-                        ratio = acc["ratio"]
-                        suffix = acc["suffix"]
-                        korean_name = stock_name_map.get(stock_code, s_id)
-                        display_name = f"{korean_name}_{suffix}"
-                        v_equity = int(actual_stock_value * ratio)
-                        v_cash = int(strategy_cash * ratio)
-                        v_pnl = int(actual_stock_pnl * ratio)
-                        v_val = v_cash + v_equity
-
-                        virtual_accounts_data.append({
-                            "name": display_name,
-                            "real_account_ref": target_acc_data['name'],
-                            "allocation_ratio": ratio * s_alloc,
-                            "total_value": v_val,
-                            "cash": v_cash,
-                            "equity": v_equity,
-                            "total_pnl": v_pnl,
-                            "sector": strategy.get("sector", "Unknown")
-                        })
-
+            if self.accounts:
+                virtual_accounts_data = self._virtual_rows(broker)
+            elif self.config:
+                virtual_accounts_data = self._fallback_rows(broker)
         except Exception as e:
             print(f"Error processing virtual accounts: {e}")
 
-    # Add realized/unrealized P&L totals to summary
-    # Realized P&L: sum from virtual account sell history
-    total_realized = sum(va.get("realized_pnl", 0) for va in virtual_accounts_data)
-    # Unrealized P&L: derive from total return - realized to ensure consistency
-    # (total_return = unrealized + realized)
-    total_unrealized = total_pnl_all - total_realized
-    summary_obj["realized_pnl"] = total_realized
-    summary_obj["unrealized_pnl"] = total_unrealized
-
-    # Final Structure
-    final_json = {
-        "summary": summary_obj,
-        "history": history,
-        "holdings": holdings_list,
-        "accounts": accounts_data,
-        "virtual_accounts": virtual_accounts_data
-    }
-
-    # Save
-    # print(f"[DEBUG] Saving to: {PORTFOLIO_FILE}")
-    # print(f"[DEBUG] Saving {len(final_json.get('history', []))} history entries")
-    with open(PORTFOLIO_FILE, "w", encoding="utf-8") as f:
-        json.dump(final_json, f, ensure_ascii=False, indent=2)
-
-    print(f"Successfully generated {PORTFOLIO_FILE}")
-    # Don't print the entire JSON to reduce log spam
-    # print(json.dumps(final_json, indent=2, ensure_ascii=False))
-    return True
+        prev_value = self._update_history(now, total_value, broker, virtual_accounts_data)
+
+        # Sector / strategy / LEADER-FOLLOWER roll-ups (pandas is only loaded here, in the worker)
+        rollups = {}
+        try:
+            from portfolio_rollups import compute_rollups
+            rollups = compute_rollups(virtual_accounts_data, broker["holdings"])
+        except Exception as e:
+            print(f"Error computing roll-ups: {e}")
+
+        # Calculate Global Summaries
+        total_capital = self.config.get("total_capital", 100000000)
+        total_pnl_all = total_value - total_capital
+
+        # Daily P&L from history (today vs previous day)
+        daily_pnl_all = 0
+        daily_return = 0.0
+        if prev_value is not None and prev_value > 0:
+            daily_pnl_all = total_value - prev_value
+            daily_return = round((daily_pnl_all / prev_value) * 100, 2)
+
+        if total_value > 0:
+            cash_percent = round((total_cash_all / total_value) * 100, 2)
+            total_rate = round((total_pnl_all / total_capital) * 100, 2)
+        else:
+            cash_percent = 0.0
+            total_rate = 0.0
+
+        # Realized P&L: sum from virtual account sell history
+        total_realized = sum(va.get("realized_pnl", 0) for va in virtual_accounts_data)
+
+        summary_obj = {
+            "total_value": total_value,
+            "daily_pnl": daily_pnl_all,
+            "daily_return": daily_return,
+            "total_pnl": total_pnl_all,
+            "total_return": total_rate,
+            "cash": total_cash_all,
+            "cash_percent": cash_percent,
+            "realized_pnl": total_realized,
+            # Unrealized P&L: derived from total return - realized to ensure consistency
+            "unrealized_pnl": total_pnl_all - total_realized
+        }
+
+        final_json = {
+            "summary": summary_obj,
+            # Daily total (kept for existing dashboard consumers)
+            "history": [{"date": day, "value": value} for day, value in self._history.total.daily],
+            "holdings": broker["holdings"],
+            "accounts": broker["accounts"],
+            "virtual_accounts": virtual_accounts_data,
+            "rollups": rollups,
+            "equity_history": self._history.to_dict()
+        }
+
+        if self._delta_writer() is not None:
+            written = self._delta.write(final_json)
+            if not written:
+                print("Portfolio unchanged; skipping write.")
+                return False
+            kind = "base" if not self._delta.patches else "patch"
+            print(f"Portfolio {kind} #{self._delta.seq} written ({written:,} bytes)")
+            return True
+
+        # Compact: the equity history holds a few hundred points per account
+        output = json.dumps(final_json, ensure_ascii=False, separators=(",", ":"))
+        if self._last_output is None and os.path.exists(self.output_path):
+            with open(self.output_path, "r", encoding="utf-8") as f:
+                self._last_output = f.read()
+        if output == self._last_output:
+            print("Portfolio unchanged; skipping write.")
+            return False
+
+        tmp_path = self.output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(output)
+        os.replace(tmp_path, self.output_path)
+        self._last_output = output
+
+        print(f"Successfully generated {self.output_path}")
+        return True
+
+    def publish_paths(self):
+        """Files (and directories) a publisher has to push for the current output mode (manifest last)."""
+        if self.config.get("dashboard", {}).get("output_mode", "full") != "delta":
+            return [self.output_path]
+        output_dir = os.path.dirname(self.output_path)
+        return [os.path.join(output_dir, name) for name in (BASE_FILE, PATCH_DIR, MANIFEST_FILE)]
+
 
 def main():
+    # Qt / Kiwoom are only needed for standalone runs; the dashboard worker process imports this module without them
+    from PyQt5.QtWidgets import QApplication
+    from kiwoom_api import Kiwoom
+
     app = QApplication(sys.argv)
     kiwoom = Kiwoom()
     print("Connecting to Kiwoom API...")
@@ -1,96 +1,259 @@
 import subprocess
 import os
+import shutil
 import sys
 from datetime import datetime
 
+from publishers import content_hash as hash_paths, mirror
+
 class GitHubSync:
     """
     Utility class to sync portfolio.json to GitHub repository.
     Assumes the repository is already initialized and has a remote configured.
+
+    With a `worktree_path` the published files are copied into a separate git
+    worktree (checked out on `branch`) and committed there, so the trader's own
+    checkout, index and working directory are never touched. Every git command
+    runs with `git -C <dir>`; the process working directory is never changed.
+
+    The publish branch is created as an orphan (data files only) and, with
+    `squash_every`, collapsed back to a single commit once it holds that many
+    commits, then force-pushed, so the branch never grows with the history of
+    every refresh.
     """
     
-    def __init__(self, repo_path=None, dashboard_repo_path=None):
+    def __init__(self, repo_path=None, dashboard_repo_path=None, worktree_path=None,
+                 branch="dashboard-data", remote="origin", squash_every=None):
         """
         Initialize GitHub sync utility.
         
         Args:
             repo_path: Path to the kiwoom_stock_trading repository (current directory)
             dashboard_repo_path: Path to the dashboard repository (if different)
+            worktree_path: Dedicated worktree to publish from (None: commit in repo_path)
+            branch: Branch checked out in the worktree
+            remote: Remote to push to
+            squash_every: Squash the publish branch once it has this many commits (None: never)
         """
-        self.repo_path = repo_path or os.getcwd()
+        self.repo_path = os.path.abspath(repo_path or os.getcwd())
         self.dashboard_repo_path = dashboard_repo_path
-        
-    def sync_portfolio(self, portfolio_file="outputs/portfolio.json", commit_message=None):
+        self.worktree_path = os.path.abspath(worktree_path) if worktree_path else None
+        self.branch = branch
+        self.remote = remote
+        self._last_hash = None      # Content hash of the last committed files
+        self._push_pending = False  # A commit exists that has not been pushed yet
+        self.squash_every = squash_every
+        self._commits = None        # Commits on the publish branch (counted once, then tracked)
+        self._force_push = False    # The branch was rewritten by a squash
+
+    def _git(self, *args, cwd=None):
+        return subprocess.run(["git", "-C", cwd or self.repo_path] + list(args),
+                              capture_output=True, text=True)
+
+    def ensure_worktree(self):
+        """
+        Create the publish worktree if it does not exist yet.
+
+        Returns:
+            bool: True if the worktree is ready
+        """
+        if os.path.exists(os.path.join(self.worktree_path, ".git")):
+            return True
+
+        if self._git("rev-parse", "--verify", "--quiet", f"refs/heads/{self.branch}").returncode == 0:
+            args = [self.worktree_path, self.branch]
+        elif self._git("rev-parse", "--verify", "--quiet",
+                       f"refs/remotes/{self.remote}/{self.branch}").returncode == 0:
+            args = ["-b", self.branch, self.worktree_path, f"{self.remote}/{self.branch}"]
+        else:
+            return self._add_orphan_worktree()
+
+        result = self._git("worktree", "add", *args)
+        if result.returncode != 0:
+            print(f"WARNING: Git worktree add failed: {result.stderr}")
+            return False
+        print(f"[OK] Publish worktree created: {self.worktree_path} ({self.branch})")
+        return True
+
+    def _add_orphan_worktree(self):
+        """New publish branch without any code history: an empty tree the data is added to."""
+        result = self._git("worktree", "add", "--detach", self.worktree_path, "HEAD")
+        if result.returncode != 0:
+            print(f"WARNING: Git worktree add failed: {result.stderr}")
+            return False
+        for args in (["checkout", "--orphan", self.branch], ["rm", "-r", "-q", "-f", "--ignore-unmatch", "."]):
+            result = self._git(*args, cwd=self.worktree_path)
+            if result.returncode != 0:
+                print(f"WARNING: Git {args[0]} failed in publish worktree: {result.stderr}")
+                return False
+        self._commits = 0
+        print(f"[OK] Publish worktree created: {self.worktree_path} ({self.branch})")
+        return True
+
+    def _push(self, cwd):
+        args = ["push", self.remote, self.branch] if self.worktree_path else ["push"]
+        if self._force_push:
+            args.insert(1, "--force")
+        push_result = self._git(*args, cwd=cwd)
+        if push_result.returncode != 0:
+            print(f"WARNING: Git push failed: {push_result.stderr}")
+            return False
+        self._push_pending = False
+        self._force_push = False
+        return True
+
+    @staticmethod
+    def _has_files(path):
+        if os.path.isfile(path):
+            return True
+        return os.path.isdir(path) and any(files for _, _, files in os.walk(path))
+
+    def _pathspec(self, work_dir, paths, include_tracked=True):
+        """
+        The subset of `paths` git can match: present on disk (a file, or a directory
+        holding at least one file) or, with `include_tracked`, still tracked in the index
+        (e.g. a patch directory whose files were all deleted). An unmatched pathspec
+        makes git add / commit fail.
+        """
+        present = [p for p in paths if self._has_files(os.path.join(work_dir, p))]
+        missing = [p for p in paths if p not in present]
+        if missing and include_tracked:
+            result = self._git("ls-files", "--", *missing, cwd=work_dir)
+            tracked = result.stdout.splitlines() if result.returncode == 0 else []
+            for path in missing:
+                prefix = path.replace(os.sep, "/").rstrip("/")
+                if any(t == prefix or t.startswith(prefix + "/") for t in tracked):
+                    present.append(path)
+        return present
+
+    def squash(self, paths, message=None):
+        """
+        Replace the publish branch history with one root commit holding only `paths`.
+
+        The next push is forced; the old commits become unreachable on the remote.
+
+        Returns:
+            bool: True if the branch was squashed
+        """
+        work_dir = self.worktree_path
+        if not message:
+            message = f"Portfolio data snapshot - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        # The index is emptied first, so only what exists on disk can be matched
+        pathspec = self._pathspec(work_dir, paths, include_tracked=False)
+        if not pathspec:
+            return False
+        steps = [("rm", "-r", "-q", "--cached", "--ignore-unmatch", "."),
+                 ("add", "-A", "--") + tuple(pathspec),
+                 ("write-tree",)]
+        for args in steps:
+            result = self._git(*args, cwd=work_dir)
+            if result.returncode != 0:
+                break
+        else:
+            result = self._git("commit-tree", result.stdout.strip(), "-m", message, cwd=work_dir)
+            if result.returncode == 0:
+                result = self._git("reset", "--soft", result.stdout.strip(), cwd=work_dir)
+        if result.returncode != 0:
+            print(f"WARNING: Git squash failed: {result.stderr}")
+            self._git("reset", "-q", cwd=work_dir)  # Restore the index from HEAD
+            return False
+
+        print(f"[OK] Squashed {self.branch} to a single commit ({self._commits} before)")
+        self._commits = 1
+        self._force_push = True
+        self._push_pending = True
+        return True
+
+    def _count_commit(self, work_dir):
+        if self._commits is None:
+            result = self._git("rev-list", "--count", "HEAD", cwd=work_dir)
+            self._commits = int(result.stdout.strip()) if result.returncode == 0 else 1
+        else:
+            self._commits += 1
+
+    def sync_portfolio(self, portfolio_file="outputs/portfolio.json", commit_message=None, digest=None):
         """
         Sync portfolio.json to GitHub.
+
+        Nothing is spawned when the content hash matches the last commit and no push
+        is outstanding; a push that failed is retried by the next call even if the
+        files did not change in between.
         
         Args:
-            portfolio_file: Relative path to portfolio.json
+            portfolio_file: Path to portfolio.json, or a list of files / directories
+                            (delta output: base, manifest and patch directory)
             commit_message: Custom commit message (optional)
+            digest: Precomputed content hash of the files (optional)
             
         Returns:
             bool: True if sync successful, False otherwise
         """
         try:
+            paths = [portfolio_file] if isinstance(portfolio_file, str) else list(portfolio_file)
+            # Repository-relative, so the same paths address the publish worktree
+            paths = [os.path.relpath(p, self.repo_path) if os.path.isabs(p) else p for p in paths]
+
             # Check if file exists
-            full_path = os.path.join(self.repo_path, portfolio_file)
+            full_path = os.path.join(self.repo_path, paths[0])
             if not os.path.exists(full_path):
                 print(f"WARNING: Portfolio file not found: {full_path}")
                 return False
+
+            content_hash = digest or hash_paths(self.repo_path, paths)
+            if content_hash == self._last_hash:
+                if not self._push_pending:
+                    print("INFO: Portfolio content unchanged; nothing to publish")
+                    return True
+                return self._push(self.worktree_path or self.repo_path)
+
+            work_dir = self.repo_path
+            if self.worktree_path:
+                if not self.ensure_worktree():
+                    return False
+                work_dir = self.worktree_path
+                for path in paths:
+                    mirror(os.path.join(self.repo_path, path), os.path.join(work_dir, path))
             
             # Generate commit message
             if not commit_message:
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 commit_message = f"Auto-update portfolio.json - {timestamp}"
             
-            # Git operations
-            os.chdir(self.repo_path)
-            
-            # Add the file
-            result = subprocess.run(
-                ["git", "add", portfolio_file],
-                capture_output=True,
-                text=True
-            )
+            # Add the files (-A also stages deleted patch files)
+            paths = self._pathspec(work_dir, paths)
+            result = self._git("add", "-A", "--", *paths, cwd=work_dir)
             
             if result.returncode != 0:
                 print(f"WARNING: Git add failed: {result.stderr}")
                 return False
             
-            # Check if there are changes to commit
-            status_result = subprocess.run(
-                ["git", "status", "--porcelain", portfolio_file],
-                capture_output=True,
-                text=True
-            )
+            # Check if there are changes to commit (exit code 1 = staged changes)
+            diff_result = self._git("diff", "--cached", "--quiet", "--", *paths, cwd=work_dir)
             
-            if not status_result.stdout.strip():
+            if diff_result.returncode == 0:
                 print("INFO: No changes to commit in portfolio.json")
-                return True
+                self._last_hash = content_hash
+                return self._push(work_dir) if self._push_pending else True
             
             # Commit
-            commit_result = subprocess.run(
-                ["git", "commit", "-m", commit_message],
-                capture_output=True,
-                text=True
-            )
+            commit_result = self._git("commit", "-m", commit_message, "--", *paths, cwd=work_dir)
             
             if commit_result.returncode != 0:
                 print(f"WARNING: Git commit failed: {commit_result.stderr}")
                 return False
+            self._last_hash = content_hash
+            self._push_pending = True
+
+            if self.worktree_path and self.squash_every:
+                self._count_commit(work_dir)
+                if self._commits > self.squash_every:
+                    self.squash(paths)
             
             # Push
-            push_result = subprocess.run(
-                ["git", "push"],
-                capture_output=True,
-                text=True
-            )
-            
-            if push_result.returncode != 0:
-                print(f"WARNING: Git push failed: {push_result.stderr}")
+            if not self._push(work_dir):
                 return False
             
-            print(f"[OK] Successfully synced {portfolio_file} to GitHub")
+            print(f"[OK] Successfully synced {', '.join(paths)} to GitHub")
             return True
             
         except Exception as e:
@@ -113,8 +276,6 @@ class GitHubSync:
             return False
         
         try:
-            import shutil
-            
             # Source file
             source = os.path.join(self.repo_path, portfolio_file)
             if not os.path.exists(source):
@@ -132,28 +293,23 @@ class GitHubSync:
             shutil.copy2(source, dest)
             print(f"[OK] Copied {source} to {dest}")
             
-            # Git operations in dashboard repo
-            os.chdir(self.dashboard_repo_path)
-            
+            # Git operations in dashboard repo (git -C: the working directory is left alone)
+            repo = self.dashboard_repo_path
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             commit_message = f"Auto-update portfolio data - {timestamp}"
             
             # Add, commit, push
-            subprocess.run(["git", "add", "src/data/portfolio.json"], check=True)
+            self._git("add", "src/data/portfolio.json", cwd=repo).check_returncode()
             
             # Check if there are changes
-            status_result = subprocess.run(
-                ["git", "status", "--porcelain", "src/data/portfolio.json"],
-                capture_output=True,
-                text=True
-            )
+            status_result = self._git("status", "--porcelain", "src/data/portfolio.json", cwd=repo)
             
             if not status_result.stdout.strip():
                 print("INFO: No changes to commit in dashboard repository")
                 return True
             
-            subprocess.run(["git", "commit", "-m", commit_message], check=True)
-            subprocess.run(["git", "push"], check=True)
+            self._git("commit", "-m", commit_message, cwd=repo).check_returncode()
+            self._git("push", cwd=repo).check_returncode()
             
             print(f"[OK] Successfully synced to dashboard repository")
             return True
@@ -161,10 +317,6 @@ class GitHubSync:
         except Exception as e:
             print(f"WARNING: Error syncing to dashboard repo: {e}")
             return False
-        finally:
-            # Return to original directory
-            os.chdir(self.repo_path)
-
 
 if __name__ == "__main__":
     # Test the sync functionality
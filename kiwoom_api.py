@@ -3,7 +3,7 @@ from PyQt5.QtWidgets import QApplication
 from PyQt5.QAxContainer import QAxWidget
 from PyQt5.QtCore import QEventLoop, QTimer
 import time
-import pandas as pd
+from metrics import registry as metrics
 
 class Kiwoom(QAxWidget):
     def __init__(self):
@@ -17,14 +17,21 @@ class Kiwoom(QAxWidget):
         self.OnReceiveTrData.connect(self._on_receive_tr_data)
         self.OnReceiveMsg.connect(self._on_receive_msg)
         self.OnReceiveChejanData.connect(self._on_receive_chejan_data)
+        self.OnReceiveRealData.connect(self._on_receive_real_data)
         
         self.tr_data = None
         self.remaining_data = False
         self.msg = ""
         self.expected_rqname = None
 
+        # Real-time prices (SetRealReg)
+        self.real_codes = set()
+        self.real_prices = {}           # code -> (price, epoch seconds of the tick)
+        self.real_price_listeners = []  # callback(code, price)
+
     def _on_timeout(self):
         print(f"⚠️  Timeout: Request {self.expected_rqname} timed out.")
+        metrics.inc("kiwoom_tr_timeouts_total", rqname=self.expected_rqname)
         if self.tr_event_loop.isRunning():
             self.tr_event_loop.exit()
 
@@ -64,8 +71,10 @@ class Kiwoom(QAxWidget):
         self.timer.start(5000) # 5 seconds timeout
         
         # print(f"DEBUG: Requesting {rqname} ({trcode})") 
-        self.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, trcode, next, screen_no)
-        self.tr_event_loop.exec_()
+        metrics.inc("kiwoom_tr_requests_total", trcode=trcode)
+        with metrics.timed("kiwoom_tr_latency_seconds", trcode=trcode):
+            self.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, trcode, next, screen_no)
+            self.tr_event_loop.exec_()
 
     def _on_receive_tr_data(self, screen_no, rqname, trcode, record_name, next, unused1, unused2, unused3, unused4):
         if next == '2':
@@ -97,6 +106,61 @@ class Kiwoom(QAxWidget):
         # gubun: 0 (Order/Exec), 1 (Balance)
         pass
 
+    # --- Real-time Data ---
+    REAL_SCREEN_BASE = 5000  # Screens 5000.. hold real-time registrations (max 100 codes each)
+
+    def set_real_reg(self, screen_no, codes, fids="10", opt_type="1"):
+        """
+        opt_type: "0" replaces the screen's registrations, "1" adds to them
+        fids: ";"-separated FIDs (10 = current price)
+        """
+        return self.dynamicCall("SetRealReg(QString, QString, QString, QString)",
+                                screen_no, ";".join(codes), fids, opt_type)
+
+    def set_real_remove(self, screen_no="ALL", code="ALL"):
+        self.dynamicCall("SetRealRemove(QString, QString)", screen_no, code)
+        if screen_no == "ALL":
+            self.real_codes.clear()
+
+    def subscribe_prices(self, codes):
+        """
+        Register real-time price ticks for codes that are not subscribed yet.
+
+        Returns:
+            int: Number of newly subscribed codes
+        """
+        by_screen = {}
+        for code in dict.fromkeys(codes):
+            if code in self.real_codes:
+                continue
+            screen = str(self.REAL_SCREEN_BASE + len(self.real_codes) // 100)
+            self.real_codes.add(code)
+            by_screen.setdefault(screen, []).append(code)
+        for screen, screen_codes in by_screen.items():
+            self.set_real_reg(screen, screen_codes, "10", "1")
+        return sum(len(c) for c in by_screen.values())
+
+    def _on_receive_real_data(self, code, real_type, real_data):
+        if real_type != "주식체결":
+            return
+        try:
+            price = abs(int(self.dynamicCall("GetCommRealData(QString, int)", code, 10).strip()))
+        except ValueError:
+            return
+        if price <= 0:
+            return
+        self.real_prices[code] = (price, time.time())
+        metrics.inc("kiwoom_real_ticks_total")
+        for listener in self.real_price_listeners:
+            listener(code, price)
+
+    def get_real_price(self, code, max_age=None):
+        """Latest real-time price for code, or None if none was received (within max_age seconds)."""
+        entry = self.real_prices.get(code)
+        if entry is None or (max_age is not None and time.time() - entry[1] > max_age):
+            return None
+        return entry[0]
+
     def get_comm_data(self, trcode, record_name, index, item_name):
         ret = self.dynamicCall("GetCommData(QString, QString, int, QString)", trcode, record_name, index, item_name)
         return ret.strip()
@@ -211,9 +275,11 @@ class Kiwoom(QAxWidget):
         
         if res == 0:
             print(f"Order Sent: { 'Buy' if order_type==1 else 'Sell' } {code} {qty}ea")
+            metrics.inc("kiwoom_orders_total", order_type=order_type, result="sent")
             return True
         else:
             print(f"Order Failed. Error: {res}")
+            metrics.inc("kiwoom_orders_total", order_type=order_type, result="failed")
             return False
 
 if __name__ == "__main__":
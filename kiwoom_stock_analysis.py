@@ -1,100 +1,26 @@
+import argparse
 import sys
 import time
 import pandas as pd
 import datetime
-import requests
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QAxContainer import QAxWidget
 from PyQt5.QtCore import QEventLoop
 
-# --- Naver Finance Scraper ---
-def get_financial_details_naver(code):
-    """
-    Scrapes financial ratios from Naver Finance for a given stock code.
-    Returns a dictionary with keys matching the criteria.
-    """
-    url = f"https://finance.naver.com/item/main.naver?code={code}"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    
-    try:
-        res = requests.get(url, headers=headers)
-        res.raise_for_status()
-        
-        dfs = pd.read_html(res.text)
-        
-        target_df = None
-        for df in dfs:
-            if df.shape[1] > 1 and '매출액' in str(df.iloc[:, 0].values):
-                target_df = df
-                break
-                
-        if target_df is None:
-            return None
-
-        target_df.set_index(target_df.columns[0], inplace=True)
-        
-        if isinstance(target_df.columns, pd.MultiIndex):
-            annual_cols = [c for c in target_df.columns if '최근 연간 실적' in c[0]]
-            if annual_cols:
-                target_col = annual_cols[-1] 
-            else:
-                 target_col = target_df.columns[2]
-        else:
-            target_col = target_df.columns[2]
-
-        def get_val_col(key, col_idx):
-            if col_idx is None: return 0.0
-            try:
-                matches = [idx for idx in target_df.index if key in str(idx)]
-                if not matches: return 0.0
-                val = target_df.loc[matches[0], col_idx]
-                if pd.isna(val) or str(val).strip() == '-': return 0.0
-                return float(val)
-            except: 
-                return 0.0
-        
-        if isinstance(target_df.columns, pd.MultiIndex):
-            annual_cols = [c for c in target_df.columns if '최근 연간 실적' in c[0]]
-            if len(annual_cols) >= 2:
-                curr_col = annual_cols[-1]
-                prev_col = annual_cols[-2]
-            else:
-                curr_col = annual_cols[-1]
-                prev_col = None
-        else:
-            curr_col = target_df.columns[2]
-            prev_col = target_df.columns[1]
-
-        sales_curr = get_val_col('매출액', curr_col)
-        sales_prev = get_val_col('매출액', prev_col)
-        sales_growth = ((sales_curr - sales_prev) / abs(sales_prev) * 100) if sales_prev != 0 else 0
-
-        net_curr = get_val_col('당기순이익', curr_col)
-        net_prev = get_val_col('당기순이익', prev_col)
-        net_growth = ((net_curr - net_prev) / abs(net_prev) * 100) if net_prev != 0 else 0
-
-        return {
-            'Debt_Ratio': get_val_col('부채비율', curr_col),
-            'Current_Ratio': get_val_col('유동비율', curr_col), 
-            'Reserve_Ratio': get_val_col('유보율', curr_col),
-            'Dividend_Yield': get_val_col('시가배당률', curr_col),
-            'ROA': get_val_col('ROA', curr_col),
-            'ROE': get_val_col('ROE', curr_col),
-            'Op_Margin': get_val_col('영업이익률', curr_col),
-            'Net_Margin': get_val_col('순이익률', curr_col),
-            'Sales_Growth': sales_growth,
-            'Net_Growth': net_growth,
-            'PER': get_val_col('PER', curr_col),
-            'PBR': get_val_col('PBR', curr_col),
-        }
-
-    except Exception:
-        return None
+from fundamentals_cache import FundamentalsCache
+from naver_scraper import NaverScraper, get_financial_details_naver
+from screener_store import ScreenerJournal
 
 # --- Main Script ---
 
+# Minimum spacing of Kiwoom TR requests. The baseline loop slept 0.5 s per stock on
+# top of the 0.2 s after each TR; scraping no longer paces the loop, so the TRs are
+# spaced here (Kiwoom throttles or disconnects clients that burst TRs for long).
+TR_INTERVAL_SEC = 0.7
+
+
 class Kiwoom(QAxWidget):
-    def __init__(self):
+    def __init__(self, tr_interval=TR_INTERVAL_SEC):
         super().__init__()
         self.setControl("KHOPENAPI.KHOpenAPICtrl.1")
         
@@ -106,6 +32,8 @@ class Kiwoom(QAxWidget):
         
         self.tr_data = None
         self.remaining_data = False
+        self.tr_interval = tr_interval
+        self._next_tr = 0.0  # Earliest time.monotonic() of the next TR
 
     def _on_event_connect(self, err_code):
         if err_code == 0:
@@ -137,7 +65,15 @@ class Kiwoom(QAxWidget):
     def set_input_value(self, id, value):
         self.dynamicCall("SetInputValue(QString, QString)", id, value)
 
+    def _pace_tr(self):
+        """Wait until at least tr_interval seconds have passed since the previous TR."""
+        now = time.monotonic()
+        if now < self._next_tr:
+            time.sleep(self._next_tr - now)
+        self._next_tr = max(now, self._next_tr) + self.tr_interval
+
     def comm_rq_data(self, rqname, trcode, next, screen_no):
+        self._pace_tr()
         self.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, trcode, next, screen_no)
         self.tr_event_loop.exec_()
 
@@ -335,9 +271,75 @@ def score_stock(basic, financial, technical):
 
     return score, checks
 
+# Final CSV layout (explicitly matches the order assumed by Score_Formula)
+RESULT_COLUMNS = ['Code', 'Name', 'Score', 'Price',
+                  'MarketCap(100M)', 'PER', 'PBR', 'ROE', 'PEG',
+                  'Debt_Ratio', 'Reserve_Ratio', 'Div_Yield',
+                  'Sales_Growth', 'Net_Growth',
+                  'Credit_Ratio', 'Current_Ratio', 'ROA', 'Op_Margin', 'Net_Margin',
+                  'Low_Diff(%)', 'High_Discount(%)', 'Foreign_Own', 'Score_Formula']
+RESULT_FILE = "kiwoom_analysis_parameters.csv"
+
+
+def score_formula(r):
+    """Excel formula recomputing the score of spreadsheet row `r`."""
+    # Columns Mapping (based on final order):
+    # A: Code, B: Name, C: Score, D: Price, E: MarketCap, F: PER, G: PBR, H: ROE, I: PEG, 
+    # J: Debt, K: Reserve, L: Div, M: Sales, N: Net_Gr, O: Credit, P: Current, Q: ROA, 
+    # R: Op, S: Net_M, T: Low_Diff, U: High_Dist, V: Foreign
+    return (f"=4 + IF(E{r}>=3000,1,0) + IF(T{r}<=10,1,0) + IF(U{r}>=30,1,0) + "
+            f"IF(AND(F{r}<=5,F{r}>0),1,0) + IF(AND(G{r}<=2,G{r}>0),1,0) + IF(AND(I{r}<=1,I{r}>0),1,0) + "
+            f"IF(H{r}>=5,1,0) + IF(Q{r}>=3,1,0) + IF(R{r}>=5,1,0) + IF(S{r}>=3,1,0) + "
+            f"IF(M{r}>=1,1,0) + IF(N{r}>=1,1,0) + IF(J{r}<=100,1,0) + IF(P{r}>=200,1,0) + "
+            f"IF(K{r}>=200,1,0) + IF(L{r}>=3,1,0) + IF(V{r}>=30,1,0)")
+
+
+def finalize_results(journal, filename=RESULT_FILE):
+    """
+    Build the final CSV from the scan journal: ordering (score, then code), column
+    layout and the per-row score formulas.
+
+    Returns:
+        int: Number of rows written
+    """
+    rows = journal.rows()
+    if not rows:
+        print("No results found.")
+        return 0
+
+    df = pd.DataFrame(rows)
+    df = df.sort_values(['Score', 'Code'], ascending=[False, True], kind='mergesort').reset_index(drop=True)
+    df['Score_Formula'] = [score_formula(r) for r in range(2, len(df) + 2)]  # Excel row (header is 1)
+
+    # Reorder columns
+    existing_cols = [c for c in RESULT_COLUMNS if c in df.columns]
+    remaining_cols = [c for c in df.columns if c not in existing_cols]
+    df = df[existing_cols + remaining_cols]
+
+    print("\nTOP RESULTS (Sample):")
+    # Show some key params
+    print(df[['Name', 'Score', 'PER', 'ROE', 'Debt_Ratio']].head(10))
+
+    df.to_csv(filename, index=False, encoding='utf-8-sig')
+    print(f"Saved detailed parameters to {filename}")
+    return len(df)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Full-market screener (Kiwoom + Naver financials)")
+    parser.add_argument("--fresh", action="store_true", help="Discard an unfinished scan and rescan everything")
+    parser.add_argument("--finalize", action="store_true", help="Only rebuild the CSV from the scan journal")
+    parser.add_argument("--tr-interval", type=float, default=TR_INTERVAL_SEC,
+                        help="Minimum seconds between Kiwoom TR requests")
+    args = parser.parse_args()
+
+    journal = ScreenerJournal()
+    if args.finalize:
+        finalize_results(journal)
+        return
+
     app = QApplication(sys.argv)
-    kiwoom = Kiwoom()
+    kiwoom = Kiwoom(tr_interval=args.tr_interval)
     kiwoom.comm_connect()
     
     print("Fetching stock lists...")
@@ -347,132 +349,117 @@ def main():
     print(f"Total Stocks: {len(all_codes)}")
     
     limit = len(all_codes) # 20
-    print(f"Scanning first {limit} stocks...")
-    
-    results = []
-    
-    processed = 0
+    targets = []
     for code in all_codes:
-        if processed >= limit:
+        if len(targets) >= limit:
             break
-            
         name = kiwoom.get_master_code_name(code)
-        if not name or "스팩" in name: 
-            continue
-            
-        print(f"[{processed+1}/{limit}] Analyzing {name} ({code})...", end="")
-        
-        # 1. Kiwoom Basic Info
-        basic = kiwoom.get_basic_info(code)
-        if not basic:
-            print(" -> Skip (No Data)")
+        if not name or "스팩" in name:
             continue
-
-        # 2. Naver Financials (Scrape)
-        financial = get_financial_details_naver(code)
-        if not financial:
-            print(" -> Skip (Scrape Fail)")
-            continue
-            
-        # 3. Score
-        score, detailed_checks = score_stock(basic, financial, None)
-        
-        print(f" -> Score: {score}/21")
-        
-        # Derived values
-        peg = 0
-        per = basic.get('PER', 0)
-        net_growth = financial.get('Net_Growth', 0)
-        if net_growth > 0 and per > 0:
-            peg = per / net_growth
-            
-        low_diff = 100 # Default to high value so it fails <= 10 check if missing
-        if basic.get('Low_250', 0) > 0:
-            low_diff = (basic['Price'] - basic['Low_250']) / basic['Low_250'] * 100
-            
-        high_diff = 0
-        if basic.get('High_250', 0) > 0:
-            high_diff = (basic['High_250'] - basic['Price']) / basic['High_250'] * 100
-
-        # Excel Formula for Score
-        # Columns Mapping (based on final order):
-        # A: Code, B: Name, C: Score, D: Price, E: MarketCap, F: PER, G: PBR, H: ROE, I: PEG, 
-        # J: Debt, K: Reserve, L: Div, M: Sales, N: Net_Gr, O: Credit, P: Current, Q: ROA, 
-        # R: Op, S: Net_M, T: Low_Diff, U: High_Dist, V: Foreign
-        
-        r = processed + 2 # Excel Row Number (Header is 1)
-        
-        formula = (f"=4 + IF(E{r}>=3000,1,0) + IF(T{r}<=10,1,0) + IF(U{r}>=30,1,0) + "
-                   f"IF(AND(F{r}<=5,F{r}>0),1,0) + IF(AND(G{r}<=2,G{r}>0),1,0) + IF(AND(I{r}<=1,I{r}>0),1,0) + "
-                   f"IF(H{r}>=5,1,0) + IF(Q{r}>=3,1,0) + IF(R{r}>=5,1,0) + IF(S{r}>=3,1,0) + "
-                   f"IF(M{r}>=1,1,0) + IF(N{r}>=1,1,0) + IF(J{r}<=100,1,0) + IF(P{r}>=200,1,0) + "
-                   f"IF(K{r}>=200,1,0) + IF(L{r}>=3,1,0) + IF(V{r}>=30,1,0)")
-
-        results.append({
-            'Code': code,
-            'Name': name,
-            'Score': score,
-            'Price': basic.get('Price'),
-            
-            # --- 1. Size & Stability ---
-            'MarketCap(100M)': basic.get('MarketCap', 0),
-            'Credit_Ratio': basic.get('Credit_Ratio', 0),
-            'Debt_Ratio': financial.get('Debt_Ratio', 0),
-            'Current_Ratio': financial.get('Current_Ratio', 0),
-            'Reserve_Ratio': financial.get('Reserve_Ratio', 0),
-            
-            # --- 2. Valuation ---
-            'PER': per,
-            'PBR': basic.get('PBR', 0),
-            'PEG': round(peg, 2),
-            
-            # --- 3. Profitability ---
-            'ROE': financial.get('ROE', basic.get('ROE', 0)),
-            'ROA': financial.get('ROA', 0),
-            'Op_Margin': financial.get('Op_Margin', 0),
-            'Net_Margin': financial.get('Net_Margin', 0),
-            
-            # --- 4. Growth ---
-            'Sales_Growth': financial.get('Sales_Growth', 0),
-            'Net_Growth': net_growth,
-            'Div_Yield': financial.get('Dividend_Yield', 0),
-            
-            # --- 5. Price & Foreign ---
-            'Low_Diff(%)': round(low_diff, 1),
-            'High_Discount(%)': round(high_diff, 1),
-            'Foreign_Own': basic.get('Foreign_Own', 0),
-            
-            'Score_Formula': formula
-        })
-        
-        processed += 1
-        time.sleep(0.5) 
-        
-    if results:
-        df = pd.DataFrame(results)
-        
-        # Define column order (Explicitly match the order assumed by Score_Formula)
-        cols = ['Code', 'Name', 'Score', 'Price', 
-                'MarketCap(100M)', 'PER', 'PBR', 'ROE', 'PEG',
-                'Debt_Ratio', 'Reserve_Ratio', 'Div_Yield', 
-                'Sales_Growth', 'Net_Growth',
-                'Credit_Ratio', 'Current_Ratio', 'ROA', 'Op_Margin', 'Net_Margin',
-                'Low_Diff(%)', 'High_Discount(%)', 'Foreign_Own', 'Score_Formula']
-        
-        # Reorder columns
-        existing_cols = [c for c in cols if c in df.columns]
-        remaining_cols = [c for c in df.columns if c not in existing_cols]
-        df = df[existing_cols + remaining_cols]
-        
-        print("\nTOP RESULTS (Sample):")
-        # Show some key params
-        print(df[['Name', 'Score', 'PER', 'ROE', 'Debt_Ratio']].head(10))
-        
-        filename = "kiwoom_analysis_parameters.csv"
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
-        print(f"Saved detailed parameters to {filename}")
-    else:
-        print("No results found.")
+        targets.append((code, name))
+    names = dict(targets)
+
+    # Every analyzed code is appended to the journal right away; a rerun after an
+    # interrupted scan resumes after the codes that already have a result
+    if journal.start(fresh=args.fresh):
+        print(f"Resuming scan of {journal.scan_date}: {len(journal.done)} done, "
+              f"{len(journal.failed)} failed (retried)")
+    remaining = [(code, name) for code, name in targets if code not in journal.done]
+
+    # Naver pages are fetched concurrently (bounded pool, rate limited per host) while
+    # this loop runs the Kiwoom TRs for whatever has been scraped so far. Fundamentals
+    # scraped on earlier runs are reused until a new reporting period is likely.
+    cache = FundamentalsCache()
+    scraper = NaverScraper(workers=8, rate_per_sec=5.0, cache=cache)
+    for code, _ in remaining:
+        scraper.submit(code)
+    print(f"Scanning {len(remaining)} of {len(targets)} stocks ({scraper.workers} scraper threads)...")
+    
+    done = len(targets) - len(remaining)
+    try:
+        while scraper.pending:
+            code, financial = scraper.get()
+            name = names[code]
+            done += 1
+
+            print(f"[{done}/{len(targets)}] Analyzing {name} ({code})...", end="")
+
+            # 1. Naver Financials (Scrape, already done by the scraper stage)
+            if not financial:
+                print(" -> Skip (Scrape Fail)")
+                journal.record(code, "scrape_fail")
+                continue
+
+            # 2. Kiwoom Basic Info
+            basic = kiwoom.get_basic_info(code)
+            if not basic:
+                print(" -> Skip (No Data)")
+                journal.record(code, "no_data")
+                continue
+
+            # 3. Score
+            score, detailed_checks = score_stock(basic, financial, None)
+
+            print(f" -> Score: {score}/21")
+
+            # Derived values
+            peg = 0
+            per = basic.get('PER', 0)
+            net_growth = financial.get('Net_Growth', 0)
+            if net_growth > 0 and per > 0:
+                peg = per / net_growth
+
+            low_diff = 100 # Default to high value so it fails <= 10 check if missing
+            if basic.get('Low_250', 0) > 0:
+                low_diff = (basic['Price'] - basic['Low_250']) / basic['Low_250'] * 100
+
+            high_diff = 0
+            if basic.get('High_250', 0) > 0:
+                high_diff = (basic['High_250'] - basic['Price']) / basic['High_250'] * 100
+
+            # Score_Formula depends on the final row order; finalize_results adds it
+            journal.record(code, "ok", {
+                'Code': code,
+                'Name': name,
+                'Score': score,
+                'Price': basic.get('Price'),
+
+                # --- 1. Size & Stability ---
+                'MarketCap(100M)': basic.get('MarketCap', 0),
+                'Credit_Ratio': basic.get('Credit_Ratio', 0),
+                'Debt_Ratio': financial.get('Debt_Ratio', 0),
+                'Current_Ratio': financial.get('Current_Ratio', 0),
+                'Reserve_Ratio': financial.get('Reserve_Ratio', 0),
+
+                # --- 2. Valuation ---
+                'PER': per,
+                'PBR': basic.get('PBR', 0),
+                'PEG': round(peg, 2),
+
+                # --- 3. Profitability ---
+                'ROE': financial.get('ROE', basic.get('ROE', 0)),
+                'ROA': financial.get('ROA', 0),
+                'Op_Margin': financial.get('Op_Margin', 0),
+                'Net_Margin': financial.get('Net_Margin', 0),
+
+                # --- 4. Growth ---
+                'Sales_Growth': financial.get('Sales_Growth', 0),
+                'Net_Growth': net_growth,
+                'Div_Yield': financial.get('Dividend_Yield', 0),
+
+                # --- 5. Price & Foreign ---
+                'Low_Diff(%)': round(low_diff, 1),
+                'High_Discount(%)': round(high_diff, 1),
+                'Foreign_Own': basic.get('Foreign_Own', 0),
+            })
+        journal.complete()
+    finally:
+        journal.close()
+        scraper.close()
+        cache.save()
+    print(f"Fundamentals cache: {cache.hits} hits, {cache.misses} fetched")
+
+    finalize_results(journal)
 
     sys.exit()
 
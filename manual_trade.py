@@ -15,7 +15,7 @@ import shutil
 import sys
 from datetime import datetime
 
-from account_manager import Account, load_accounts, save_accounts
+from account_manager import Account, history_dir_for, load_accounts, save_accounts
 
 STATE_FILE = "trade_state.json"
 
@@ -71,11 +71,28 @@ def print_account_summary(acc):
         print(f"  Holding    : (none)")
 
 
+def print_account_history(acc, limit=20):
+    # Pages in the closed trades and snapshots from the history store
+    history = acc.history
+    print(f"  Open Lots  : {len(acc.open_lots)}")
+    print(f"  Trades     : {len(history)} (showing last {min(limit, len(history))})")
+    for t in history[-limit:]:
+        status = f" [{t['status']}]" if t.get("status") else ""
+        pnl = f" pnl={t['pnl']:,.0f}" if "pnl" in t else ""
+        print(f"    {t.get('time', '?')}  {t['action']:<4} {t['code']}  qty={t['qty']}  price={t['price']:,}{pnl}{status}")
+    perf_log = acc.performance_log
+    if perf_log:
+        last = perf_log[-1]
+        print(f"  Snapshots  : {len(perf_log)} (last {last['time']}: value={last['total_value']:,.0f}, pnl={last['pnl_rate']:.2f}%)")
+
+
 def list_accounts(accounts_map, filter_id=None):
     for acc_id, acc in sorted(accounts_map.items()):
         if filter_id and acc_id != filter_id:
             continue
         print_account_summary(acc)
+        if filter_id:
+            print_account_history(acc)
         print()
 
 
@@ -109,10 +126,18 @@ def execute_manual_trade(accounts_map, account_id, action, code, price, qty):
         print("Aborted.")
         sys.exit(0)
 
-    # Backup state file
+    # Backup state file and its cold history (both are rewritten on save)
     backup_path = STATE_FILE + ".bak"
     shutil.copy2(STATE_FILE, backup_path)
-    print(f"Backup saved to {backup_path}")
+    history_dir = history_dir_for(STATE_FILE)
+    if os.path.isdir(history_dir):
+        history_backup = history_dir + ".bak"
+        if os.path.exists(history_backup):
+            shutil.rmtree(history_backup)
+        shutil.copytree(history_dir, history_backup)
+        print(f"Backup saved to {backup_path} and {history_backup}")
+    else:
+        print(f"Backup saved to {backup_path}")
 
     # Execute
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
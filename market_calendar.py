@@ -0,0 +1,162 @@
+from datetime import date, datetime, time as dtime, timedelta
+
+# KRX market holidays (weekdays only; weekends are always closed).
+# Check against the KRX annual holiday notice and add new years / ad-hoc closures
+# (e.g. election days) via config "market_calendar": {"extra_holidays": [...]}.
+KRX_HOLIDAYS = {
+    # 2025
+    "2025-01-01", "2025-01-27", "2025-01-28", "2025-01-29", "2025-01-30",
+    "2025-03-03", "2025-05-01", "2025-05-05", "2025-05-06", "2025-06-03",
+    "2025-06-06", "2025-08-15", "2025-10-03", "2025-10-06", "2025-10-07",
+    "2025-10-08", "2025-10-09", "2025-12-25", "2025-12-31",
+    # 2026
+    "2026-01-01", "2026-02-16", "2026-02-17", "2026-02-18", "2026-03-02",
+    "2026-05-01", "2026-05-05", "2026-05-25", "2026-06-03", "2026-08-17",
+    "2026-09-24", "2026-09-25", "2026-09-28", "2026-10-05", "2026-10-09",
+    "2026-12-25", "2026-12-31",
+    # 2027
+    "2027-01-01", "2027-02-08", "2027-02-09", "2027-03-01", "2027-05-05",
+    "2027-05-13", "2027-08-16", "2027-09-14", "2027-09-15", "2027-09-16",
+    "2027-10-04", "2027-10-11", "2027-12-27", "2027-12-31",
+}
+
+# Days with a shifted regular session: date -> (open, close).
+# The first trading day of each year opens at 10:00 (handled automatically);
+# on the college entrance exam (CSAT) day the whole schedule moves one hour later.
+KRX_SPECIAL_SESSIONS = {
+    "2025-11-13": ("10:00", "16:30"),
+    "2026-11-19": ("10:00", "16:30"),
+}
+
+REGULAR_OPEN = dtime(9, 0)
+REGULAR_CLOSE = dtime(15, 30)
+PRE_OPEN_MINUTES = 30          # Opening single-price auction before the open
+AFTER_HOURS_START_MINUTES = 10 # After-hours closing-price trading starts 10 min after the close
+AFTER_HOURS_END_MINUTES = 150  # After-hours single-price trading ends 2.5 h after the close
+
+# Session phases
+CLOSED = "CLOSED"
+PRE_OPEN = "PRE_OPEN"
+REGULAR = "REGULAR"
+AFTER_HOURS = "AFTER_HOURS"
+
+
+def _parse_time(value):
+    hour, minute = value.split(":")
+    return dtime(int(hour), int(minute))
+
+
+class Session:
+    """Timetable of one trading day (all datetimes are local KST)."""
+
+    def __init__(self, day, open_time, close_time):
+        self.date = day
+        self.open = datetime.combine(day, open_time)
+        self.close = datetime.combine(day, close_time)
+        self.pre_open = self.open - timedelta(minutes=PRE_OPEN_MINUTES)
+        self.after_hours_start = self.close + timedelta(minutes=AFTER_HOURS_START_MINUTES)
+        self.after_hours_end = self.close + timedelta(minutes=AFTER_HOURS_END_MINUTES)
+
+    def phase(self, now):
+        if self.pre_open <= now < self.open:
+            return PRE_OPEN
+        if self.open <= now <= self.close:
+            return REGULAR
+        if self.after_hours_start <= now < self.after_hours_end:
+            return AFTER_HOURS
+        return CLOSED
+
+    def boundaries(self):
+        return [
+            (self.pre_open, PRE_OPEN),
+            (self.open, REGULAR),
+            (self.close, CLOSED),
+            (self.after_hours_start, AFTER_HOURS),
+            (self.after_hours_end, CLOSED),
+        ]
+
+    def __repr__(self):
+        return f"Session({self.date}, {self.open.strftime('%H:%M')}-{self.close.strftime('%H:%M')})"
+
+
+class KRXCalendar:
+    """
+    KRX trading calendar: holidays, shortened/shifted sessions, pre-open auction and
+    after-hours windows, and the next session boundary for scheduling.
+    """
+
+    def __init__(self, extra_holidays=None, special_sessions=None):
+        self.holidays = set(KRX_HOLIDAYS)
+        self.holidays.update(extra_holidays or [])
+        self.special_sessions = dict(KRX_SPECIAL_SESSIONS)
+        self.special_sessions.update(special_sessions or {})
+
+    @classmethod
+    def from_config(cls, config):
+        cal_cfg = config.get("market_calendar", {})
+        return cls(extra_holidays=cal_cfg.get("extra_holidays"),
+                   special_sessions=cal_cfg.get("special_sessions"))
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day.strftime("%Y-%m-%d") not in self.holidays
+
+    def _is_first_trading_day_of_year(self, day):
+        d = date(day.year, 1, 1)
+        while not self.is_trading_day(d):
+            d += timedelta(days=1)
+        return d == day
+
+    def session(self, day):
+        """Session timetable for `day`, or None if the market is closed that day."""
+        if isinstance(day, datetime):
+            day = day.date()
+        if not self.is_trading_day(day):
+            return None
+
+        special = self.special_sessions.get(day.strftime("%Y-%m-%d"))
+        if special:
+            return Session(day, _parse_time(special[0]), _parse_time(special[1]))
+        if self._is_first_trading_day_of_year(day):
+            return Session(day, dtime(10, 0), REGULAR_CLOSE)
+        return Session(day, REGULAR_OPEN, REGULAR_CLOSE)
+
+    def next_session(self, now=None):
+        """The current session if it has not ended yet, otherwise the next one."""
+        if now is None:
+            now = datetime.now()
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session and now <= session.close:
+                return session
+            day += timedelta(days=1)
+        return None
+
+    def phase(self, now=None):
+        if now is None:
+            now = datetime.now()
+        session = self.session(now.date())
+        return session.phase(now) if session else CLOSED
+
+    def is_open(self, now=None):
+        """True during the regular (continuous + closing auction) session."""
+        return self.phase(now) == REGULAR
+
+    def next_boundary(self, now=None):
+        """
+        Next session boundary after `now`.
+
+        Returns:
+            tuple: (datetime, phase_entered) or (None, None) if nothing in the next 30 days
+        """
+        if now is None:
+            now = datetime.now()
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session:
+                for when, phase in session.boundaries():
+                    if when > now:
+                        return when, phase
+            day += timedelta(days=1)
+        return None, None
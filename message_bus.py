@@ -0,0 +1,203 @@
+import itertools
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+
+DEFAULT_ADDRESS = ("127.0.0.1", 47017)
+
+# Message shapes (plain dicts, pickled by multiprocessing.connection):
+#   client -> server: {"type": "request", "id": n, "method": str, "args": [...]}
+#                     {"type": "subscribe", "topics": [...]}
+#   server -> client: {"type": "reply", "id": n, "result": ..., "error": str or None}
+#                     {"type": "event", "topic": str, "data": ...}
+
+
+class _Peer:
+    def __init__(self, conn, peer_id):
+        self.conn = conn
+        self.peer_id = peer_id
+        self.topics = set()
+        self.lock = threading.Lock()
+        self.alive = True
+
+
+class BusServer:
+    """
+    Local message bus endpoint owned by the gateway process.
+
+    Clients connect over a localhost socket (authenticated with `authkey`). Requests
+    are queued in `inbox` for the owner to handle on its own thread (the Kiwoom control
+    must only be touched from the Qt thread); events are fanned out to every client
+    subscribed to the topic.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self.inbox = queue.Queue()
+        self.listener = None
+        self._peers = []
+        self._peers_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def start(self):
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, name="BusAccept", daemon=True).start()
+        print(f"📡 Message bus listening on {self.address[0]}:{self.address[1]}")
+
+    def _accept_loop(self):
+        while self.listener is not None:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                if self.listener is None:
+                    return  # Closed by stop()
+                continue  # Failed handshake (wrong authkey etc.)
+            peer = _Peer(conn, next(self._ids))
+            with self._peers_lock:
+                self._peers.append(peer)
+            threading.Thread(target=self._read_loop, args=(peer,),
+                             name=f"BusPeer-{peer.peer_id}", daemon=True).start()
+
+    def _read_loop(self, peer):
+        while True:
+            try:
+                msg = peer.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg.get("type") == "subscribe":
+                peer.topics.update(msg.get("topics", []))
+            elif msg.get("type") == "request":
+                self.inbox.put((peer, msg))
+        self._drop(peer)
+
+    def _drop(self, peer):
+        peer.alive = False
+        with self._peers_lock:
+            if peer in self._peers:
+                self._peers.remove(peer)
+        try:
+            peer.conn.close()
+        except OSError:
+            pass
+
+    def _send(self, peer, msg):
+        if not peer.alive:
+            return
+        try:
+            with peer.lock:
+                peer.conn.send(msg)
+        except (OSError, ValueError):
+            self._drop(peer)
+
+    def reply(self, peer, request_id, result=None, error=None):
+        self._send(peer, {"type": "reply", "id": request_id, "result": result, "error": error})
+
+    def publish(self, topic, data):
+        with self._peers_lock:
+            peers = [p for p in self._peers if topic in p.topics]
+        for peer in peers:
+            self._send(peer, {"type": "event", "topic": topic, "data": data})
+
+    def stop(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+        with self._peers_lock:
+            peers = list(self._peers)
+        for peer in peers:
+            self._drop(peer)
+
+
+class BusClient:
+    """
+    Client side of the message bus (used by the strategy process).
+
+    `request` blocks until the matching reply arrives; events are delivered to the
+    callbacks registered with `on` from the reader thread.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.conn = Client(address, authkey=authkey)
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._waiting = {}   # request_id -> [threading.Event, reply]
+        self._handlers = {}  # topic -> [callback]
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read_loop, name="BusClient", daemon=True).start()
+
+    def _read_loop(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg.get("type") == "reply":
+                with self._lock:
+                    slot = self._waiting.get(msg["id"])
+                if slot:
+                    slot[1] = msg
+                    slot[0].set()
+            elif msg.get("type") == "event":
+                for callback in self._handlers.get(msg["topic"], []):
+                    try:
+                        callback(msg["data"])
+                    except Exception as e:
+                        print(f"⚠️ Bus event handler failed ({msg['topic']}): {e}")
+
+        # Connection lost: fail every pending request
+        self.closed = True
+        with self._lock:
+            for slot in self._waiting.values():
+                slot[0].set()
+
+    def _send(self, msg):
+        if self.closed:
+            raise ConnectionError("Message bus connection closed")
+        try:
+            with self._send_lock:
+                self.conn.send(msg)
+        except (OSError, ValueError) as e:
+            self.closed = True
+            raise ConnectionError(f"Message bus connection closed ({e})")
+
+    def on(self, topic, callback):
+        """Subscribe to `topic`; callback(data) runs on the reader thread."""
+        self._handlers.setdefault(topic, []).append(callback)
+        self._send({"type": "subscribe", "topics": [topic]})
+
+    def request(self, method, *args, timeout=30):
+        """
+        Call `method` in the gateway process and wait for its result.
+
+        Raises:
+            TimeoutError: No reply within `timeout` seconds
+            ConnectionError: The bus connection is gone
+            RuntimeError: The gateway reported an error
+        """
+        request_id = next(self._ids)
+        slot = [threading.Event(), None]
+        with self._lock:
+            self._waiting[request_id] = slot
+        try:
+            self._send({"type": "request", "id": request_id, "method": method, "args": list(args)})
+            if not slot[0].wait(timeout):
+                raise TimeoutError(f"No reply to {method} within {timeout}s")
+        finally:
+            with self._lock:
+                self._waiting.pop(request_id, None)
+
+        reply = slot[1]
+        if reply is None:
+            raise ConnectionError("Message bus connection closed")
+        if reply.get("error"):
+            raise RuntimeError(reply["error"])
+        return reply.get("result")
+
+    def close(self):
+        self.closed = True
+        try:
+            self.conn.close()
+        except OSError:
+            pass
@@ -0,0 +1,205 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    """
+    Minimal thread-safe metrics registry rendered in the Prometheus text format.
+
+    - counters : monotonically increasing totals (inc)
+    - gauges   : last value (set)
+    - summaries: count / sum / max of observations, e.g. durations in seconds (observe)
+
+    Updates come from the Qt thread; rendering happens on the HTTP server thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}   # name -> {label_key: value}
+        self._gauges = {}
+        self._summaries = {}  # name -> {label_key: [count, sum, max]}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            stats = self._summaries.setdefault(name, {}).setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = max(stats[2], value)
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """Observe the duration (seconds) of a block into summary `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted(metrics):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in metrics[name].items():
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+            for name in sorted(self._summaries):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, (count, total, _) in self._summaries[name].items():
+                    labels = _format_labels(key)
+                    lines.append(f"{name}_count{labels} {count}")
+                    lines.append(f"{name}_sum{labels} {total}")
+                # The peak is not part of the summary type: export it as its own gauge family
+                if name in self._help:
+                    lines.append(f"# HELP {name}_max Largest observation of {name}")
+                lines.append(f"# TYPE {name}_max gauge")
+                for key, (_, _, peak) in self._summaries[name].items():
+                    lines.append(f"{name}_max{_format_labels(key)} {peak}")
+        return "\n".join(lines) + "\n"
+
+
+# Help text of the families exported by the instrumented modules
+HELP = {
+    "kiwoom_tr_requests_total": "Kiwoom TR requests sent",
+    "kiwoom_tr_timeouts_total": "Kiwoom TR requests that timed out",
+    "kiwoom_tr_latency_seconds": "Kiwoom TR round-trip time",
+    "kiwoom_orders_total": "Orders submitted to Kiwoom, by result",
+    "kiwoom_real_ticks_total": "Real-time price ticks received",
+    "price_source_total": "Prices served, by source",
+    "cache_requests_total": "Cache lookups, by cache and result",
+    "gateway_requests_total": "Requests handled by the Kiwoom gateway",
+    "strategy_checks_total": "Strategy checks run",
+    "strategy_process_seconds": "Time to process one strategy check",
+    "tick_phase_seconds": "Time spent per tick phase",
+    "virtual_trades_total": "Virtual account trades, by action and mode",
+    "scheduler_job_duration_seconds": "Scheduled job run time",
+    "state_save_duration_seconds": "Time to save the trade state",
+    "account_equity_krw": "Total value of a virtual account (KRW)",
+    "account_open_lots": "Open lots of a virtual account",
+    "strategy_equity_krw": "Total value of a strategy's virtual accounts (KRW)",
+    "strategy_pnl_krw": "Profit and loss of a strategy's virtual accounts vs. principal (KRW)",
+    "startup_phase_seconds": "Duration of a startup phase",
+    "startup_total_seconds": "Total startup time",
+}
+
+# Process-wide registry used by the instrumented modules
+registry = MetricsRegistry()
+for _name, _text in HELP.items():
+    registry.describe(_name, _text)
+
+
+class StartupReport:
+    """
+    Wall-clock breakdown of process startup (imports, login, state load, first tick).
+
+    Phases may overlap (e.g. state loading runs during login), so each one is timed
+    on its own and the total is measured from `t0`. Phases are exported as gauges.
+    """
+
+    def __init__(self, t0=None, metrics_registry=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.registry = metrics_registry or registry
+        self.phases = []  # [(name, seconds)]
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+        self.registry.set("startup_phase_seconds", round(seconds, 4), phase=name)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self, title="Startup"):
+        total = time.perf_counter() - self.t0
+        self.registry.set("startup_total_seconds", round(total, 4))
+        print(f"\n⏱️  {title} time report")
+        for name, seconds in self.phases:
+            print(f"  - {name:<24}: {seconds:7.3f}s")
+        print(f"  = {'total':<24}: {total:7.3f}s")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the trader console clean
+
+
+class MetricsServer:
+    """Serves GET /metrics on localhost from a daemon thread (never blocks the Qt thread)."""
+
+    def __init__(self, metrics_registry=None, host="127.0.0.1", port=9108):
+        self.registry = metrics_registry or registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint disabled: cannot bind {self.host}:{self.port} ({e})")
+            return False
+        self.httpd.daemon_threads = True
+        self.httpd.registry = self.registry
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="MetricsServer", daemon=True)
+        self.thread.start()
+        print(f"📈 Metrics at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,269 @@
+import io
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # Falls back to pd.read_html
+    lxml_html = None
+
+NAVER_MAIN_URL = "https://finance.naver.com/item/main.naver?code={code}"
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+
+# Financial summary ("기업실적분석") table: period labels of the annual columns, oldest
+# first, and the body rows as (label, [value per annual column]); missing values are 0.0
+SummaryTable = namedtuple("SummaryTable", ["periods", "rows"])
+
+
+def _to_float(text):
+    text = "".join(str(text).split()).replace(",", "")
+    if not text or text == "-" or text.lower() == "nan":
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def _slice_table(html, marker):
+    """Raw HTML of the first <table> after `marker`, or None."""
+    start = html.find(marker)
+    if start < 0:
+        return None
+    start = html.find("<table", start)
+    end = html.find("</table>", start)
+    if start < 0 or end < 0:
+        return None
+    return html[start:end + len("</table>")]
+
+
+def parse_summary_table(html):
+    """
+    Targeted parse of the financial summary table: only that table is cut out of the
+    page and parsed with lxml, no DataFrames are built.
+
+    Returns:
+        SummaryTable or None: None if lxml is missing or the table is not recognised
+    """
+    if lxml_html is None:
+        return None
+    fragment = _slice_table(html, 'class="section cop_analysis"')
+    if fragment is None:
+        return None
+    table = lxml_html.fragment_fromstring(fragment)
+
+    header_rows = table.xpath("./thead/tr")
+    if len(header_rows) < 2:
+        return None
+    annual = 0
+    for th in header_rows[0].xpath("./th"):
+        if "최근 연간 실적" in " ".join(th.text_content().split()):
+            annual = int(th.get("colspan", "1"))
+            break
+    periods = ["".join(th.text_content().split()) for th in header_rows[1].xpath("./th")][:annual]
+    if not periods:
+        return None
+
+    rows = []
+    for tr in table.xpath("./tbody/tr"):
+        th = tr.find("th")
+        if th is None:
+            continue
+        values = [_to_float(td.text_content()) for td in tr.xpath("./td")[:annual]]
+        if len(values) == annual:
+            rows.append((" ".join(th.text_content().split()), values))
+    return SummaryTable(periods, rows) if rows else None
+
+
+def parse_summary_table_pandas(html):
+    """Fallback: pd.read_html over the whole page, searching for the table with '매출액'."""
+    import pandas as pd
+
+    target_df = None
+    for df in pd.read_html(io.StringIO(html)):
+        if df.shape[1] > 1 and '매출액' in str(df.iloc[:, 0].values):
+            target_df = df
+            break
+    if target_df is None:
+        return None
+
+    target_df = target_df.set_index(target_df.columns[0])
+    if isinstance(target_df.columns, pd.MultiIndex):
+        columns = [c for c in target_df.columns if '최근 연간 실적' in c[0]]
+        periods = [str(c[1]) for c in columns]
+    else:
+        columns = [target_df.columns[1], target_df.columns[2]]
+        periods = [str(c) for c in columns]
+    if not columns:
+        return None
+
+    rows = [(str(label), [0.0 if pd.isna(v) else _to_float(v) for v in values])
+            for label, values in zip(target_df.index, target_df[columns].values.tolist())]
+    return SummaryTable(periods, rows)
+
+
+def summary_to_financial(table):
+    """Criteria dict from a SummaryTable (latest annual column vs. the one before)."""
+    def get_val(key, offset):
+        # First row whose label contains `key` (e.g. 'ROE' -> 'ROE(지배주주)')
+        if len(table.periods) < -offset:
+            return 0.0
+        for label, values in table.rows:
+            if key in label:
+                return values[offset]
+        return 0.0
+
+    sales_curr = get_val('매출액', -1)
+    sales_prev = get_val('매출액', -2)
+    sales_growth = ((sales_curr - sales_prev) / abs(sales_prev) * 100) if sales_prev != 0 else 0
+
+    net_curr = get_val('당기순이익', -1)
+    net_prev = get_val('당기순이익', -2)
+    net_growth = ((net_curr - net_prev) / abs(net_prev) * 100) if net_prev != 0 else 0
+
+    return {
+        'Debt_Ratio': get_val('부채비율', -1),
+        'Current_Ratio': get_val('유동비율', -1),
+        'Reserve_Ratio': get_val('유보율', -1),
+        'Dividend_Yield': get_val('시가배당률', -1),
+        'ROA': get_val('ROA', -1),
+        'ROE': get_val('ROE', -1),
+        'Op_Margin': get_val('영업이익률', -1),
+        'Net_Margin': get_val('순이익률', -1),
+        'Sales_Growth': sales_growth,
+        'Net_Growth': net_growth,
+        'PER': get_val('PER', -1),
+        'PBR': get_val('PBR', -1),
+        'Period': table.periods[-1],
+    }
+
+
+def get_financial_details_naver(code, session=None, timeout=10):
+    """
+    Scrapes financial ratios from Naver Finance for a given stock code.
+    Returns a dictionary with keys matching the criteria.
+
+    Args:
+        code: Stock code
+        session: requests.Session to reuse (keep-alive); a one-off request if None
+        timeout: Request timeout in seconds
+    """
+    url = NAVER_MAIN_URL.format(code=code)
+
+    try:
+        res = (session or requests).get(url, headers=HEADERS, timeout=timeout)
+        res.raise_for_status()
+
+        try:
+            table = parse_summary_table(res.text)
+        except Exception:
+            table = None  # Unexpected markup: use the generic parser
+        if table is None:
+            table = parse_summary_table_pandas(res.text)
+        if table is None:
+            return None
+        return summary_to_financial(table)
+
+    except Exception:
+        return None
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart (shared by all threads)."""
+
+    def __init__(self, rate_per_sec=5.0):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec else 0.0
+        self._next = {}  # host -> earliest time of the next request
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class NaverScraper:
+    """
+    Scraper stage of the screener: fetches Naver financials on a bounded thread pool,
+    independent of the Kiwoom TR loop.
+
+    Codes go in with `submit`; `(code, financial)` tuples come out of `results` in
+    completion order (financial is None when the scrape failed). Every worker thread
+    keeps its own keep-alive session, and all of them share a per-host rate limit.
+    With a FundamentalsCache, fresh entries are returned without any HTTP request.
+    """
+
+    def __init__(self, workers=8, rate_per_sec=5.0, timeout=10, cache=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = HostRateLimiter(rate_per_sec)
+        self.results = queue.Queue()
+        self.pending = 0
+        self._local = threading.local()
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="NaverScraper")
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    def fetch(self, code):
+        if self.cache is not None:
+            financial = self.cache.get(code)
+            if financial is not None:
+                return financial
+        self.limiter.wait(NAVER_MAIN_URL.format(code=code))
+        financial = get_financial_details_naver(code, session=self._session(), timeout=self.timeout)
+        if financial and self.cache is not None:
+            self.cache.put(code, financial)
+        return financial
+
+    def _run(self, code):
+        if self._closed:
+            return
+        try:
+            financial = self.fetch(code)
+        except Exception:
+            financial = None
+        self.results.put((code, financial))
+
+    def submit(self, code):
+        self.pending += 1
+        self._pool.submit(self._run, code)
+
+    def get(self, timeout=None):
+        """
+        Next finished scrape.
+
+        Returns:
+            tuple: (code, financial dict or None)
+        Raises:
+            queue.Empty: Nothing finished within `timeout`
+        """
+        item = self.results.get(timeout=timeout)
+        self.pending -= 1
+        return item
+
+    def close(self):
+        self._closed = True  # Queued codes are dropped instead of fetched
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,248 @@
+import json
+import os
+
+# Delta output layout (next to portfolio.json):
+#   portfolio.base.json              full compact snapshot  {"seq": n, "data": {...}}
+#   portfolio_patches/000123.json    one patch per refresh  {"seq": 123, "base_seq": n, "ops": [...]}
+#   portfolio.manifest.json          {"base": ..., "base_seq": n, "seq": m, "patch_dir": ...}
+#
+# A client loads the manifest and the base, then applies patches base_seq+1 .. seq in order.
+# Patch ops address values by a path of dict keys / list indexes:
+#   ["set", path, value]          replace (or add) the value at path
+#   ["del", path]                 remove a dict key
+#   ["splice", path, i, values]   truncate the list at path to i items, then append values
+#   ["trim", path, n]             drop the first n items of the list at path
+
+BASE_FILE = "portfolio.base.json"
+MANIFEST_FILE = "portfolio.manifest.json"
+PATCH_DIR = "portfolio_patches"
+MAX_SHIFT = 4  # Largest front trim detected for sliding windows (e.g. the 15-minute tier)
+
+
+def _diff_list(old, new, path, ops):
+    # Sliding window: a few points dropped at the front, at least as many appended at the
+    # back (a list that shrank is a truncation), and some points kept in between
+    shifts = min(MAX_SHIFT, len(old) - 1) if len(new) >= len(old) else 0
+    for n in range(1, shifts + 1):
+        kept = len(old) - n
+        if new[:kept] == old[n:]:
+            ops.append(["trim", path, n])
+            if len(new) > kept:
+                ops.append(["splice", path, kept, new[kept:]])
+            return
+
+    if len(old) == len(new):
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a != b:
+                _diff(a, b, path + [i], ops)
+        return
+
+    # Appended / truncated list: rewrite from the first difference
+    i = 0
+    while i < min(len(old), len(new)) and old[i] == new[i]:
+        i += 1
+    ops.append(["splice", path, i, new[i:]])
+
+
+def _diff(old, new, path, ops):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                ops.append(["set", path + [key], value])
+            elif old[key] != value:
+                _diff(old[key], value, path + [key], ops)
+        for key in old:
+            if key not in new:
+                ops.append(["del", path + [key]])
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_list(old, new, path, ops)
+    else:
+        ops.append(["set", path, new])
+
+
+def diff_json(old, new):
+    """Patch ops that turn `old` into `new` (both plain JSON data)."""
+    ops = []
+    if old != new:
+        _diff(old, new, [], ops)
+    return ops
+
+
+def apply_patch(doc, ops):
+    """Apply patch ops to `doc` in place and return it."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path and kind == "set":
+            doc = op[2]
+            continue
+        if kind in ("splice", "trim"):
+            target = doc  # The list itself (the root for an empty path)
+            for key in path:
+                target = target[key]
+            if kind == "splice":
+                del target[op[2]:]
+                target.extend(op[3])
+            else:
+                del target[:op[2]]
+            continue
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if kind == "set":
+            if isinstance(parent, list) and key == len(parent):
+                parent.append(op[2])
+            else:
+                parent[key] = op[2]
+        elif kind == "del":
+            del parent[key]
+    return doc
+
+
+def patch_name(seq):
+    return f"{PATCH_DIR}/{seq:06d}.json"
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class DeltaWriter:
+    """
+    Writes the portfolio as a base snapshot plus one small patch per refresh.
+
+    The patch chain is rebased (new base, old patches deleted) after `rebase_every`
+    patches or once the patches add up to `rebase_ratio` times the base size, so a
+    client never replays more than a bounded number of bytes.
+    """
+
+    def __init__(self, output_dir, rebase_every=120, rebase_ratio=0.5):
+        self.output_dir = output_dir
+        self.patch_dir = os.path.join(output_dir, PATCH_DIR)
+        self.rebase_every = rebase_every
+        self.rebase_ratio = rebase_ratio
+        self.current = None
+        self.seq = 0
+        self.base_seq = 0
+        self.base_bytes = 0
+        self.patches = []
+        self.patch_bytes = 0
+        self._restore()
+
+    def _restore(self):
+        """
+        Continue an existing chain (e.g. after a restart) by replaying it once. A base
+        that does not belong to the manifest (crash during a rebase) is not replayed;
+        the first write then creates a new base.
+        """
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            with open(os.path.join(self.output_dir, manifest["base"]), "r", encoding="utf-8") as f:
+                base_text = f.read()
+            base = json.loads(base_text)
+            if base["seq"] != manifest["base_seq"]:
+                self.seq = max(base["seq"], manifest["seq"])  # Keep numbering past both
+                return
+            doc = base["data"]
+            patches = [patch_name(seq) for seq in range(manifest["base_seq"] + 1, manifest["seq"] + 1)]
+            patch_bytes = 0
+            for name in patches:
+                with open(os.path.join(self.output_dir, name), "r", encoding="utf-8") as f:
+                    text = f.read()
+                patch_bytes += len(text.encode("utf-8"))
+                doc = apply_patch(doc, json.loads(text)["ops"])
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            return  # No usable chain: the first write creates a new base
+        self.current = doc
+        self.seq = manifest["seq"]
+        self.base_seq = manifest["base_seq"]
+        self.base_bytes = len(base_text.encode("utf-8"))
+        self.patches = patches
+        self.patch_bytes = patch_bytes
+
+    def _write_manifest(self):
+        _write_atomic(os.path.join(self.output_dir, MANIFEST_FILE), _dump({
+            "base": BASE_FILE, "base_seq": self.base_seq, "seq": self.seq, "patch_dir": PATCH_DIR
+        }))
+
+    def rebase(self, doc):
+        """
+        Write `doc` as the new base. The manifest is switched to it before the old
+        patches are deleted, so a crash in between leaves only unreferenced patch files.
+        """
+        self.seq += 1
+        text = _dump({"seq": self.seq, "data": doc})
+        _write_atomic(os.path.join(self.output_dir, BASE_FILE), text)
+        self.current = json.loads(text)["data"]
+        self.base_seq = self.seq
+        self.base_bytes = len(text.encode("utf-8"))
+        self.patches = []
+        self.patch_bytes = 0
+        self._write_manifest()
+        # Every existing patch predates the new base (including leftovers of an interrupted rebase)
+        if os.path.isdir(self.patch_dir):
+            for name in os.listdir(self.patch_dir):
+                try:
+                    os.remove(os.path.join(self.patch_dir, name))
+                except OSError:
+                    pass
+        return self.base_bytes
+
+    def write(self, doc):
+        """
+        Record a new portfolio document.
+
+        Returns:
+            int: Bytes written (0 if nothing changed)
+        """
+        if self.current is None:
+            return self.rebase(doc)
+        ops = diff_json(self.current, doc)
+        if not ops:
+            return 0
+        if len(self.patches) >= self.rebase_every:
+            return self.rebase(doc)
+
+        self.seq += 1
+        name = patch_name(self.seq)
+        text = _dump({"seq": self.seq, "base_seq": self.base_seq, "ops": ops})
+        size = len(text.encode("utf-8"))
+        if self.patch_bytes + size > self.base_bytes * self.rebase_ratio:
+            self.seq -= 1
+            return self.rebase(doc)
+
+        os.makedirs(self.patch_dir, exist_ok=True)
+        _write_atomic(os.path.join(self.output_dir, name), text)
+        self.current = apply_patch(self.current, json.loads(text)["ops"])
+        self.patches.append(name)
+        self.patch_bytes += size
+        self._write_manifest()
+        return size
+
+
+def materialize(output_dir):
+    """
+    Rebuild the full portfolio document from a delta output directory.
+
+    Raises:
+        ValueError: The base does not belong to the manifest (interrupted rebase)
+    """
+    with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(os.path.join(output_dir, manifest["base"]), "r", encoding="utf-8") as f:
+        base = json.load(f)
+    if base["seq"] != manifest["base_seq"]:
+        raise ValueError(f"Base seq {base['seq']} does not match manifest base_seq {manifest['base_seq']}")
+    doc = base["data"]
+    for seq in range(manifest["base_seq"] + 1, manifest["seq"] + 1):
+        with open(os.path.join(output_dir, patch_name(seq)), "r", encoding="utf-8") as f:
+            doc = apply_patch(doc, json.load(f)["ops"])
+    return doc
@@ -0,0 +1,62 @@
+import pandas as pd
+
+VALUE_COLUMNS = ["equity", "cash", "total_value", "realized_pnl", "unrealized_pnl"]
+GROUP_KEYS = ["sector", "strategy", "strategy_type"]
+
+
+def _records(table, key, grand_total):
+    """Group table -> JSON-ready rows (native ints / floats) with exposure and weight."""
+    rows = []
+    for name, values in table.iterrows():
+        total_value = float(values["total_value"])
+        row = {key: name, "accounts": int(values["accounts"])}
+        row.update({col: int(round(float(values[col]))) for col in VALUE_COLUMNS})
+        # exposure: invested share of the group's value; weight: share of all virtual capital
+        row["exposure"] = round(float(values["equity"]) / total_value * 100, 2) if total_value else 0.0
+        row["weight"] = round(total_value / grand_total * 100, 2) if grand_total else 0.0
+        rows.append(row)
+    rows.sort(key=lambda r: r["total_value"], reverse=True)
+    return rows
+
+
+def compute_rollups(virtual_rows, holdings):
+    """
+    Sector / strategy / LEADER-FOLLOWER roll-ups of the virtual accounts, plus the
+    sector split of the real holdings.
+
+    The virtual accounts are loaded into one frame and grouped once by
+    (sector, strategy, strategy_type); every level is then re-aggregated from that
+    small group table instead of from the rows.
+
+    Returns:
+        dict: {"sector": [...], "strategy": [...], "strategy_type": [...], "holdings_sector": [...]}
+    """
+    rollups = {"sector": [], "strategy": [], "strategy_type": [], "holdings_sector": []}
+
+    if virtual_rows:
+        frame = pd.DataFrame.from_records(virtual_rows, columns=GROUP_KEYS + VALUE_COLUMNS)
+        frame[GROUP_KEYS] = frame[GROUP_KEYS].fillna("Unknown").replace("", "Unknown")
+        frame[VALUE_COLUMNS] = frame[VALUE_COLUMNS].fillna(0).astype(float)
+        frame["accounts"] = 1
+
+        base = frame.groupby(GROUP_KEYS, sort=False)[VALUE_COLUMNS + ["accounts"]].sum()
+        grand_total = float(frame["total_value"].sum())
+        for key in GROUP_KEYS:
+            rollups[key] = _records(base.groupby(level=key, sort=False).sum(), key, grand_total)
+
+    if holdings:
+        frame = pd.DataFrame.from_records(holdings, columns=["sector", "value", "pnl"])
+        frame["sector"] = frame["sector"].fillna("Unknown")
+        table = frame.groupby("sector", sort=False).agg(value=("value", "sum"), pnl=("pnl", "sum"),
+                                                        holdings=("value", "size"))
+        total = float(table["value"].sum())
+        rollups["holdings_sector"] = sorted(
+            ({"sector": sector,
+              "holdings": int(row["holdings"]),
+              "value": int(round(float(row["value"]))),
+              "pnl": int(round(float(row["pnl"]))),
+              "weight": round(float(row["value"]) / total * 100, 2) if total else 0.0}
+             for sector, row in table.iterrows()),
+            key=lambda r: r["value"], reverse=True)
+
+    return rollups
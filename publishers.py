@@ -0,0 +1,207 @@
+import hashlib
+import os
+import shutil
+import urllib.request
+
+# Publish targets for the generated dashboard files. Each target is configured by a
+# dict in config["dashboard"]["publish_targets"]:
+#   {"type": "local", "path": "C:/dashboard/public/data"}     copy into a directory
+#   {"type": "http", "url": "http://127.0.0.1:8000/data"}     PUT each file (DELETE removed ones)
+#   {"type": "git", "branch": "dashboard-data", ...}          commit and push (GitHubSync)
+# and "when": "session" (every refresh, default) or "end_of_day" (only when the
+# dashboard worker stops at the end of the session).
+
+
+def _walk(base_dir, paths):
+    """Relative paths of every file under `paths` (files or directories), in publish order."""
+    files = []
+    for path in paths:
+        full = os.path.join(base_dir, path)
+        if os.path.isdir(full):
+            files.extend(sorted(os.path.relpath(os.path.join(root, f), base_dir)
+                                for root, _, fs in os.walk(full) for f in fs))
+        elif os.path.exists(full):
+            files.append(os.path.relpath(full, base_dir))
+    return files
+
+
+def relative_paths(base_dir, paths):
+    """`paths` relative to `base_dir` (absolute ones are converted), so they can address any target."""
+    return [os.path.relpath(p, base_dir) if os.path.isabs(p) else p for p in paths]
+
+
+def content_hash(base_dir, paths):
+    """SHA-256 over the relative names and bytes of every file under `paths`."""
+    digest = hashlib.sha256()
+    for rel_path in sorted(_walk(base_dir, paths)):
+        digest.update(rel_path.replace(os.sep, "/").encode("utf-8"))
+        with open(os.path.join(base_dir, rel_path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def mirror(source, dest):
+    """
+    Copy a file or directory tree; files missing from `source` are removed from `dest`.
+
+    Files are replaced atomically, so a reader never sees a partially written file.
+    """
+    if os.path.isfile(source):
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        shutil.copy2(source, dest + ".tmp")
+        os.replace(dest + ".tmp", dest)
+        return
+    if not os.path.isdir(source):
+        if os.path.isdir(dest):
+            shutil.rmtree(dest)
+        elif os.path.exists(dest):
+            os.remove(dest)
+        return
+    os.makedirs(dest, exist_ok=True)
+    names = set(os.listdir(source))
+    for name in os.listdir(dest):
+        if name not in names:
+            target = os.path.join(dest, name)
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+    for name in sorted(names):
+        mirror(os.path.join(source, name), os.path.join(dest, name))
+
+
+class Publisher:
+    """
+    Base publish target.
+
+    `publish` is keyed by the content hash of the generated files: output identical
+    to the last successful publish is neither written nor sent again. Subclasses
+    implement `_publish`.
+    """
+
+    def __init__(self, repo_path, when="session"):
+        self.repo_path = repo_path
+        self.when = when
+        self.last_hash = None
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def publish(self, paths, digest=None, commit_message=None):
+        """
+        Publish `paths` (relative to repo_path) unless their content was already published.
+
+        Args:
+            paths: Files / directories to publish, in order (manifest last)
+            digest: Precomputed content_hash of `paths` (computed if None)
+            commit_message: Message for targets that keep history
+
+        Returns:
+            bool: True if the target holds the current content
+        """
+        paths = relative_paths(self.repo_path, paths)
+        if digest is None:
+            digest = content_hash(self.repo_path, paths)
+        if digest == self.last_hash:
+            return True
+        try:
+            ok = self._publish(paths, digest, commit_message)
+        except Exception as e:
+            print(f"⚠️ {self.name} publish failed: {e}")
+            ok = False
+        if ok:
+            self.last_hash = digest
+        return ok
+
+    def _publish(self, paths, digest, commit_message):
+        raise NotImplementedError
+
+
+class LocalDirPublisher(Publisher):
+    """Copies the files into a local directory (e.g. the dashboard's static data folder)."""
+
+    def __init__(self, repo_path, path, when="session"):
+        super().__init__(repo_path, when)
+        self.target_dir = os.path.abspath(path)
+
+    def _publish(self, paths, digest, commit_message):
+        for path in paths:
+            mirror(os.path.join(self.repo_path, path), os.path.join(self.target_dir, path))
+        print(f"📁 Published {len(paths)} path(s) to {self.target_dir}")
+        return True
+
+
+class HttpPublisher(Publisher):
+    """PUTs every file to a local HTTP endpoint; files that disappeared are DELETEd."""
+
+    def __init__(self, repo_path, url, when="session", timeout=10):
+        super().__init__(repo_path, when)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._sent = {}  # relative path -> sha256 of the bytes last sent
+
+    def _request(self, method, rel_path, body=None):
+        request = urllib.request.Request(f"{self.url}/{rel_path.replace(os.sep, '/')}", data=body,
+                                         method=method, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def _publish(self, paths, digest, commit_message):
+        current = {}
+        for rel_path in _walk(self.repo_path, paths):
+            with open(os.path.join(self.repo_path, rel_path), "rb") as f:
+                body = f.read()
+            file_hash = hashlib.sha256(body).hexdigest()
+            current[rel_path] = file_hash
+            if self._sent.get(rel_path) != file_hash:  # Unchanged files (old patches) are not resent
+                self._request("PUT", rel_path, body)
+                self._sent[rel_path] = file_hash
+        for rel_path in [p for p in self._sent if p not in current]:
+            self._request("DELETE", rel_path)
+            del self._sent[rel_path]
+        print(f"🌐 Published {len(current)} file(s) to {self.url}")
+        return True
+
+
+class GitPublisher(Publisher):
+    """Commits and pushes through GitHubSync (worktree, orphan data branch, squash)."""
+
+    def __init__(self, repo_path, when="session", worktree_path=None, branch="dashboard-data",
+                 squash_every=None):
+        super().__init__(repo_path, when)
+        from github_sync import GitHubSync
+        self.sync = GitHubSync(repo_path=repo_path, worktree_path=worktree_path, branch=branch,
+                               squash_every=squash_every)
+
+    def _publish(self, paths, digest, commit_message):
+        return self.sync.sync_portfolio(portfolio_file=paths, commit_message=commit_message, digest=digest)
+
+
+PUBLISHERS = {
+    "local": LocalDirPublisher,
+    "http": HttpPublisher,
+    "git": GitPublisher,
+}
+
+
+def build_publishers(targets, repo_path):
+    """
+    Create publishers from target dicts (see the top of this module).
+
+    Returns:
+        list: Publisher instances; unknown or invalid targets are reported and skipped
+    """
+    publishers = []
+    for target in targets:
+        options = dict(target)
+        kind = options.pop("type", "git")
+        cls = PUBLISHERS.get(kind)
+        if cls is None:
+            print(f"⚠️ Unknown publish target type: {kind}")
+            continue
+        try:
+            publishers.append(cls(repo_path, **options))
+        except TypeError as e:
+            print(f"⚠️ Invalid {kind} publish target {target}: {e}")
+    return publishers
@@ -1,34 +1,50 @@
 import sys
 import time
+_PROCESS_START = time.perf_counter()
 import json
 import subprocess
 import os
-from PyQt5.QtWidgets import QApplication
-from kiwoom_api import Kiwoom
+import signal
+import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QTimer
 # from state_manager import StateManager # Deprecated
-from account_manager import Account, create_split_account, save_accounts, load_accounts
+from account_manager import Account, create_split_account, save_accounts, load_accounts, compact_accounts
 from strategy_executor import StrategyExecutor
-from github_sync import GitHubSync
-from generate_portfolio_json import fetch_and_generate_portfolio
-from datetime import datetime, time as dtime
-
-def check_market_open():
+from scheduler import JobScheduler
+from config_watcher import ConfigWatcher
+from valuation_engine import PortfolioValuation
+from dashboard_worker import DashboardWorker
+from market_calendar import KRXCalendar
+from metrics import registry as metrics, MetricsServer, StartupReport
+from datetime import datetime, timedelta
+
+# Heavy / mode-specific modules (QtWidgets + the Kiwoom ActiveX control, the message
+# bus, dashboard helpers) are imported where they are used, so worker processes that
+# re-import this module and the strategy process start fast.
+_IMPORT_SECONDS = time.perf_counter() - _PROCESS_START
+
+def wait_for_session(calendar, lead_minutes=10):
     """
-    Check if KOSPI/KOSDAQ market is open (09:00 - 15:30 KST).
-    Returns True if open, False otherwise.
-    Also returns False on weekends.
+    Decide whether to run today and sleep (before logging in) until shortly before the open.
+
+    Returns:
+        Session: Today's session, or None if the market does not open again today
     """
     now = datetime.now()
-    
-    # Weekday check (0=Mon, 6=Sun)
-    if now.weekday() >= 5:
-        return False
-        
-    current_time = now.time()
-    start_time = dtime(9, 0)
-    end_time = dtime(15, 30)
-    
-    return start_time <= current_time <= end_time
+    session = calendar.next_session(now)
+    if session is None or session.date != now.date():
+        print(f"[{now.strftime('%H:%M:%S')}] No trading session today. Next session: {session}")
+        return None
+
+    warmup_at = session.open - timedelta(minutes=lead_minutes)
+    if now < warmup_at:
+        print(f"[{now.strftime('%H:%M:%S')}] Today's session: {session}. "
+              f"Sleeping until {warmup_at.strftime('%H:%M')} (pre-open warm-up)...")
+        while datetime.now() < warmup_at:
+            time.sleep(min(60, max(0.0, (warmup_at - datetime.now()).total_seconds())))
+    return session
 
 def initialize_accounts(config):
     """
@@ -50,54 +66,7 @@ def initialize_accounts(config):
             accounts_map[acc.account_id] = acc
     
     # Merge with config (handles new stocks/accounts added to config.json)
-    total_capital = config.get("total_capital", 0)
-    newly_created = 0
-    
-    if "strategies" in config:
-        for strategy in config["strategies"]:
-            s_id = strategy["id"]
-            alloc_percent = strategy.get("total_allocation_percent", 0)
-            strategy_capital = total_capital * alloc_percent
-            
-            sub_accounts = strategy.get("accounts", [])
-            num_subs = len(sub_accounts)
-            ratios = [acc["ratio"] for acc in sub_accounts]
-            
-            # Prepare strategy configs for each sub-account
-            strat_configs = []
-            for acc_cfg in sub_accounts:
-                acc_id = f"{s_id}_{acc_cfg['suffix']}"
-                
-                # Only create if not already in state
-                if acc_id not in accounts_map:
-                    cfg = acc_cfg.copy()
-                    cfg["account_id"] = acc_id
-                    cfg["strategy_id"] = s_id
-                    cfg["stock_code"] = strategy["stock_code"]
-                    strat_configs.append(cfg)
-                else:
-                    # Fill slot to keep indexing matched for create_split_account if needed
-                    # but create_split_account logic below needs adjustment
-                    strat_configs.append(None) 
-            
-            # If we have missing accounts in this strategy group
-            if any(cfg is not None for cfg in strat_configs):
-                # We need to selectively create. 
-                # For simplicity, we can just instantiate Account objects directly here
-                for i, cfg in enumerate(strat_configs):
-                    if cfg:
-                        acc_id = cfg["account_id"]
-                        allocated_capital = int(strategy_capital * ratios[i])
-                        
-                        new_acc = Account(
-                            account_id=acc_id,
-                            principal=allocated_capital,
-                            stock_code=strategy["stock_code"],
-                            strategy_config=cfg
-                        )
-                        accounts_map[acc_id] = new_acc
-                        newly_created += 1
-                        print(f"  Merged New Account {acc_id}: Principal {new_acc.principal:,} KRW")
+    newly_created = merge_config_accounts(config, accounts_map)
 
     if newly_created > 0 or not loaded_accounts:
         save_accounts(list(accounts_map.values()), state_file)
@@ -106,33 +75,80 @@ def initialize_accounts(config):
         
     return accounts_map
 
-def update_account_snapshots(kiwoom, accounts_map):
+def merge_config_accounts(config, accounts_map, strategies=None):
+    """
+    Create virtual accounts for config entries that are not in accounts_map yet.
+
+    Args:
+        config: Full configuration (for total_capital)
+        accounts_map: Dictionary of {account_id: Account}, updated in place
+        strategies: Strategies to merge (defaults to all strategies in config)
+
+    Returns:
+        int: Number of accounts created
     """
-    Update all accounts with current price snapshots.
+    total_capital = config.get("total_capital", 0)
+    if strategies is None:
+        strategies = config.get("strategies", [])
+    newly_created = 0
+
+    for strategy in strategies:
+        s_id = strategy["id"]
+        alloc_percent = strategy.get("total_allocation_percent", 0)
+        strategy_capital = total_capital * alloc_percent
+
+        for acc_cfg in strategy.get("accounts", []):
+            acc_id = f"{s_id}_{acc_cfg['suffix']}"
+
+            # Only create if not already in state
+            if acc_id in accounts_map:
+                continue
+
+            cfg = acc_cfg.copy()
+            cfg["account_id"] = acc_id
+            cfg["strategy_id"] = s_id
+            cfg["stock_code"] = strategy["stock_code"]
+            allocated_capital = int(strategy_capital * acc_cfg["ratio"])
+
+            new_acc = Account(
+                account_id=acc_id,
+                principal=allocated_capital,
+                stock_code=strategy["stock_code"],
+                strategy_config=cfg
+            )
+            accounts_map[acc_id] = new_acc
+            newly_created += 1
+            print(f"  Merged New Account {acc_id}: Principal {new_acc.principal:,} KRW")
+
+    return newly_created
+
+def update_account_snapshots(kiwoom, accounts_map, valuation=None, current_prices=None, timestamp=None):
+    """
+    Record exactly one snapshot per account for the current tick.
     This populates the performance_log for historical data.
 
     Args:
         kiwoom: Kiwoom API instance
         accounts_map: Dictionary of {account_id: Account}
+        valuation: Optional PortfolioValuation; values all accounts in one pass
+        current_prices: Prices already observed this tick ({code: price}).
+                        Only held codes missing from this map are fetched.
+        timestamp: Tick timestamp to stamp on every snapshot (defaults to now)
 
     Returns:
-        bool: True if successful, False otherwise
+        str: The timestamp used for the snapshots, or None on failure
     """
     try:
-        # Collect all unique stock codes from holdings
-        all_codes = set()
-        for acc in accounts_map.values():
-            all_codes.update(acc.holdings.keys())
+        current_prices = dict(current_prices) if current_prices else {}
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        if not all_codes:
-            # No holdings, just record snapshots with current balance
-            for acc in accounts_map.values():
-                acc.update_snapshot({})
-            return True
+        # Collect held stock codes that were not priced during this tick
+        missing_codes = set()
+        for acc in accounts_map.values():
+            missing_codes.update(code for code in acc.holdings.keys() if code not in current_prices)
 
-        # Fetch current prices for all stocks
-        current_prices = {}
-        for code in all_codes:
+        for code in missing_codes:
             time.sleep(0.2) # Prevent Rate Limiting
             try:
                 data = kiwoom.get_current_price(code)
@@ -148,75 +164,265 @@ def update_account_snapshots(kiwoom, accounts_map):
                 print(f"  Warning: Failed to get price for {code}: {e}")
 
         # Update each account's snapshot
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        total_values = {}
+        if valuation is not None:
+            valuation.sync(accounts_map)
+            result = valuation.evaluate(current_prices)
+            total_values = dict(zip(valuation.account_ids, result["total_value"].tolist()))
+
+        strategy_totals = {}  # strategy id -> [equity, pnl]
         for acc in accounts_map.values():
+            metrics.set("account_open_lots", len(acc.open_lots), account=acc.account_id)
             try:
-                acc.update_snapshot(current_prices, timestamp=timestamp)
+                snapshot = acc.update_snapshot(current_prices, timestamp=timestamp,
+                                               total_value=total_values.get(acc.account_id))
             except Exception as e:
                 print(f"  Warning: Failed to update snapshot for {acc.account_id}: {e}")
-
-        return True
+                continue
+            metrics.set("account_equity_krw", snapshot["total_value"], account=acc.account_id)
+            # Account ids are "{strategy id}_{suffix}"
+            totals = strategy_totals.setdefault(acc.account_id.rsplit("_", 1)[0], [0, 0])
+            totals[0] += snapshot["total_value"]
+            totals[1] += snapshot["pnl"]
+        for strategy_id, (equity, pnl) in strategy_totals.items():
+            metrics.set("strategy_equity_krw", equity, strategy=strategy_id)
+            metrics.set("strategy_pnl_krw", pnl, strategy=strategy_id)
+
+        return timestamp
 
     except Exception as e:
         print(f"Error updating account snapshots: {e}")
         traceback.print_exc()
-        return False
+        return None
 
-def main():
+def validate_accounts(config, accounts_map):
     """
-    Real-time trading bot with independent execution intervals.
-    
-    Intervals (Configurable):
-    - Price Check & Follower Trading: ~1 min
-    - Leader Buying: ~20 min (throttled)
-    - Dashboard Update: ~10 min
+    Sanity checks on the loaded state before trading starts.
+
+    Returns:
+        list: Human-readable problems (empty if the state looks consistent)
     """
-    # Load configuration
-    config_path = 'config.json'
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    issues = []
+    for strategy in config.get("strategies", []):
+        for acc_cfg in strategy.get("accounts", []):
+            account_id = f"{strategy['id']}_{acc_cfg['suffix']}"
+            if account_id not in accounts_map:
+                issues.append(f"{account_id}: configured but missing from state")
+    for acc in accounts_map.values():
+        if acc.balance < 0:
+            issues.append(f"{acc.account_id}: negative balance {acc.balance:,}")
+        for code, holding in acc.holdings.items():
+            if holding.get("qty", 0) <= 0:
+                issues.append(f"{acc.account_id}: empty holding for {code}")
+    return issues
+
+def prefetch_prices(kiwoom, codes):
+    """
+    One price TR per code (before the open this is the previous close).
 
-    # Initialize Qt Application
-    app = QApplication(sys.argv)
+    Returns:
+        dict: {code: price} for the codes that returned a valid price
+    """
+    prices = {}
+    for i, code in enumerate(codes):
+        if i:
+            time.sleep(0.2) # Prevent Rate Limiting
+        try:
+            data = kiwoom.get_current_price(code)
+            if data and data.get("price"):
+                prices[code] = abs(int(data["price"]))
+        except Exception as e:
+            print(f"  Warning: Failed to prefetch price for {code}: {e}")
+    return prices
+
+def start_metrics_server(config, port_offset=0):
+    """Start the local /metrics endpoint if enabled in config. Returns the server or None."""
+    metrics_cfg = config.get("metrics", {})
+    if not metrics_cfg.get("enabled", True):
+        return None
+    server = MetricsServer(host=metrics_cfg.get("host", "127.0.0.1"),
+                           port=metrics_cfg.get("port", 9108) + port_offset)
+    server.start()
+    return server
+
+def strategy_process_main(address, authkey, config_path):
+    """
+    Entry point of the strategy process (gateway split mode).
 
-    # Connect to Kiwoom API
-    print("=" * 60)
-    print("Real-Time Trading Bot - Starting")
-    print("=" * 60)
-    kiwoom = Kiwoom()
+    Talks to the broker only through the gateway's message bus, so a crash here
+    never takes down the Kiwoom connection; the gateway restarts this process.
+    """
+    from PyQt5.QtCore import QCoreApplication
+    from message_bus import BusClient
+    from gateway import GatewayClient
 
-    print("\nConnecting to Kiwoom API...")
-    try:
-        kiwoom.comm_connect()
-        print("✅ Connected to Kiwoom API")
-    except Exception as e:
-        print(f"\n❌ Connection Failed: {e}")
-        sys.exit(1)
+    startup = StartupReport(t0=_PROCESS_START)
+    startup.record("module imports", _IMPORT_SECONDS)
+    app = QCoreApplication(sys.argv)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    calendar = KRXCalendar.from_config(config)
+    session = None
+    if not config.get("ignore_market_hours", False):
+        # A restart after the close must not carry on into the next day's session
+        now = datetime.now()
+        session = calendar.next_session(now)
+        if session is None or session.date != now.date():
+            print(f"[{now.strftime('%H:%M:%S')}] Market closed for the day. Strategy process exiting.")
+            return
+
+    with startup.phase("gateway connect"):
+        kiwoom = GatewayClient(BusClient(address, authkey=authkey))
+
+    def check_gateway():
+        if kiwoom.closed:
+            print("\n❌ Lost connection to the gateway. Stopping strategy process.")
+            app.quit()
+
+    run_trading_engine(app, kiwoom, config, config_path, calendar, session,
+                       metrics_port_offset=1, on_idle=check_gateway, startup=startup)
+
+def run_gateway(app, kiwoom, config, config_path):
+    """
+    Gateway mode: this process only owns the Kiwoom control and serves it over the
+    local message bus; strategies and persistence run in a supervised child process.
+    A crashed strategy process is restarted (with backoff) while the broker session
+    stays logged in; a clean exit (end of session, Ctrl+C) stops the gateway too.
+    """
+    from message_bus import BusServer
+    from gateway import KiwoomGateway
+
+    split_cfg = config.get("process_split", {})
+    address = (split_cfg.get("host", "127.0.0.1"), split_cfg.get("port", 47017))
+    authkey = bytes(multiprocessing.current_process().authkey)
+
+    server = BusServer(address, authkey=authkey)
+    server.start()
+    gateway = KiwoomGateway(kiwoom, server)
+    gateway.start()
+    metrics_server = start_metrics_server(config)
+
+    restart_base_sec = split_cfg.get("restart_base_seconds", 5)
+    restart_max_sec = split_cfg.get("restart_max_seconds", 120)
+    state = {"process": None, "backoff": restart_base_sec, "restart_pending": False,
+             "stopping": False, "started_at": 0}
+
+    def spawn():
+        state["restart_pending"] = False
+        proc = multiprocessing.Process(target=strategy_process_main,
+                                       args=(address, authkey, config_path),
+                                       name="StrategyProcess")  # Not daemonic: it owns the dashboard worker
+        proc.start()
+        state["process"] = proc
+        state["started_at"] = time.time()
+        print(f"Strategy process started (pid {proc.pid})")
+
+    def supervise():
+        proc = state["process"]
+        if state["stopping"] or state["restart_pending"] or proc is None or proc.is_alive():
+            return
+        if proc.exitcode == 0:
+            print("Strategy process finished. Stopping gateway.")
+            app.quit()
+            return
+        if time.time() - state["started_at"] > 600:
+            state["backoff"] = restart_base_sec  # It had been running fine for a while
+        delay = state["backoff"]
+        print(f"⚠️ Strategy process exited with code {proc.exitcode}. Restarting in {delay}s...")
+        state["backoff"] = min(delay * 2, restart_max_sec)
+        state["restart_pending"] = True
+        QTimer.singleShot(int(delay * 1000), spawn)
+
+    def on_sigint(signum, frame):
+        # The strategy process gets the same Ctrl+C, saves its state and exits cleanly
+        state["stopping"] = True
+        app.quit()
+
+    signal.signal(signal.SIGINT, on_sigint)
+    supervisor = QTimer()
+    supervisor.timeout.connect(supervise)
+    supervisor.start(500)
+
+    spawn()
+    app.exec_()
+
+    state["stopping"] = True
+    supervisor.stop()
+    proc = state["process"]
+    if proc is not None and proc.is_alive():
+        proc.join(30)
+        if proc.is_alive():
+            print("⚠️ Strategy process did not stop in time. Terminating.")
+            proc.terminate()
+    gateway.stop()
+    server.stop()
+    if metrics_server:
+        metrics_server.stop()
+    print("✅ Gateway stopped.")
+
+def run_trading_engine(app, kiwoom, config, config_path, calendar, session,
+                       metrics_port_offset=0, on_idle=None, accounts_map=None, startup=None):
+    """
+    Strategy evaluation, persistence and dashboard submission on the Qt event loop.
 
-    # Get account information
-    accounts_list = kiwoom.get_login_info("ACCNO")
-    if not accounts_list:
-        print("ERROR: No accounts found. Exiting.")
-        sys.exit(1)
+    Runs in the trader process itself, or in the strategy process when the gateway
+    split is enabled (then `kiwoom` is a GatewayClient proxy).
 
-    # Select the account to use
-    real_account_no = config.get("real_account_id", accounts_list[0])
-    print(f"Using Real Account: {real_account_no}")
+    Args:
+        app: Running Q(Core)Application
+        kiwoom: Kiwoom instance or Kiwoom-compatible proxy
+        config: Loaded config dict
+        config_path: Path of config.json (watched for hot reload)
+        calendar: KRXCalendar
+        session: Today's Session (None when ignoring market hours)
+        metrics_port_offset: Added to the metrics port (the gateway keeps the base port)
+        on_idle: Optional callback run every second (e.g. connection watchdog)
+        accounts_map: Accounts already loaded by the caller (loaded here if None)
+        startup: Optional StartupReport, printed after the first trading tick
+    """
+    ignore_market_hours = config.get("ignore_market_hours", False)
 
     # Initialize Virtual Accounts
-    print("\n" + "=" * 60)
-    print("Initializing Accounts")
-    print("=" * 60)
-    accounts_map = initialize_accounts(config)
-
-    # Initialize GitHub Sync
-    github_sync = GitHubSync()
+    if accounts_map is None:
+        print("\n" + "=" * 60)
+        print("Initializing Accounts")
+        print("=" * 60)
+        start = time.perf_counter()
+        accounts_map = initialize_accounts(config)
+        if startup:
+            startup.record("state load", time.perf_counter() - start)
+    valuation = PortfolioValuation(accounts_map)
+
+    # Local Prometheus endpoint (served from a daemon thread)
+    metrics_server = start_metrics_server(config, port_offset=metrics_port_offset)
+
+    # Dashboard generation + GitHub Sync run in a background process
+    # (commits go to an orphan data branch in a separate worktree, debounced into one
+    # push per burst and squashed periodically so the branch stays small)
+    repo_path = os.getcwd()
+    dash_cfg = config.get("dashboard", {})
+    dashboard_worker = DashboardWorker(
+        repo_path=repo_path,
+        debounce_sec=dash_cfg.get("sync_debounce_seconds", 30),
+        max_delay_sec=dash_cfg.get("sync_max_delay_seconds", 300),
+        worktree_path=dash_cfg.get("publish_worktree", repo_path.rstrip(os.sep) + "_publish"),
+        branch=dash_cfg.get("publish_branch", "dashboard-data"),
+        squash_every=dash_cfg.get("squash_every_commits", 100),
+        publish_targets=dash_cfg.get("publish_targets"),
+        stop_timeout_sec=dash_cfg.get("stop_timeout_seconds", 600))
+    dashboard_worker.start()
+
+    # Broker balances are cached between dashboard refreshes and re-fetched only when
+    # a real order was sent or the cache is older than broker_refresh_minutes
+    broker_cache = {"data": None, "fetched_at": 0.0, "stale": True}
 
     # Transaction Callback
     def on_transaction_complete(action, account_alias, code, price, qty):
         print(f"\n{'─'*60}")
         print(f"✅ Transaction: {action} {qty} {code} @ {price:,} KRW ({account_alias})")
         print(f"{'─'*60}\n")
+        if not config.get("dry_run", True):
+            broker_cache["stale"] = True
         try:
             save_accounts(list(accounts_map.values()), "trade_state.json")
         except Exception as e:
@@ -242,118 +448,301 @@ def main():
 
     print(f"Intervals:")
     print(f"  - Price/Follower Check : {check_interval_min} min")
+    polling = executor.polling_settings()
+    if polling["adaptive"]:
+        print(f"    (adaptive per strategy: {polling['min']}-{polling['max']}s, "
+              f"budget {polling['budget']} TRs/min)")
     print(f"  - Leader Buy Frequency : once per day (per strategy)")
     print(f"  - Dashboard Update     : {dashboard_interval_min} min")
     print("-" * 60)
 
-    # Confirm before starting
-    if not config.get('dry_run', False):
-        print("\n" + "!" * 60)
-        print("WARNING: DRY RUN MODE IS OFF - REAL TRADES WILL BE EXECUTED")
-        print("!" * 60)
-        response = input("\nType 'START' to begin real trading: ")
-        if response.strip().upper() != 'START':
-            print("Aborted by user.")
-            sys.exit(0)
-
-    # Main execution loop
+    # Main execution loop (scheduled jobs on the Qt event loop)
     print("\n" + "=" * 60)
     print("Starting Trading Loop")
     print("=" * 60)
     print("Press Ctrl+C to stop safely\n")
 
-    # Timestamps for interval tracking
-    now = time.time()
-    last_price_check_time = 0 # Force immediate run
-    last_dashboard_time = 0 # Force immediate run
-    
-    # File monitoring
-    try:
-        last_mtime = os.path.getmtime(config_path)
-    except OSError:
-        last_mtime = 0
-
+    scheduler = JobScheduler()
     iteration = 0
 
-    try:
-        while True:
-            # Responsive Sleep (1 sec tick)
-            time.sleep(1)
-            now = time.time()
-            
-            # --- Config Reload Monitor ---
-            try:
-                current_mtime = os.path.getmtime(config_path)
-                if current_mtime > last_mtime:
-                    print(f"\n🔄 Configuration file changed! Reloading...")
-                    time.sleep(0.5) # Wait for write
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        new_config = json.load(f)
-                    
-                    config = new_config
-                    last_mtime = current_mtime
-                    executor.update_config(config)
-                    
-                    # Update Intervals
-                    intervals = config.get("execution_intervals", {})
-                    check_interval_min = intervals.get("check_interval_minutes", 1)
-                    dashboard_interval_min = intervals.get("dashboard_interval_minutes", 10)
-                    print(f"   Intervals Updated: Check={check_interval_min}m, Dash={dashboard_interval_min}m")
-            except OSError:
-                pass
-
-            # --- Check Market Hours ---
-            if not check_market_open() and not config.get("ignore_market_hours", False):
-                 dt_now = datetime.now()
-                 if dt_now.weekday() >= 5 or dt_now.time() >= dtime(15, 31):
-                     print(f"\n[{dt_now.strftime('%H:%M:%S')}] Market closed for the day. Exiting ...")
-                     break
-
-                 if iteration % 60 == 0: # Log every minute
-                     print(f"[{dt_now.strftime('%H:%M:%S')}] Market closed. Waiting...", end='\r')
-                 continue
-
-            # ==============================================================================
-            # Core Logic - Independent Intervals
-            # ==============================================================================
-            
-            # 1. Price Check & Trading (Base Frequency: check_interval_min)
-            if now - last_price_check_time >= check_interval_min * 60:
-                iteration += 1
-                last_price_check_time = now
-                current_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                print(f"\nTime: {current_str} | Tick #{iteration}")
-                
-                # A. Execute Strategy (Price Check + Buy/Sell)
-                # Leader buy frequency is managed per-strategy inside StrategyExecutor (once per day)
-                executor.execute_step(allow_leader_buy=True)
-                
-                # B. Update Snapshots (for Graph)
-                update_account_snapshots(kiwoom, accounts_map)
-                
-                # C. Save State
-                save_accounts(list(accounts_map.values()), "trade_state.json")
-            
-            # 2. Dashboard Update & GitHub Sync (Independent Frequency)
-            if now - last_dashboard_time >= dashboard_interval_min * 60:
-                last_dashboard_time = now
-                print(f"\n🔄 Syncing Dashboard (Every {dashboard_interval_min} min)...")
-                
-                try:
-                    fetch_and_generate_portfolio(kiwoom)
-                    commit_msg = f"Auto-update: {datetime.now().strftime('%H:%M:%S')}"
-                    github_sync.sync_portfolio(commit_message=commit_msg)
-                    print("✅ Dashboard synced.")
-                except Exception as e:
-                    print(f"⚠️ Dashboard sync failed: {e}")
-
-    except KeyboardInterrupt:
+    # 1. Price Check & Trading (strategies are staggered over the check interval;
+    #    each tick only processes the strategies that are due)
+    def price_check_job():
+        nonlocal iteration
+        if not executor.due_strategies():
+            return
+        iteration += 1
+        current_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"\nTime: {current_str} | Tick #{iteration}")
+
+        # Execute Strategy (Price Check + Buy/Sell)
+        # Leader buy frequency is managed per-strategy inside StrategyExecutor (once per day)
+        tick_start = time.perf_counter()
+        executor.execute_step(allow_leader_buy=True)
+
+        if iteration == 1 and startup:
+            startup.record("first tick", time.perf_counter() - tick_start)
+            startup.report()
+
+    # 1b. Snapshots (for Graph) & Save State - own cadence (check interval),
+    #     one snapshot per account, stamped with the last tick and valued at the prices
+    #     the ticks observed since the previous snapshot (other held codes are fetched)
+    def snapshot_job():
+        tick_time, tick_prices = executor.take_tick_prices()
+        if tick_time is not None:
+            update_account_snapshots(kiwoom, accounts_map, valuation,
+                                     current_prices=tick_prices, timestamp=tick_time)
+        save_accounts(list(accounts_map.values()), "trade_state.json")
+
+    # 2. Dashboard Update & GitHub Sync (Independent Frequency)
+    def dashboard_job():
+        print(f"\n🔄 Syncing Dashboard (Every {dashboard_interval_min} min)...")
+        submit_dashboard()
+
+    def submit_dashboard():
+        try:
+            from generate_portfolio_json import fetch_broker_data
+
+            # Broker TRs must run here (the Kiwoom control lives in this process);
+            # building and publishing happen in the worker.
+            refresh_sec = config.get("execution_intervals", {}).get("broker_refresh_minutes", 10) * 60
+            if broker_cache["stale"] or time.time() - broker_cache["fetched_at"] >= refresh_sec:
+                broker_accounts = fetch_broker_data(kiwoom)
+                if broker_accounts is not None:
+                    broker_cache.update(data=broker_accounts, fetched_at=time.time(), stale=False)
+            if broker_cache["data"] is not None:
+                dashboard_worker.submit(broker_cache["data"], config, accounts_map.values(),
+                                        prices=executor.last_prices)
+                print("✅ Dashboard update queued.")
+                return True
+        except Exception as e:
+            print(f"⚠️ Dashboard sync failed: {e}")
+        return False
+
+    # 3. Config Hot Reload (change notifications + structural diff, no polling)
+    def on_config_changed(old_config, new_config, diff):
+        nonlocal config, check_interval_min, dashboard_interval_min
+        print(f"\n🔄 Configuration file changed! Applying diff...")
+        config = new_config
+        executor.apply_config_diff(new_config, diff)
+
+        # Strategy count or intervals may have changed the tick cadence
+        scheduler.set_interval("price_check", executor.tick_interval_seconds())
+
+        # Create virtual accounts for added/changed strategies on the fly
+        created = merge_config_accounts(new_config, accounts_map, diff["added"] + diff["changed"])
+        if created:
+            save_accounts(list(accounts_map.values()), "trade_state.json")
+            print(f"   Added {created} new accounts from config to state.")
+        if warm["done"] and hasattr(kiwoom, "subscribe_prices"):
+            kiwoom.subscribe_prices([s["stock_code"] for s in diff["added"] + diff["changed"]])
+
+        # Update Intervals
+        if "execution_intervals" in diff["settings"]:
+            intervals = new_config.get("execution_intervals", {})
+            check_interval_min = intervals.get("check_interval_minutes", 1)
+            dashboard_interval_min = intervals.get("dashboard_interval_minutes", 10)
+            scheduler.set_interval("snapshot", check_interval_min * 60)
+            scheduler.set_interval("dashboard", dashboard_interval_min * 60)
+            print(f"   Intervals Updated: Check={check_interval_min}m, Dash={dashboard_interval_min}m")
+
+    # 4. Pre-open Warm-up: everything the first tick would otherwise pay for
+    warm = {"done": False, "dashboard": False}
+
+    def warm_up():
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 🔥 Warm-up: priming state, balances and prices...")
+        start = time.perf_counter()
+        for issue in validate_accounts(config, accounts_map):
+            print(f"  ⚠️ {issue}")
+        valuation.sync(accounts_map)
+
+        # Deposit / holdings (also published right away, so the open does not wait for them)
+        warm["dashboard"] = submit_dashboard()
+
+        # Previous closes (pre-open) or current prices (late start) for every traded / held code
+        codes = list(dict.fromkeys([s["stock_code"] for s in config.get("strategies", [])] +
+                                   [c for acc in accounts_map.values() for c in acc.holdings]))
+        prices = prefetch_prices(kiwoom, codes)
+        levels = executor.warm_up(prices)
+        for s_id, distance in levels.items():
+            dist_str = "n/a" if distance is None else f"{distance * 100:.2f}%"
+            print(f"  {s_id}: nearest trigger {dist_str}")
+
+        # Real-time ticks replace per-strategy price TRs once the session starts
+        if hasattr(kiwoom, "subscribe_prices"):
+            added = kiwoom.subscribe_prices(codes)
+            print(f"  Subscribed {added} codes to real-time prices.")
+
+        warm["done"] = True
+        seconds = time.perf_counter() - start
+        if startup:
+            startup.record("warm-up", seconds)
+        print(f"✅ Warm-up done in {seconds:.1f}s ({len(prices)}/{len(codes)} prices).")
+
+    def start_session():
+        if not warm["done"]:
+            warm_up()  # Late start / restart mid-session
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Market open. Starting trading jobs.")
+        scheduler.add_job("price_check", executor.tick_interval_seconds(), price_check_job, run_now=True)
+        scheduler.add_job("snapshot", check_interval_min * 60, snapshot_job)
+        scheduler.add_job("dashboard", dashboard_interval_min * 60, dashboard_job,
+                          run_now=not warm["dashboard"])
+
+    # 5. End of Session
+    def end_session():
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Market closed for the day. Exiting ...")
+        scheduler.stop_all()
+        # End-of-day compaction: keep only open lots and recent trades hot
+        hot_days = config.get("history_hot_days", 7)
+        archived = compact_accounts(list(accounts_map.values()), "trade_state.json", hot_days=hot_days)
+        print(f"✅ State compacted ({archived} entries older than {hot_days} days archived).")
+        app.quit()
+
+    # --- Check Market Hours ---
+    dt_now = datetime.now()
+    if ignore_market_hours or calendar.is_open(dt_now):
+        start_session()
+    elif dt_now > session.close:
+        print(f"\n[{dt_now.strftime('%H:%M:%S')}] Market closed for the day. Exiting ...")
+        save_accounts(list(accounts_map.values()), "trade_state.json")
+        dashboard_worker.stop()
+        if metrics_server:
+            metrics_server.stop()
+        return
+    else:
+        print(f"[{dt_now.strftime('%H:%M:%S')}] Pre-open. Trading starts at {session.open.strftime('%H:%M')}...")
+        scheduler.add_at("warm_up", dt_now, warm_up)
+        scheduler.add_at("session_start", session.open, start_session)
+
+    if not ignore_market_hours:
+        scheduler.add_at("session_end", session.close + timedelta(minutes=1), end_session)
+
+    config_watcher = ConfigWatcher(config_path, on_config_changed, config=config)
+    if on_idle is not None:
+        idle_timer = QTimer()
+        idle_timer.timeout.connect(on_idle)
+        idle_timer.start(1000)
+
+    # Ctrl+C: Qt does not return to Python while idle, so a short heartbeat timer
+    # lets the interpreter run the SIGINT handler, which stops the event loop.
+    stopped_by_user = False
+
+    def on_sigint(signum, frame):
+        nonlocal stopped_by_user
+        stopped_by_user = True
+        app.quit()
+
+    signal.signal(signal.SIGINT, on_sigint)
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(lambda: None)
+    heartbeat.start(500)
+
+    app.exec_()
+
+    heartbeat.stop()
+    scheduler.stop_all()
+    dashboard_worker.stop()
+    if metrics_server:
+        metrics_server.stop()
+    if stopped_by_user:
         print("\n\n" + "=" * 60)
         print("Trading Bot Stopped by User")
         print("=" * 60)
-        # Save Final State
-        save_accounts(list(accounts_map.values()), "trade_state.json")
-        print("✅ Final state saved.")
+    # Save Final State
+    save_accounts(list(accounts_map.values()), "trade_state.json")
+    print("✅ Final state saved.")
+
+def main():
+    """
+    Real-time trading bot with independent execution intervals.
+    
+    Intervals (Configurable):
+    - Price Check & Follower Trading: ~1 min
+    - Leader Buying: ~20 min (throttled)
+    - Dashboard Update: ~10 min
+    """
+    # Load configuration
+    config_path = 'config.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    # Session calendar: on closed days, exit before any login or TR
+    calendar = KRXCalendar.from_config(config)
+    ignore_market_hours = config.get("ignore_market_hours", False)
+    session = None
+    if not ignore_market_hours:
+        session = wait_for_session(calendar, config.get("pre_open_lead_minutes", 10))
+        if session is None:
+            return
+
+    # Startup report (the pre-open sleep above is not counted)
+    startup = StartupReport(t0=time.perf_counter() - _IMPORT_SECONDS)
+    startup.record("module imports", _IMPORT_SECONDS)
+    split_mode = config.get("process_split", {}).get("enabled", False)
+
+    # Initialize Qt Application
+    with startup.phase("qt/kiwoom imports"):
+        from PyQt5.QtWidgets import QApplication
+        from kiwoom_api import Kiwoom
+    app = QApplication(sys.argv)
+
+    # Connect to Kiwoom API
+    print("=" * 60)
+    print("Real-Time Trading Bot - Starting")
+    print("=" * 60)
+    kiwoom = Kiwoom()
+
+    # Load the trade state on a worker thread while the (slow) login runs;
+    # in split mode the strategy process loads it instead.
+    state_loader = None
+    state_future = None
+    if not split_mode:
+        def load_state():
+            start = time.perf_counter()
+            accounts_map = initialize_accounts(config)
+            startup.record("state load (parallel)", time.perf_counter() - start)
+            return accounts_map
+
+        state_loader = ThreadPoolExecutor(max_workers=1)
+        state_future = state_loader.submit(load_state)
+
+    print("\nConnecting to Kiwoom API...")
+    try:
+        with startup.phase("login"):
+            kiwoom.comm_connect()
+        print("✅ Connected to Kiwoom API")
+    except Exception as e:
+        print(f"\n❌ Connection Failed: {e}")
+        sys.exit(1)
+
+    # Get account information
+    accounts_list = kiwoom.get_login_info("ACCNO")
+    if not accounts_list:
+        print("ERROR: No accounts found. Exiting.")
+        sys.exit(1)
+
+    # Select the account to use
+    real_account_no = config.get("real_account_id", accounts_list[0])
+    print(f"Using Real Account: {real_account_no}")
+
+    # Confirm before starting
+    if not config.get('dry_run', True):
+        print("\n" + "!" * 60)
+        print("WARNING: DRY RUN MODE IS OFF - REAL TRADES WILL BE EXECUTED")
+        print("!" * 60)
+        response = input("\nType 'START' to begin real trading: ")
+        if response.strip().upper() != 'START':
+            print("Aborted by user.")
+            sys.exit(0)
+
+    if split_mode:
+        run_gateway(app, kiwoom, config, config_path)
+    else:
+        with startup.phase("state load (wait)"):
+            accounts_map = state_future.result()
+        state_loader.shutdown()
+        run_trading_engine(app, kiwoom, config, config_path, calendar, session,
+                           accounts_map=accounts_map, startup=startup)
 
 if __name__ == "__main__":
     main()
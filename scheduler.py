@@ -0,0 +1,112 @@
+import time
+import traceback
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer
+
+from metrics import registry as metrics
+
+
+class Job:
+    def __init__(self, name, callback, interval_sec=None, single_shot=False):
+        self.name = name
+        self.callback = callback
+        self.interval_sec = interval_sec
+        self.single_shot = single_shot
+        self.timer = None
+        self.last_run = None
+        self.last_duration = None
+        self.run_count = 0
+
+
+class JobScheduler(QObject):
+    """
+    QTimer-based job scheduler running on the Qt application event loop.
+
+    Each job owns a QTimer, so nothing polls: the event loop sleeps until the next
+    job is due and real-time / chejan / message events are delivered in between.
+
+    Kiwoom TR calls spin a nested QEventLoop while waiting for data, which means a
+    timer can fire while another job is still inside a TR. Jobs therefore never run
+    re-entrantly: a job that fires while another one is running is queued and run
+    right after the current job finishes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = {}
+        self._running = None
+        self._pending = []
+
+    # --- Registration ---
+    def add_job(self, name, interval_sec, callback, run_now=False):
+        """Run `callback` every `interval_sec` seconds (optionally once right away)."""
+        self.remove_job(name)
+        job = Job(name, callback, interval_sec=interval_sec)
+        job.timer = QTimer(self)
+        job.timer.timeout.connect(lambda: self._trigger(job))
+        job.timer.start(int(interval_sec * 1000))
+        self.jobs[name] = job
+        if run_now:
+            QTimer.singleShot(0, lambda: self._trigger(job))
+        return job
+
+    def add_at(self, name, when, callback):
+        """Run `callback` once at wall-clock datetime `when` (immediately if in the past)."""
+        self.remove_job(name)
+        delay_ms = max(0, int((when - datetime.now()).total_seconds() * 1000))
+        job = Job(name, callback, single_shot=True)
+        job.timer = QTimer(self)
+        job.timer.setSingleShot(True)
+        job.timer.timeout.connect(lambda: self._trigger(job))
+        job.timer.start(delay_ms)
+        self.jobs[name] = job
+        return job
+
+    def set_interval(self, name, interval_sec):
+        job = self.jobs.get(name)
+        if job and not job.single_shot and job.interval_sec != interval_sec:
+            job.interval_sec = interval_sec
+            job.timer.start(int(interval_sec * 1000))
+
+    def remove_job(self, name):
+        job = self.jobs.pop(name, None)
+        if job:
+            job.timer.stop()
+            job.timer.deleteLater()
+        self._pending = [j for j in self._pending if j.name != name]
+
+    def stop_all(self):
+        for name in list(self.jobs.keys()):
+            self.remove_job(name)
+
+    # --- Execution ---
+    def _trigger(self, job):
+        if self.jobs.get(job.name) is not job:
+            return  # Removed or replaced meanwhile
+        if self._running is not None:
+            if job not in self._pending:
+                self._pending.append(job)
+            return
+
+        self._run(job)
+        while self._pending:
+            self._run(self._pending.pop(0))
+
+    def _run(self, job):
+        self._running = job
+        start = time.perf_counter()
+        try:
+            job.callback()
+        except Exception as e:
+            print(f"⚠️ Job '{job.name}' failed: {e}")
+            traceback.print_exc()
+        finally:
+            job.last_duration = time.perf_counter() - start
+            metrics.observe("scheduler_job_duration_seconds", job.last_duration, job=job.name)
+            job.last_run = datetime.now()
+            job.run_count += 1
+            self._running = None
+            if job.single_shot and self.jobs.get(job.name) is job:
+                self.jobs.pop(job.name)
+                job.timer.deleteLater()
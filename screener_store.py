@@ -0,0 +1,130 @@
+import json
+import os
+from datetime import datetime
+
+JOURNAL_FILE = "outputs/screener_journal.jsonl"
+
+
+class ScreenerJournal:
+    """
+    Append-only journal of a screener scan; it doubles as the scan's checkpoint.
+
+    The first line identifies the scan ({"scan_date": "YYYY-MM-DD"}), every further
+    line is one processed code: {"code": ..., "status": "ok" | "scrape_fail" |
+    "no_data", "row": {...}}, and a scan that ran to the end is closed by
+    {"completed": "YYYY-MM-DD HH:MM:SS"}. Lines are flushed as they are written, so a
+    crash loses at most the code being analyzed; a torn last line is ignored on load.
+    An unfinished scan is resumed whatever day it started: codes whose status is
+    "ok" are skipped, failed ones are tried again.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, fsync_every=20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.scan_date = None
+        self.completed = None  # Completion timestamp of a finished scan
+        self.done = set()    # Codes with a result row
+        self.failed = {}     # code -> last failure status
+        self._file = None
+        self._unsynced = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash
+                if "scan_date" in entry:
+                    self.scan_date = entry["scan_date"]
+                elif "completed" in entry:
+                    self.completed = entry["completed"]
+                elif entry.get("status") == "ok":
+                    self.done.add(entry["code"])
+                    self.failed.pop(entry["code"], None)
+                elif "code" in entry:
+                    self.failed[entry["code"]] = entry.get("status")
+
+    def start(self, fresh=False):
+        """
+        Open the journal for appending; a completed journal (or any, with `fresh`) is discarded.
+
+        Args:
+            fresh: Start a new scan even if an unfinished one exists
+
+        Returns:
+            bool: True if an existing scan is resumed
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        resume = not fresh and self.scan_date is not None and self.completed is None
+        if resume:
+            self._drop_torn_tail()
+            self._file = open(self.path, "a", encoding="utf-8")
+            return True
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.scan_date = today
+        self.completed = None
+        self.done = set()
+        self.failed = {}
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({"scan_date": today})
+        return False
+
+    def _drop_torn_tail(self):
+        """Cut a partially written last line, so the next record starts on its own line."""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def record(self, code, status, row=None):
+        entry = {"code": code, "status": status}
+        if row is not None:
+            entry["row"] = row
+        self._write(entry)
+        if status == "ok":
+            self.done.add(code)
+            self.failed.pop(code, None)
+        else:
+            self.failed[code] = status
+
+    def complete(self):
+        """Mark the scan as finished, so the next run starts a new one."""
+        self.completed = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._write({"completed": self.completed})
+
+    def close(self):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def rows(self):
+        """Result rows in journal order (latest row wins when a code appears twice)."""
+        rows = {}
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("status") == "ok" and "row" in entry:
+                    rows.pop(entry["code"], None)
+                    rows[entry["code"]] = entry["row"]
+        return list(rows.values())
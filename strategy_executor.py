@@ -1,5 +1,8 @@
 import datetime
+import math
 import random
+
+from metrics import registry as metrics
 # from state_manager import StateManager # Deprecated
 # from kiwoom_api import Kiwoom # Injected dependency
 
@@ -12,6 +15,49 @@ class StrategyExecutor:
         self.on_transaction_complete = on_transaction_complete
         self.total_capital = config.get("total_capital", 0)
         self._leader_last_buy_date = {}  # strategy_id -> "YYYY-MM-DD"
+        self.tick_time = None            # "YYYY-MM-DD HH:MM:SS" of the last execute_step
+        self.tick_prices = {}            # code -> price observed by ticks since take_tick_prices
+        self._plans = {}                 # strategy_id -> compiled plan (see compile_strategy)
+        self.last_prices = {}            # code -> most recent price seen (any step)
+        # Adaptive polling state
+        self._next_due = {}              # strategy_id -> epoch seconds when it should be checked next
+        self._desired_interval = {}      # strategy_id -> interval (sec) before TR budget scaling
+        self._vol = {}                   # code -> {"price", "time", "var"} (EWMA of squared log-return per second)
+        self._compile_all()
+        self._restore_leader_buy_dates()
+
+    def compile_strategy(self, strategy):
+        """
+        Resolve a strategy's leader/follower account configs once, instead of every tick.
+        Account configs are copied so the loaded config itself is never mutated.
+        """
+        s_id = strategy["id"]
+        leader_acc_cfg = None
+        followers_cfg = []
+        for acc_cfg in strategy.get("accounts", []):
+            acc_cfg = dict(acc_cfg)
+            # Reconstruct ID: {s_id}_{suffix}
+            acc_cfg["account_id"] = f"{s_id}_{acc_cfg['suffix']}"
+            if acc_cfg["strategy_type"] == "LEADER":
+                leader_acc_cfg = acc_cfg
+            else:
+                followers_cfg.append(acc_cfg)
+        return {"leader": leader_acc_cfg, "followers": followers_cfg}
+
+    def _compile_all(self):
+        self._plans = {s["id"]: self.compile_strategy(s) for s in self.config.get("strategies", [])}
+
+    def _restore_leader_buy_dates(self):
+        """Rebuild the once-per-day leader guard from today's trades kept in the hot state."""
+        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+        for strategy in self.config.get("strategies", []):
+            for acc_cfg in strategy.get("accounts", []):
+                if acc_cfg.get("strategy_type") != "LEADER":
+                    continue
+                account = self.accounts.get(f"{strategy['id']}_{acc_cfg['suffix']}")
+                if account and any(t["action"] == "BUY" and t["code"] == strategy["stock_code"]
+                                   for t in account.get_today_trades(today_str)):
+                    self._leader_last_buy_date[strategy["id"]] = today_str
 
     def update_config(self, new_config):
         """Updates the configuration dynamically."""
@@ -22,25 +68,281 @@ class StrategyExecutor:
         print(f"   - Total Capital: {self.total_capital:,} KRW")
         print(f"   - Dry Run: {self.is_dry_run}")
         print(f"   - Strategies: {len(new_config.get('strategies', []))}")
+        self._compile_all()
+
+    def apply_config_diff(self, new_config, diff):
+        """
+        Apply a structural config diff (see config_watcher.diff_config).
+        Only added/changed strategies are recompiled; untouched strategies keep their
+        compiled plan and per-strategy state (e.g. the leader's last buy date).
+        """
+        print(f"🔄 Applying config changes: +{len(diff['added'])} added, "
+              f"~{len(diff['changed'])} changed, -{len(diff['removed'])} removed")
+        self.config = new_config
+        self.is_dry_run = new_config.get("dry_run", True)
+        self.total_capital = new_config.get("total_capital", 0)
+        for key, (old_value, new_value) in diff["settings"].items():
+            print(f"   - {key}: {old_value} -> {new_value}")
+
+        for s_id in diff["removed"]:
+            self._plans.pop(s_id, None)
+            self._leader_last_buy_date.pop(s_id, None)
+            self._next_due.pop(s_id, None)
+            self._desired_interval.pop(s_id, None)
+            print(f"   - Removed strategy {s_id} (accounts kept in state)")
+
+        for strategy in diff["added"] + diff["changed"]:
+            self._plans[strategy["id"]] = self.compile_strategy(strategy)
+            self._next_due.pop(strategy["id"], None)  # Check right away with the new parameters
+            print(f"   - Rebuilt strategy {strategy['id']}")
+
+    # --- Adaptive Polling ---
+    def polling_settings(self):
+        """
+        Polling settings from config["execution_intervals"]:
+          adaptive              : poll each strategy by distance to its nearest trigger (default False)
+          check_interval_minutes: fixed interval when not adaptive
+          min_check_seconds     : fastest per-strategy interval (default 30)
+          max_check_seconds     : slowest per-strategy interval (default 900)
+          tr_budget_per_minute  : cap on price TRs per minute across all strategies (default 30)
+          stagger               : spread strategy checks evenly over the interval (default True)
+        """
+        intervals = self.config.get("execution_intervals", {})
+        base = intervals.get("check_interval_minutes", 1) * 60
+        return {
+            "adaptive": intervals.get("adaptive", False),
+            "stagger": intervals.get("stagger", True),
+            "base": base,
+            "min": intervals.get("min_check_seconds", 30),
+            "max": intervals.get("max_check_seconds", max(base, 900)),
+            "budget": intervals.get("tr_budget_per_minute", 30),
+        }
+
+    def _period(self, settings):
+        return settings["min"] if settings["adaptive"] else settings["base"]
+
+    def tick_interval_seconds(self):
+        """
+        How often execute_step should be called.
+        With staggering, one tick per strategy slot (period / number of strategies).
+        """
+        settings = self.polling_settings()
+        period = self._period(settings)
+        if not settings["stagger"]:
+            return period
+        return max(1.0, period / max(1, len(self.config.get("strategies", []))))
+
+    def _phase_offset(self, strategy_id, period):
+        """Deterministic phase offset: strategies are spaced evenly over the period in config order."""
+        ids = [s["id"] for s in self.config.get("strategies", [])]
+        idx = ids.index(strategy_id) if strategy_id in ids else 0
+        return period * idx / max(1, len(ids))
+
+    def _after_check(self, strategy_id, now_ts):
+        """Move a strategy's due time past now (unless adaptive polling already did)."""
+        if self._next_due.get(strategy_id, 0) > now_ts:
+            return
+        settings = self.polling_settings()
+        if settings["adaptive"]:
+            # Price fetch failed before scheduling: retry after the minimum interval
+            self._next_due[strategy_id] = now_ts + settings["min"]
+            return
+        # Fixed grid: keep the strategy's phase, skip slots that were missed
+        next_due = self._next_due.get(strategy_id, now_ts) + settings["base"]
+        while next_due <= now_ts:
+            next_due += settings["base"]
+        self._next_due[strategy_id] = next_due
+
+    def _update_volatility(self, code, price, now_ts, alpha=0.2):
+        state = self._vol.get(code)
+        if state and now_ts > state["time"] and state["price"] > 0:
+            r = math.log(price / state["price"])
+            var_per_sec = r * r / (now_ts - state["time"])
+            var = var_per_sec if state["var"] is None else alpha * var_per_sec + (1 - alpha) * state["var"]
+            self._vol[code] = {"price": price, "time": now_ts, "var": var}
+        else:
+            self._vol[code] = {"price": price, "time": now_ts, "var": state["var"] if state else None}
+
+    def trigger_distance(self, strategy_id, code, current_price, allow_leader_buy=True):
+        """
+        Relative distance (0.0 = at a trigger) from current_price to the nearest
+        buy or sell trigger of any account in the strategy. None if nothing can trigger.
+        """
+        plan = self._plans.get(strategy_id)
+        if not plan or not plan["leader"]:
+            return None
+        leader_cfg = plan["leader"]
+        leader_acc = self.accounts.get(leader_cfg["account_id"])
+        if leader_acc is None:
+            return None
+
+        distances = []
+        # Leader sell target
+        holding = leader_acc.holdings.get(code)
+        if holding and holding["qty"] > 0:
+            target = holding["avg_price"] * (1 + leader_cfg["params"].get("target_profit", 0.1))
+            distances.append((target - current_price) / current_price)
+        # Leader daily buy still pending -> act now, unless the price is outside the buy range
+        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+        if allow_leader_buy and self._leader_last_buy_date.get(strategy_id) != today_str \
+                and leader_acc.balance >= current_price:
+            price_lower = leader_cfg["params"].get("price_lower_limit", 0) or 0
+            price_upper = leader_cfg["params"].get("price_upper_limit")
+            if current_price < price_lower:
+                distances.append((price_lower - current_price) / current_price)
+            elif price_upper is not None and current_price > price_upper:
+                distances.append((current_price - price_upper) / current_price)
+            else:
+                distances.append(0.0)
+
+        leader_buy_prices = leader_acc.get_buy_prices(code)
+        for acc_cfg in plan["followers"]:
+            account = self.accounts.get(acc_cfg["account_id"])
+            if account is None:
+                continue
+            open_lots = account.get_open_lots(code)
+            for lot in open_lots:
+                if lot.get("target_sell_price"):
+                    distances.append((lot["target_sell_price"] - current_price) / current_price)
+            # Next dip-buy level for batches without an open lot (only if a buy is affordable)
+            if account.balance < current_price:
+                continue
+            dip = acc_cfg["params"].get("dip", 0.01)
+            open_refs = {lot.get("batch_ref") for lot in open_lots}
+            for batch_idx, batch_price in enumerate(leader_buy_prices):
+                if batch_idx not in open_refs:
+                    distances.append((current_price - batch_price * (1 - dip)) / current_price)
+
+        if not distances:
+            return None
+        return max(0.0, min(distances))
+
+    def _schedule_next(self, strategy_id, code, current_price, now_ts, allow_leader_buy=True):
+        """
+        Pick the next check time: poll so that a 3-sigma move over the interval
+        cannot skip past the nearest trigger unobserved, then apply the TR budget.
+        """
+        settings = self.polling_settings()
+        distance = self.trigger_distance(strategy_id, code, current_price, allow_leader_buy)
+        var = (self._vol.get(code) or {}).get("var")
+
+        if distance is None:
+            desired = settings["max"]
+        elif var is None or var <= 0:
+            desired = settings["base"] if distance > 0 else settings["min"]
+        else:
+            sigma = math.sqrt(var)
+            desired = (distance / (3 * sigma)) ** 2
+        desired = min(settings["max"], max(settings["min"], desired))
+        self._desired_interval[strategy_id] = desired
+
+        # Global TR budget: if the desired intervals add up to more TRs/min than allowed,
+        # stretch every interval by the same factor.
+        trs_per_min = sum(60.0 / i for i in self._desired_interval.values())
+        scale = max(1.0, trs_per_min / settings["budget"]) if settings["budget"] else 1.0
+        interval = desired * scale
+
+        self._next_due[strategy_id] = now_ts + interval
+        dist_str = "n/a" if distance is None else f"{distance * 100:.2f}%"
+        print(f"  Next check in {interval:.0f}s (nearest trigger {dist_str})")
+
+    def due_strategies(self, now_ts=None):
+        """Strategies due for a check (all of them when neither adaptive nor staggered)."""
+        strategies = self.config.get("strategies", [])
+        settings = self.polling_settings()
+        if not settings["adaptive"] and not settings["stagger"]:
+            return strategies
+        if now_ts is None:
+            now_ts = datetime.datetime.now().timestamp()
+
+        period = self._period(settings)
+        due = []
+        for strategy in strategies:
+            s_id = strategy["id"]
+            if s_id not in self._next_due:
+                self._next_due[s_id] = now_ts + (self._phase_offset(s_id, period) if settings["stagger"] else 0)
+            if self._next_due[s_id] <= now_ts:
+                due.append(strategy)
+        return due
+
+    # --- Prices & Warm-up ---
+    def get_price(self, code):
+        """
+        Current price as {'price': int}: the latest real-time tick if one arrived within
+        execution_intervals.real_time_max_age_seconds (default 60), otherwise a price TR.
+        """
+        get_real_price = getattr(self.kiwoom, "get_real_price", None)
+        if get_real_price is not None:
+            max_age = self.config.get("execution_intervals", {}).get("real_time_max_age_seconds", 60)
+            price = get_real_price(code, max_age)
+            if price:
+                metrics.inc("price_source_total", source="real_time")
+                return {"price": price}
+        metrics.inc("price_source_total", source="tr")
+        return self.kiwoom.get_current_price(code)
+
+    def warm_up(self, prices):
+        """
+        Prime per-strategy state before the open from previous closes ({code: price}):
+        compiled plans, last prices and trigger distances. The volatility estimate is
+        left empty: the overnight gap is not an intraday move.
+
+        Returns:
+            dict: {strategy_id: distance to the nearest trigger (None if nothing can trigger)}
+        """
+        levels = {}
+        for strategy in self.config.get("strategies", []):
+            s_id, code = strategy["id"], strategy["stock_code"]
+            if s_id not in self._plans:
+                self._plans[s_id] = self.compile_strategy(strategy)
+            price = prices.get(code)
+            if not price:
+                continue
+            self.last_prices[code] = price
+            levels[s_id] = self.trigger_distance(s_id, code, price)
+        return levels
 
     def execute_step(self, allow_leader_buy=True):
-        print(f"\n--- Execution Step: {datetime.datetime.now()} ---")
+        """
+        Run every due strategy once (see due_strategies).
+        Snapshots are not taken here: the caller records them from the prices and
+        time of the ticks (see take_tick_prices).
+
+        Returns:
+            dict: {code: price} observed since the last take_tick_prices
+        """
+        now = datetime.datetime.now()
+        print(f"\n--- Execution Step: {now} ---")
+        self.tick_time = now.strftime("%Y-%m-%d %H:%M:%S")
         
         if "strategies" not in self.config:
             print("⚠️  No strategies found in config.")
-            return
-
-        # Snapshot account performance before processing
-        # We need current prices to calculate equity. 
-        # Ideally we fetch prices for all stocks first, or do it per strategy.
-        # For simplicity, we'll do it per strategy here, or just inside process_strategy.
-        
-        for strategy in self.config["strategies"]:
-            self.process_strategy(strategy, allow_leader_buy)
-            if not self.is_dry_run:
+            return self.tick_prices
+
+        due = self.due_strategies(now.timestamp())
+        for i, strategy in enumerate(due):
+            with metrics.timed("strategy_process_seconds", strategy=strategy["id"]):
+                self.process_strategy(strategy, allow_leader_buy)
+            metrics.inc("strategy_checks_total", strategy=strategy["id"])
+            self._after_check(strategy["id"], now.timestamp())
+            if not self.is_dry_run and i < len(due) - 1:
                 import time
                 time.sleep(0.5) # Prevent Rate Limiting
+
+        return self.tick_prices
             
+    def take_tick_prices(self):
+        """
+        Prices observed by the ticks since the previous call, and the start of the last tick.
+
+        Returns:
+            tuple: (tick_time or None if no tick ran since the previous call, {code: price})
+        """
+        prices, self.tick_prices = self.tick_prices, {}
+        tick_time = self.tick_time
+        self.tick_time = None
+        return tick_time, prices
+
     def process_strategy(self, strategy, allow_leader_buy=True):
         s_id = strategy["id"]
         code = strategy["stock_code"]
@@ -50,7 +352,8 @@ class StrategyExecutor:
         
         # 1. Get Current Price
         try:
-            current_data = self.kiwoom.get_current_price(code)
+            with metrics.timed("tick_phase_seconds", phase="price"):
+                current_data = self.get_price(code)
             if not current_data or 'price' not in current_data:
                 print(f"⚠️  [{s_id}] Failed to get price for {name}. Skipping.")
                 return
@@ -64,35 +367,31 @@ class StrategyExecutor:
             return
             
         print(f"  Price: {current_price:,} KRW")
+        self.tick_prices[code] = current_price
+        self.last_prices[code] = current_price
+        now_ts = datetime.datetime.now().timestamp()
+        self._update_volatility(code, current_price, now_ts)
         
-        # Identify Leader and Followers
-        # Strategy config still has "accounts" list with suffix/ratio/type
-        # We need to find the corresponding Account IDs.
-        
-        leader_acc_cfg = None
-        followers_cfg = []
-        
-        for acc_cfg in strategy["accounts"]:
-            # Reconstruct ID: {s_id}_{suffix}
-            acc_id = f"{s_id}_{acc_cfg['suffix']}"
-            acc_cfg["account_id"] = acc_id # Inject ID for easy access
-            
-            # Update Snapshot for this account
-            if acc_id in self.accounts:
-                self.accounts[acc_id].update_snapshot({code: current_price})
-            
-            if acc_cfg["strategy_type"] == "LEADER":
-                leader_acc_cfg = acc_cfg
-            else:
-                followers_cfg.append(acc_cfg)
+        # Identify Leader and Followers (compiled once per config change)
+        plan = self._plans.get(s_id)
+        if plan is None:
+            plan = self._plans[s_id] = self.compile_strategy(strategy)
+        leader_acc_cfg = plan["leader"]
+        followers_cfg = plan["followers"]
         
         # 2. Process Leader
         if leader_acc_cfg:
-            self.process_leader(leader_acc_cfg, code, current_price, allow_leader_buy, strategy_id=s_id)
+            with metrics.timed("tick_phase_seconds", phase="leader"):
+                self.process_leader(leader_acc_cfg, code, current_price, allow_leader_buy, strategy_id=s_id)
 
         # 3. Process Followers
         if leader_acc_cfg and followers_cfg:
-             self.process_followers(leader_acc_cfg, followers_cfg, code, current_price)
+            with metrics.timed("tick_phase_seconds", phase="followers"):
+                self.process_followers(leader_acc_cfg, followers_cfg, code, current_price)
+
+        # 4. Next check time (adaptive polling)
+        if self.polling_settings()["adaptive"]:
+            self._schedule_next(s_id, code, current_price, now_ts, allow_leader_buy)
 
     def process_leader(self, acc_config, code, current_price, allow_buy=True, strategy_id=None):
         acc_id = acc_config["account_id"]
@@ -165,11 +464,10 @@ class StrategyExecutor:
         leader_ratio = leader_cfg.get("ratio", 0.40)
         leader_buy_amount = leader_cfg["params"].get("buy_amount", 200000)
 
-        # Get Leader History (Batches)
-        leader_buys = [t for t in leader_acc.history
-                        if t["code"] == code and t["action"] == "BUY"]
+        # Leader Batches (BUY prices kept in the account aggregates, no history scan)
+        leader_buy_prices = leader_acc.get_buy_prices(code)
 
-        num_batches = len(leader_buys)
+        num_batches = len(leader_buy_prices)
 
         for acc_config in followers_cfg:
             acc_id = acc_config["account_id"]
@@ -182,8 +480,7 @@ class StrategyExecutor:
             follower_ratio = acc_config.get("ratio", 0.15)
 
             # --- Per-Lot Sell Logic (process sells first so cash is available for buys) ---
-            open_lots = [t for t in account.history
-                         if t["code"] == code and t["action"] == "BUY" and t.get("status") == "OPEN"]
+            open_lots = account.get_open_lots(code)
 
             for lot in open_lots:
                 target_sell = lot.get("target_sell_price")
@@ -193,11 +490,10 @@ class StrategyExecutor:
                           f"{current_price} >= {target_sell:.0f} (Buy@ {lot['price']:,}), Qty {lot_qty}")
                     self._execute_trade(account, code, "SELL", current_price, lot_qty,
                                         batch_ref=lot.get("batch_ref"))
-                    lot["status"] = "CLOSED"
+                    account.close_lot(lot)
 
             # --- Fallback: aggregate sell for legacy positions without status field ---
-            remaining_open = [t for t in account.history
-                              if t["code"] == code and t["action"] == "BUY" and t.get("status") == "OPEN"]
+            remaining_open = account.get_open_lots(code)
             if (code in account.holdings and account.holdings[code]["qty"] > 0
                     and not remaining_open):
                 avg_p = account.holdings[code]["avg_price"]
@@ -210,15 +506,13 @@ class StrategyExecutor:
 
             # --- Self-Cycling Buy Logic ---
             # Which leader batches already have an OPEN lot?
-            open_batch_refs = {t.get("batch_ref") for t in account.history
-                               if t["code"] == code and t["action"] == "BUY" and t.get("status") == "OPEN"}
+            open_batch_refs = {t.get("batch_ref") for t in remaining_open}
 
             for batch_idx in range(num_batches):
                 if batch_idx in open_batch_refs:
                     continue  # Already have an open lot for this batch
 
-                leader_batch = leader_buys[batch_idx]
-                leader_batch_price = leader_batch["price"]
+                leader_batch_price = leader_buy_prices[batch_idx]
                 target_buy_price = leader_batch_price * (1 - dip_threshold)
 
                 if current_price <= target_buy_price:
@@ -313,6 +607,9 @@ class StrategyExecutor:
                      success, msg = account.sell(code, price, qty, **trade_meta)
                      if success: transaction_executed = True
         
+        if transaction_executed:
+            metrics.inc("virtual_trades_total", action=action, mode="dry_run" if self.is_dry_run else "live")
+
         # Call post-transaction callback if transaction was executed
         if transaction_executed and self.on_transaction_complete:
             try:
@@ -0,0 +1,84 @@
+import json
+
+from account_manager import Account, HistoryStore, history_dir_for, load_accounts, save_accounts
+
+LEADER = {"strategy_type": "LEADER"}
+FOLLOWER = {"strategy_type": "FOLLOWER"}
+
+
+def _legacy_state():
+    """Old-style account dict with the full trade history and snapshots inline."""
+    return {
+        "account_id": "Samsung_2",
+        "principal": 1000000,
+        "stock_code": "005930",
+        "balance": 800000,
+        "strategy_config": FOLLOWER,
+        "holdings": {"005930": {"qty": 2, "avg_price": 50000, "total_cost": 100000}},
+        "history": [
+            {"action": "BUY", "code": "005930", "price": 50000, "qty": 2, "time": "2026-01-05 09:10:00",
+             "status": "CLOSED", "closed_time": "2026-01-06 10:00:00"},
+            {"action": "SELL", "code": "005930", "price": 55000, "qty": 2, "time": "2026-01-06 10:00:00",
+             "pnl": 10000},
+            {"action": "BUY", "code": "005930", "price": 50000, "qty": 2, "time": "2026-01-07 09:10:00",
+             "status": "OPEN", "batch_ref": 0},
+        ],
+        "performance_log": [{"time": "2026-01-06 15:30:00", "total_value": 1010000}],
+    }
+
+
+def test_legacy_state_is_migrated_to_the_history_store(tmp_path):
+    state_file = str(tmp_path / "trade_state.json")
+    acc = Account.from_dict(_legacy_state())
+
+    assert acc.stats["buy_count"] == 2
+    assert acc.stats["sell_count"] == 1
+    assert acc.stats["realized_pnl"] == 10000
+    assert [lot["time"] for lot in acc.get_open_lots("005930")] == ["2026-01-07 09:10:00"]
+
+    save_accounts([acc], state_file)
+    with open(state_file, encoding="utf-8") as f:
+        saved = json.load(f)[0]
+    assert "history" not in saved and "performance_log" not in saved
+    assert len(saved["open_lots"]) == 1
+
+    # Closed trades and snapshots went to the store; the open lot stays hot
+    store = HistoryStore(history_dir_for(state_file))
+    assert [t["action"] for t in store.read("Samsung_2", "history")] == ["BUY", "SELL"]
+    assert len(store.read("Samsung_2", "perf")) == 1
+
+    reloaded = load_accounts(state_file)[0]
+    assert [t["time"] for t in reloaded.history] == [t["time"] for t in _legacy_state()["history"]]
+    assert reloaded.stats == acc.stats
+
+
+def test_flush_history_appends_only_new_entries(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    acc = Account("Samsung_1", 1000000, stock_code="005930", strategy_config=LEADER)
+    acc.buy("005930", 100, 1, timestamp="2026-01-05 09:00:00")
+    acc.sell("005930", 110, 1, timestamp="2026-01-05 10:00:00")
+    acc.update_snapshot({}, timestamp="2026-01-05 15:30:00")
+    acc.flush_history(store)
+    acc.flush_history(store)  # Nothing new: must not duplicate
+
+    assert len(store.read("Samsung_1", "history")) == 2
+    assert len(store.read("Samsung_1", "perf")) == 1
+
+    acc.buy("005930", 100, 1, timestamp="2026-01-06 09:00:00")
+    acc.flush_history(store)
+    assert [t["time"][:10] for t in store.read("Samsung_1", "history")] == \
+        ["2026-01-05", "2026-01-05", "2026-01-06"]
+
+
+def test_buy_prices_are_kept_for_leader_batches_only():
+    leader = Account("Samsung_1", 1000000, strategy_config=LEADER)
+    leader.buy("005930", 100, 1)
+    leader.buy("005930", 90, 1)
+    assert leader.get_buy_prices("005930") == [100, 90]
+
+    follower = Account("Samsung_2", 1000000, strategy_config=FOLLOWER,
+                       stats={"buy_count": 1, "sell_count": 0, "realized_pnl": 0,
+                              "buy_prices": {"005930": [100]}})
+    follower.buy("005930", 95, 1, status="OPEN", batch_ref=0)
+    assert follower.get_buy_prices("005930") == []
+    assert len(follower.get_open_lots("005930")) == 1
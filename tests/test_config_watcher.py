@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("PyQt5")  # config_watcher imports QtCore at module level
+
+from config_watcher import diff_config, has_changes  # noqa: E402
+
+
+def _strategy(s_id, **extra):
+    strategy = {"id": s_id, "stock_code": "005930", "accounts": []}
+    strategy.update(extra)
+    return strategy
+
+
+def test_diff_config_reports_strategies_and_settings():
+    old = {"dry_run": True, "strategies": [_strategy("A"), _strategy("B"), _strategy("C")]}
+    new = {"dry_run": False, "total_capital": 1, "strategies": [
+        _strategy("A"), _strategy("B", sector="IT"), _strategy("D")]}
+
+    diff = diff_config(old, new)
+    assert [s["id"] for s in diff["added"]] == ["D"]
+    assert diff["removed"] == ["C"]
+    assert [s["id"] for s in diff["changed"]] == ["B"]
+    assert diff["settings"] == {"dry_run": (True, False), "total_capital": (None, 1)}
+    assert has_changes(diff)
+
+
+def test_identical_configs_have_no_changes():
+    config = {"dry_run": True, "strategies": [_strategy("A")]}
+    assert not has_changes(diff_config(config, {"dry_run": True, "strategies": [_strategy("A")]}))
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from fundamentals_cache import FundamentalsCache, next_release
+
+
+def test_next_release_of_actual_and_estimate_periods():
+    # Actuals for FY2024 are out: next are FY2025's, ~45 days after 2025-12-31
+    assert next_release("2024.12") == datetime(2026, 2, 14)
+    # An estimate column is replaced by the actuals of that same year
+    assert next_release("2025.12(E)") == datetime(2026, 2, 14)
+    assert next_release("2025.03") == datetime(2026, 5, 15)
+    assert next_release("") is None
+    assert next_release(None) is None
+
+
+def test_is_fresh_respects_ttl_and_expected_release(tmp_path):
+    cache = FundamentalsCache(path=str(tmp_path / "cache.json"), ttl_days=14)
+    fetched = datetime(2026, 1, 10).timestamp()
+    entry = {"period": "2024.12", "fetched_at": fetched, "data": {}}
+
+    assert cache.is_fresh(entry, now=datetime(2026, 1, 20).timestamp())
+    assert not cache.is_fresh(entry, now=datetime(2026, 1, 25).timestamp())  # Older than the TTL
+
+    # Fetched before the FY2025 release date, checked after it: revalidate despite the TTL
+    entry["fetched_at"] = datetime(2026, 2, 10).timestamp()
+    assert not cache.is_fresh(entry, now=datetime(2026, 2, 15).timestamp())
+    # Fetched after the release date: fresh until the TTL
+    entry["fetched_at"] = datetime(2026, 2, 15).timestamp()
+    assert cache.is_fresh(entry, now=datetime(2026, 2, 20).timestamp())
+
+
+def test_cache_round_trips_through_disk(tmp_path):
+    path = str(tmp_path / "cache.json")
+    now = datetime(2026, 1, 10).timestamp()
+    cache = FundamentalsCache(path=path, save_every=1)
+    cache.put("005930", {"Period": "2024.12", "PER": 10.0}, now=now)
+
+    reloaded = FundamentalsCache(path=path)
+    assert reloaded.get("005930", now=now) == {"Period": "2024.12", "PER": 10.0}
+    assert reloaded.get("000660", now=now) is None
+    assert (reloaded.hits, reloaded.misses) == (1, 1)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from publishers import GitPublisher
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+PATHS = ["outputs/portfolio.base.json", "outputs/portfolio_patches", "outputs/portfolio.manifest.json"]
+
+
+def _git(cwd, *args):
+    result = subprocess.run(["git", "-C", str(cwd)] + list(args), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def _write(root, rel_path, text):
+    path = os.path.join(str(root), rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "test@example.com")
+    remote = tmp_path / "remote.git"
+    root = tmp_path / "repo"
+    _git(tmp_path, "init", "-q", "--bare", str(remote))
+    _git(tmp_path, "init", "-q", str(root))
+    _write(root, "trader.py", "print('code')\n")
+    _git(root, "add", "trader.py")
+    _git(root, "commit", "-q", "-m", "code")
+    _git(root, "remote", "add", "origin", str(remote))
+    _write(root, "outputs/portfolio.base.json", '{"seq": 1}')
+    _write(root, "outputs/portfolio.manifest.json", '{"seq": 1}')
+    return root, remote
+
+
+def test_publishes_data_only_branch_and_squashes(repo, tmp_path):
+    root, remote = repo
+    publisher = GitPublisher(str(root), worktree_path=str(tmp_path / "publish"), squash_every=2)
+
+    # Base only: the patch directory does not exist yet
+    assert publisher.publish(PATHS, commit_message="one")
+    assert _git(remote, "ls-tree", "-r", "--name-only", "dashboard-data").splitlines() == [
+        "outputs/portfolio.base.json", "outputs/portfolio.manifest.json"]
+
+    _write(root, "outputs/portfolio_patches/000002.json", "[2]")
+    _write(root, "outputs/portfolio.manifest.json", '{"seq": 2}')
+    assert publisher.publish([os.path.join(str(root), p) for p in PATHS], commit_message="two")
+
+    # Rebase: the patches are gone again, and the third commit triggers the squash
+    shutil.rmtree(os.path.join(str(root), "outputs", "portfolio_patches"))
+    _write(root, "outputs/portfolio.base.json", '{"seq": 3}')
+    _write(root, "outputs/portfolio.manifest.json", '{"seq": 3}')
+    assert publisher.publish(PATHS, commit_message="three")
+
+    assert _git(remote, "rev-list", "--count", "dashboard-data") == "1"
+    assert "portfolio_patches" not in _git(remote, "ls-tree", "-r", "--name-only", "dashboard-data")
+    assert _git(remote, "show", "dashboard-data:outputs/portfolio.manifest.json") == '{"seq": 3}'
+    # The trader's own checkout is untouched
+    assert _git(root, "status", "--porcelain", "--untracked-files=no") == ""
+    assert _git(root, "rev-parse", "--abbrev-ref", "HEAD") != "dashboard-data"
+
+
+def test_unchanged_content_does_not_commit(repo, tmp_path):
+    root, remote = repo
+    publisher = GitPublisher(str(root), worktree_path=str(tmp_path / "publish"))
+    assert publisher.publish(PATHS)
+    head = _git(remote, "rev-parse", "dashboard-data")
+    publisher.last_hash = None  # Force the git-level check as well
+    assert publisher.publish(PATHS)
+    assert _git(remote, "rev-parse", "dashboard-data") == head
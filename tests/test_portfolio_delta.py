@@ -0,0 +1,106 @@
+import copy
+import json
+import random
+
+import pytest
+
+from portfolio_delta import BASE_FILE, DeltaWriter, apply_patch, diff_json, materialize
+
+
+def _round_trip(old, new):
+    # Patches reach clients as JSON, so they are applied after a dump / load
+    ops = json.loads(json.dumps(diff_json(old, new)))
+    return apply_patch(copy.deepcopy(old), ops)
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(4 if depth < 3 else 2)
+    if kind == 0:
+        return rng.randrange(5)
+    if kind == 1:
+        return rng.choice(["a", "b", None, 1.5])
+    if kind == 2:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(6))]
+    return {rng.choice("abcde"): _random_value(rng, depth + 1) for _ in range(rng.randrange(4))}
+
+
+def _mutate(rng, value):
+    if isinstance(value, list):
+        value = [_mutate(rng, v) if rng.random() < 0.3 else v for v in value]
+        roll = rng.random()
+        if roll < 0.25 and value:
+            del value[:rng.randrange(1, len(value) + 1)]
+        elif roll < 0.5 and value:
+            del value[rng.randrange(len(value)):]
+        if rng.random() < 0.5:
+            value.extend(_random_value(rng, 2) for _ in range(rng.randrange(4)))
+        return value
+    if isinstance(value, dict):
+        value = {k: _mutate(rng, v) if rng.random() < 0.3 else v for k, v in value.items()}
+        if value and rng.random() < 0.3:
+            del value[rng.choice(sorted(value))]
+        if rng.random() < 0.3:
+            value[rng.choice("abcdef")] = _random_value(rng, 2)
+        return value
+    return _random_value(rng, 2) if rng.random() < 0.5 else value
+
+
+@pytest.mark.parametrize("old, new", [
+    ([1, 2, 3], [2, 3, 4]),           # sliding window
+    ([1, 2, 3, 4], [2, 3, 4, 5, 6]),  # window that also grew
+    ([1, 2, 3, 4, 5], [1, 2]),        # truncation
+    ([1, 2], [2]),                    # shrank from the front
+    ([1], [2]),
+    ([], [1, 2]),
+    ([1, 2], []),
+    ({"a": [1, 2, 3]}, {"a": [2, 3, 4]}),
+    ({"a": 1, "b": 2}, {"b": 3, "c": 4}),
+    ({"a": [1]}, {"a": {"x": 1}}),
+])
+def test_diff_round_trip(old, new):
+    assert _round_trip(old, new) == new
+
+
+@pytest.mark.parametrize("root", [list, dict])
+def test_diff_round_trip_random(root):
+    rng = random.Random(42)
+    for _ in range(2000):
+        old = _random_value(rng, 1)
+        old = root([old] if root is list else {"x": old}) if not isinstance(old, root) else old
+        new = _mutate(rng, copy.deepcopy(old))
+        assert _round_trip(old, new) == new, (old, new)
+
+
+def test_unchanged_document_has_no_ops():
+    doc = {"a": [1, 2], "b": {"c": 1}}
+    assert diff_json(doc, copy.deepcopy(doc)) == []
+
+
+def test_writer_chain_materializes_and_restores(tmp_path):
+    writer = DeltaWriter(str(tmp_path), rebase_every=3, rebase_ratio=100)
+    doc = None
+    for i in range(8):
+        doc = {"value": i, "points": list(range(i, i + 4)), "names": {"n%d" % i: i}}
+        writer.write(doc)
+        assert materialize(str(tmp_path)) == doc
+
+    restored = DeltaWriter(str(tmp_path))
+    assert restored.current == doc
+    assert restored.seq == writer.seq
+    assert restored.write(doc) == 0
+
+
+def test_base_of_another_chain_is_not_replayed(tmp_path):
+    writer = DeltaWriter(str(tmp_path), rebase_every=10, rebase_ratio=100)
+    writer.write({"value": 1})
+    writer.write({"value": 2})
+    # Crash during a rebase: the new base is on disk, the manifest still names the old one
+    (tmp_path / BASE_FILE).write_text(json.dumps({"seq": 5, "data": {"value": 9}}), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        materialize(str(tmp_path))
+    restored = DeltaWriter(str(tmp_path))
+    assert restored.current is None
+    restored.write({"value": 3})
+    assert restored.seq == 6
+    assert materialize(str(tmp_path)) == {"value": 3}
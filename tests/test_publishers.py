@@ -0,0 +1,146 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from publishers import HttpPublisher, LocalDirPublisher, Publisher, build_publishers, content_hash
+
+
+class RecordingPublisher(Publisher):
+    def __init__(self, repo_path, ok=True):
+        super().__init__(repo_path)
+        self.ok = ok
+        self.calls = []
+
+    def _publish(self, paths, digest, commit_message):
+        self.calls.append(paths)
+        return self.ok
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    _write(str(root / "outputs" / "portfolio.base.json"), "{}")
+    _write(str(root / "outputs" / "portfolio_patches" / "000002.json"), "[2]")
+    _write(str(root / "outputs" / "portfolio.manifest.json"), '{"seq": 2}')
+    return str(root)
+
+
+PATHS = ["outputs/portfolio.base.json", "outputs/portfolio_patches", "outputs/portfolio.manifest.json"]
+
+
+def test_unchanged_content_is_not_published_again(repo):
+    publisher = RecordingPublisher(repo)
+    assert publisher.publish(PATHS)
+    assert publisher.publish(PATHS)
+    assert len(publisher.calls) == 1
+
+    _write(os.path.join(repo, "outputs", "portfolio_patches", "000003.json"), "[3]")
+    assert publisher.publish(PATHS)
+    assert len(publisher.calls) == 2
+
+
+def test_failed_publish_is_retried(repo):
+    publisher = RecordingPublisher(repo, ok=False)
+    assert not publisher.publish(PATHS)
+    publisher.ok = True
+    assert publisher.publish(PATHS)
+    assert len(publisher.calls) == 2
+
+
+def test_absolute_paths_are_made_repository_relative(repo):
+    publisher = RecordingPublisher(repo)
+    publisher.publish([os.path.join(repo, p) for p in PATHS])
+    assert publisher.calls == [PATHS]
+    assert publisher.last_hash == content_hash(repo, PATHS)
+
+
+def test_content_hash_covers_names_and_bytes(repo):
+    digest = content_hash(repo, PATHS)
+    os.rename(os.path.join(repo, "outputs", "portfolio_patches", "000002.json"),
+              os.path.join(repo, "outputs", "portfolio_patches", "000009.json"))
+    assert content_hash(repo, PATHS) != digest
+
+
+def test_local_dir_publisher_mirrors_removed_files(repo, tmp_path):
+    target = str(tmp_path / "site")
+    publisher = LocalDirPublisher(repo, target)
+    assert publisher.publish(PATHS)
+    assert os.path.exists(os.path.join(target, "outputs", "portfolio_patches", "000002.json"))
+
+    os.remove(os.path.join(repo, "outputs", "portfolio_patches", "000002.json"))
+    assert publisher.publish(PATHS)
+    assert os.listdir(os.path.join(target, "outputs", "portfolio_patches")) == []
+    with open(os.path.join(target, "outputs", "portfolio.manifest.json"), encoding="utf-8") as f:
+        assert f.read() == '{"seq": 2}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(("PUT", self.path, body))
+        self.send_response(204)
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.server.requests.append(("DELETE", self.path, None))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_publisher_sends_only_changed_files(repo, http_server):
+    url = f"http://127.0.0.1:{http_server.server_port}/data"
+    publisher = HttpPublisher(repo, url)
+    assert publisher.publish(PATHS)
+    assert sorted(path for _, path, _ in http_server.requests) == [
+        "/data/outputs/portfolio.base.json",
+        "/data/outputs/portfolio.manifest.json",
+        "/data/outputs/portfolio_patches/000002.json",
+    ]
+
+    del http_server.requests[:]
+    os.remove(os.path.join(repo, "outputs", "portfolio_patches", "000002.json"))
+    _write(os.path.join(repo, "outputs", "portfolio_patches", "000003.json"), "[3]")
+    _write(os.path.join(repo, "outputs", "portfolio.manifest.json"), '{"seq": 3}')
+    assert publisher.publish(PATHS)
+    assert sorted((method, path) for method, path, _ in http_server.requests) == [
+        ("DELETE", "/data/outputs/portfolio_patches/000002.json"),
+        ("PUT", "/data/outputs/portfolio.manifest.json"),
+        ("PUT", "/data/outputs/portfolio_patches/000003.json"),
+    ]
+
+
+def test_http_publisher_reports_unreachable_target(repo):
+    publisher = HttpPublisher(repo, "http://127.0.0.1:9/data", timeout=1)
+    assert not publisher.publish(PATHS)
+    assert publisher.last_hash is None
+
+
+def test_build_publishers_skips_invalid_targets(repo, tmp_path):
+    publishers = build_publishers([
+        {"type": "local", "path": str(tmp_path / "site"), "when": "end_of_day"},
+        {"type": "ftp"},
+        {"type": "http"},  # Missing url
+    ], repo)
+    assert [(type(p).__name__, p.when) for p in publishers] == [("LocalDirPublisher", "end_of_day")]
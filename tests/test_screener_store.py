@@ -0,0 +1,69 @@
+import json
+
+from screener_store import ScreenerJournal
+
+
+def _journal(tmp_path):
+    return ScreenerJournal(path=str(tmp_path / "journal.jsonl"))
+
+
+def test_unfinished_scan_is_resumed(tmp_path):
+    journal = _journal(tmp_path)
+    assert journal.start() is False
+    journal.record("000001", "ok", {"Code": "000001"})
+    journal.record("000002", "scrape_fail")
+    journal.close()
+
+    # Even when it started on another day
+    path = tmp_path / "journal.jsonl"
+    lines = path.read_text(encoding="utf-8").splitlines()
+    lines[0] = json.dumps({"scan_date": "2026-01-01"})
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    resumed = _journal(tmp_path)
+    assert resumed.start() is True
+    assert resumed.scan_date == "2026-01-01"
+    assert resumed.done == {"000001"}
+    assert resumed.failed == {"000002": "scrape_fail"}
+    resumed.record("000002", "ok", {"Code": "000002"})
+    resumed.close()
+    assert [r["Code"] for r in _journal(tmp_path).rows()] == ["000001", "000002"]
+
+
+def test_completed_or_fresh_scan_starts_over(tmp_path):
+    journal = _journal(tmp_path)
+    journal.start()
+    journal.record("000001", "ok", {"Code": "000001"})
+    journal.complete()
+    journal.close()
+
+    again = _journal(tmp_path)
+    assert again.completed is not None
+    assert again.start() is False
+    assert again.done == set()
+    again.record("000003", "ok", {"Code": "000003"})
+    again.close()
+
+    fresh = _journal(tmp_path)
+    assert fresh.start(fresh=True) is False
+    fresh.close()
+    assert fresh.rows() == []
+
+
+def test_torn_last_line_is_dropped_on_resume(tmp_path):
+    journal = _journal(tmp_path)
+    journal.start()
+    journal.record("000001", "ok", {"Code": "000001"})
+    journal.close()
+    with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"code": "000002", "sta')  # Crash mid-write
+
+    resumed = _journal(tmp_path)
+    assert resumed.done == {"000001"}
+    assert resumed.start() is True
+    resumed.record("000002", "ok", {"Code": "000002"})
+    resumed.close()
+
+    lines = (tmp_path / "journal.jsonl").read_text(encoding="utf-8").splitlines()
+    assert all(json.loads(line) for line in lines)
+    assert [r["Code"] for r in _journal(tmp_path).rows()] == ["000001", "000002"]
@@ -0,0 +1,148 @@
+import numpy as np
+
+from metrics import registry as metrics
+
+
+class PortfolioValuation:
+    """
+    Vectorized valuation of all virtual accounts.
+
+    Keeps an accounts x codes quantity matrix and cost-basis matrix so that equity,
+    PnL and PnL rate for every account come from matrix-vector products with the
+    current price vector, instead of looping over holdings per account.
+
+    Rows are refreshed only for accounts whose `version` changed since the last sync
+    (i.e. accounts that traded), so the per-tick cost is two mat-vecs plus a cash read.
+    """
+
+    def __init__(self, accounts_map=None):
+        self.account_ids = []
+        self.codes = []
+        self._account_index = {}
+        self._code_index = {}
+        self._accounts = []
+        self._versions = []
+
+        self.qty = np.zeros((0, 0))
+        self.cost = np.zeros((0, 0))
+        self.principal = np.zeros(0)
+
+        if accounts_map:
+            self.rebuild(accounts_map)
+
+    def rebuild(self, accounts_map):
+        """(Re)build the matrices from scratch for the given {account_id: Account} map."""
+        self.account_ids = list(accounts_map.keys())
+        self._accounts = [accounts_map[acc_id] for acc_id in self.account_ids]
+        self._account_index = {acc_id: i for i, acc_id in enumerate(self.account_ids)}
+
+        codes = set()
+        for acc in self._accounts:
+            codes.update(acc.holdings.keys())
+        self.codes = sorted(codes)
+        self._code_index = {code: j for j, code in enumerate(self.codes)}
+
+        n, m = len(self._accounts), len(self.codes)
+        self.qty = np.zeros((n, m))
+        self.cost = np.zeros((n, m))
+        self.principal = np.array([acc.principal for acc in self._accounts], dtype=float)
+        self._versions = [None] * n
+
+        for i in range(n):
+            self._load_row(i)
+
+    def _add_code(self, code):
+        self._code_index[code] = len(self.codes)
+        self.codes.append(code)
+        self.qty = np.hstack([self.qty, np.zeros((self.qty.shape[0], 1))])
+        self.cost = np.hstack([self.cost, np.zeros((self.cost.shape[0], 1))])
+
+    def _load_row(self, i):
+        acc = self._accounts[i]
+        self.qty[i, :] = 0
+        self.cost[i, :] = 0
+        for code, holding in acc.holdings.items():
+            if code not in self._code_index:
+                self._add_code(code)
+            j = self._code_index[code]
+            self.qty[i, j] = holding["qty"]
+            self.cost[i, j] = holding["total_cost"]
+        self._versions[i] = acc.version
+
+    def replace(self, account):
+        """
+        Swap in a new object for an existing account id (e.g. a fresh snapshot) and reload its row.
+        Returns False if the account is not in the matrices (the next sync rebuilds them).
+        """
+        i = self._account_index.get(account.account_id)
+        if i is None:
+            return False
+        self._accounts[i] = account
+        self.principal[i] = account.principal
+        self._load_row(i)
+        return True
+
+    def sync(self, accounts_map=None):
+        """
+        Refresh rows of accounts that traded since the last sync.
+        If accounts_map is given and its keys differ (accounts added/removed), rebuild.
+        """
+        if accounts_map is not None and set(accounts_map) != set(self._account_index):
+            self.rebuild(accounts_map)
+            return
+
+        reloaded = 0
+        for i, acc in enumerate(self._accounts):
+            if acc.version != self._versions[i]:
+                self._load_row(i)
+                reloaded += 1
+        metrics.inc("cache_requests_total", reloaded, cache="valuation_rows", result="miss")
+        metrics.inc("cache_requests_total", len(self._accounts) - reloaded, cache="valuation_rows", result="hit")
+
+    def price_vector(self, current_prices):
+        """
+        Returns (prices, missing) aligned with self.codes.
+        Codes without a current price are flagged in `missing` and valued at cost.
+        """
+        prices = np.array([current_prices.get(code, 0) for code in self.codes], dtype=float)
+        missing = (prices <= 0).astype(float)
+        return prices, missing
+
+    def evaluate(self, current_prices):
+        """
+        Value every account at once.
+
+        Args:
+            current_prices: dict {code: price}
+
+        Returns:
+            dict of numpy arrays aligned with self.account_ids:
+            balance, equity, cost_basis, total_value, pnl, pnl_rate, unrealized_pnl
+        """
+        self.sync()
+        prices, missing = self.price_vector(current_prices)
+
+        # Missing prices fall back to avg_price, i.e. the holding is valued at its cost basis
+        equity = self.qty @ prices + self.cost @ missing
+        cost_basis = self.cost.sum(axis=1)
+        balance = np.fromiter((acc.balance for acc in self._accounts), dtype=float, count=len(self._accounts))
+
+        total_value = balance + equity
+        pnl = total_value - self.principal
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl_rate = np.where(self.principal > 0, pnl / self.principal * 100, 0.0)
+
+        return {
+            "balance": balance,
+            "equity": equity,
+            "cost_basis": cost_basis,
+            "total_value": total_value,
+            "pnl": pnl,
+            "pnl_rate": pnl_rate,
+            "unrealized_pnl": equity - cost_basis
+        }
+
+    def row(self, result, account_id):
+        """Extract one account's values from an evaluate() result as plain floats."""
+        i = self._account_index[account_id]
+        return {key: float(values[i]) for key, values in result.items()}